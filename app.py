@@ -1,54 +1,198 @@
-from flask import Flask, render_template, request, jsonify
-import wikipedia
+from flask import Flask, render_template, request, jsonify, Response, send_file
 import os
-import warnings
+import tempfile
+import uuid
 import logging
 import database
-
-# Suppress warnings from the Wikipedia API
-warnings.filterwarnings("ignore", category=UserWarning, module='wikipedia')
+import fetcher
+import ingest
+import jobs
+import exporter
+import http_cache
+import importer
+import lookup
+import metrics
+import jsonstream
+import suggest
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'DEBUG').upper())
 
 app = Flask(__name__)
 
-# Set the Wikipedia language and user agent
-wikipedia.set_lang("en")
-wikipedia.set_user_agent("MyWikipediaApp/1.0")
+# Time requests, database calls and Wikipedia fetches for /metrics. The
+# timing hooks go first so the time they record includes compression.
+metrics.init_app(app)
+metrics.instrument_module(database)
+fetcher.set_fetch_observer(metrics.observe_fetch)
+
+# Compress large JSON/text responses for clients that accept it
+app.after_request(http_cache.compress_response)
+
+# Profiled requests (PROFILE_REQUESTS=1, then ?profile=1) answer with their cProfile summary
+app.after_request(metrics.profile_response)
 
 # Define the directory where files will be saved
 SAVE_DIR = "downloaded_data"
 os.makedirs(SAVE_DIR, exist_ok=True)
 
-# Initialize database
+# Initialize database (a read-only replica only checks that its snapshot is there)
 database.init_db()
 
+# POST endpoints that only read, so read-only replicas serve them too
+READ_ONLY_POST_ENDPOINTS = {'index', 'api_search_articles'}
+
+@app.before_request
+def reject_writes_on_replica():
+    """On a read-only replica (DATABASE_READ_ONLY=1), refuse requests that change the library."""
+    if not database.DB_READ_ONLY or request.endpoint is None or request.method in ('GET', 'HEAD', 'OPTIONS'):
+        return None
+    if request.method == 'POST' and request.endpoint in READ_ONLY_POST_ENDPOINTS:
+        return None
+    return jsonify({"error": "This server is a read-only replica; send changes to the primary", "status": 403}), 403
+
+# Background job handlers; each takes (params, progress) and must be safe to re-run
+def run_migrate_job(params, progress):
+    return ingest.migrate_files(params['files'], SAVE_DIR, params.get('delete_after', False), progress=progress)
+
+def run_fetch_batch_job(params, progress):
+    results = ingest.fetch_articles_batch(params['titles'], tags=params.get('tags'), progress=progress)
+    return {
+        "results": results,
+        "success_count": sum(1 for r in results if r['status'] == 'success'),
+        "skipped_count": sum(1 for r in results if r['status'] == 'skipped'),
+        "total_count": len(results)
+    }
+
+def run_refresh_job(params, progress):
+    return refresh_summary(ingest.refresh_articles(params.get('ids'), progress=progress))
+
+def run_export_job(params, progress):
+    path = os.path.join(exporter.EXPORT_DIR, f"export_{uuid.uuid4().hex}.zip")
+    count = exporter.export_archive(path, params.get('ids'), params.get('format', 'txt'), progress=progress,
+                                    **params.get('filters', {}))
+    return {"path": path, "article_count": count}
+
+def run_compress_job(params, progress):
+    return database.compress_existing_articles(batch_size=params.get('batch_size', 200), progress=progress)
+
+def run_import_job(params, progress):
+    return importer.import_spooled(params['path'], policy=params.get('policy', 'skip'),
+                                   format_type=params.get('format'), defer_indexes=params.get('defer_indexes'),
+                                   progress=progress)
+
+jobs.register('migrate', run_migrate_job)
+jobs.register('fetch_batch', run_fetch_batch_job)
+jobs.register('refresh', run_refresh_job)
+jobs.register('export', run_export_job)
+jobs.register('compress', run_compress_job)
+jobs.register('import', run_import_job)
+# Replicas cannot run jobs: every job writes to the database
+if not database.DB_READ_ONLY:
+    jobs.start_workers()
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     results = None
     if request.method == 'POST':
         query = request.form['query']
         results = search_wikipedia(query)  # Search for the query
-    downloaded_files = list_downloaded_files()  # List previously downloaded files
-    return render_template('index.html', results=results, downloaded_files=downloaded_files)
+    # The page is only a shell: the saved-articles list and article text are
+    # loaded by the browser from /api/articles and /api/articles/<id>/content
+    return render_template('index.html', results=results)
+
+def disambiguation_result(options):
+    return {
+        "title": "Disambiguation",
+        "summary": f"This term may refer to: {', '.join(options)}",
+        "source": "wikipedia"
+    }
+
+def not_found_result(query):
+    # Check if article exists locally
+    local_results = database.search_articles(query)
+    if local_results:
+        return {
+            "title": "Article Not Found on Wikipedia",
+            "summary": f"Could not find '{query}' on Wikipedia, but found {len(local_results)} similar article(s) in your local database.",
+            "local_results": local_results,
+            "source": "local_search"
+        }
+    return {
+        "title": "Article Not Found",
+        "summary": f"Could not find '{query}' on Wikipedia or in your local database.",
+        "source": "not_found"
+    }
+
+def read_only_result(query):
+    local_results = database.search_articles(query)
+    if local_results:
+        return {
+            "title": "Read-only Mirror",
+            "summary": f"This server only serves saved articles. Found {len(local_results)} matching article(s) in the local database.",
+            "local_results": local_results,
+            "source": "read_only"
+        }
+    return {
+        "title": "Read-only Mirror",
+        "summary": f"This server only serves saved articles, and none match '{query}'.",
+        "source": "read_only"
+    }
+
+def cached_lookup_result(query, cached):
+    """Build a search result from a lookup.lookup() answer, or None if the saved copy is gone."""
+    if cached['kind'] == lookup.DISAMBIGUATION:
+        return disambiguation_result(cached['options'])
+    if cached['kind'] == lookup.MISSING:
+        return not_found_result(query)
+
+    article = database.get_article_preview(cached['article_id'])
+    if article is None:
+        return None
+    return {
+        "id": article['id'],
+        "title": article['title'],
+        "summary": article['summary'],
+        "url": article['url'],
+        "word_count": article['word_count'],
+        "char_count": article['character_count'],
+        "source": "local"
+    }
 
 def search_wikipedia(query):
+    # Answer from saved articles and earlier lookups (including misses)
+    # first; stale answers are served as they are and revalidated in the
+    # background, so a repeated query does not wait for Wikipedia
+    cached = lookup.lookup(query)
+    if cached is not None:
+        result = cached_lookup_result(query, cached)
+        if result is not None:
+            if cached['stale'] and not database.DB_READ_ONLY:
+                lookup.revalidate(query)
+            return result
+
+    if database.DB_READ_ONLY:
+        # Replicas cannot save what they fetch; new articles arrive with the next snapshot
+        return read_only_result(query)
+
     try:
-        page = wikipedia.page(query)
+        # Concurrent identical queries share one upstream fetch; a slow
+        # upstream falls through to the offline path after the deadline
+        page = fetcher.fetch_page(query)
+        lookup.record_page(query, page)
 
         # Generate Wikipedia URL
-        url = page.url
+        url = page['url']
 
         # Calculate word and character counts
-        word_count = len(page.content.split())
-        char_count = len(page.content)
+        word_count = len(page['content'].split())
+        char_count = len(page['content'])
 
         # Save to database
         try:
             article_id = database.insert_article(
-                title=page.title,
-                content=page.content,
+                title=page['title'],
+                content=page['content'],
                 url=url,
                 word_count=word_count,
                 char_count=char_count,
@@ -57,46 +201,52 @@ def search_wikipedia(query):
 
             return {
                 "id": article_id,
-                "title": page.title,
-                "summary": page.summary,
-                "full_content": page.content,
+                "title": page['title'],
+                "summary": page['summary'],
                 "url": url,
                 "word_count": word_count,
+                "char_count": char_count,
                 "source": "wikipedia"
             }
         except ValueError as e:
-            # Article already exists or validation error
+            # Already saved: keep the saved copy current, the old text becomes a revision.
+            # Alias titles are not matched: their article was saved under another title.
+            existing_id = database.get_article_ids_by_title([page['title']], aliases=False).get(page['title'])
+            refreshed = None
+            if existing_id is not None and str(e) == "Article already saved":
+                refreshed = database.update_article_content(existing_id, page['content'], url)
+            if refreshed is not None:
+                return {
+                    "id": existing_id,
+                    "title": page['title'],
+                    "summary": page['summary'],
+                    "url": url,
+                    "word_count": word_count,
+                    "char_count": char_count,
+                    "revision": refreshed['revision'],
+                    "refreshed": refreshed['status'] == 'updated',
+                    "source": "wikipedia"
+                }
+            # Validation error or an alias title; show the saved copy if there is one
+            if existing_id is None:
+                existing_id = database.get_article_ids_by_title([page['title']]).get(page['title'])
             return {
-                "title": page.title,
-                "summary": page.summary,
-                "full_content": page.content,
+                "id": existing_id,
+                "title": page['title'],
+                "summary": page['summary'],
                 "url": url,
+                "word_count": word_count,
+                "char_count": char_count,
                 "error": str(e),
                 "source": "wikipedia"
             }
 
-    except wikipedia.exceptions.DisambiguationError as e:
-        return {
-            "title": "Disambiguation",
-            "summary": f"This term may refer to: {', '.join(e.options)}",
-            "full_content": None,
-            "source": "wikipedia"
-        }
-    except wikipedia.exceptions.PageError:
-        # Check if article exists locally
-        local_results = database.search_articles(query)
-        if local_results:
-            return {
-                "title": "Article Not Found on Wikipedia",
-                "summary": f"Could not find '{query}' on Wikipedia, but found {len(local_results)} similar article(s) in your local database.",
-                "local_results": local_results,
-                "source": "local_search"
-            }
-        return {
-            "title": "Article Not Found",
-            "summary": f"Could not find '{query}' on Wikipedia or in your local database.",
-            "source": "not_found"
-        }
+    except fetcher.DisambiguationError as e:
+        lookup.record_error(query, e)
+        return disambiguation_result(e.options)
+    except fetcher.PageError as e:
+        lookup.record_error(query, e)
+        return not_found_result(query)
     except Exception as e:
         # Network error or Wikipedia API unavailable - search locally
         logging.error(f"Wikipedia fetch error: {e}")
@@ -114,15 +264,6 @@ def search_wikipedia(query):
             "source": "offline"
         }
 
-def list_downloaded_files():
-    """Lists all articles from the database."""
-    try:
-        articles = database.get_all_articles(limit=100, offset=0)
-        return articles
-    except Exception as e:
-        logging.error(f"Error fetching articles: {e}")
-        return []  # Return an empty list on error
-
 @app.errorhandler(500)
 def internal_error(error):
     """Handles internal server errors."""
@@ -131,10 +272,16 @@ def internal_error(error):
 # API Routes
 @app.route('/api/articles', methods=['GET'])
 def api_get_articles():
-    """List all saved articles with pagination."""
+    """
+    List all saved articles with pagination.
+
+    Pass ?cursor=<next_cursor> for keyset pagination; ?offset= is still
+    supported for existing clients.
+    """
     try:
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
 
         # Validate and clamp parameters
         if limit > 100:
@@ -144,21 +291,35 @@ def api_get_articles():
         if offset < 0:
             offset = 0
 
+        # Total is kept up to date by triggers; no COUNT(*) per request
+        total = database.count_articles()
+
+        if cursor is not None:
+            try:
+                articles, next_cursor = database.get_articles_page(limit=limit, cursor=cursor)
+            except ValueError as e:
+                return jsonify({"error": str(e), "status": 400}), 400
+            return jsonstream.json_response({
+                "articles": articles,
+                "total": total,
+                "limit": limit,
+                "next_cursor": next_cursor
+            })
+
         articles = database.get_all_articles(limit=limit, offset=offset)
 
-        # Get total count
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) as count FROM articles')
-        total = cursor.fetchone()['count']
-        conn.close()
+        # Hand out a cursor so clients can switch to keyset paging
+        next_cursor = None
+        if len(articles) == limit and offset + limit < total:
+            next_cursor = database.encode_cursor(articles[-1]['saved_date'], articles[-1]['id'])
 
-        return jsonify({
+        return jsonstream.json_response({
             "articles": articles,
             "total": total,
             "limit": limit,
-            "offset": offset
-        }), 200
+            "offset": offset,
+            "next_cursor": next_cursor
+        })
 
     except Exception as e:
         logging.error(f"API error: {e}")
@@ -166,14 +327,126 @@ def api_get_articles():
 
 @app.route('/api/articles/<int:article_id>', methods=['GET'])
 def api_get_article(article_id):
-    """Retrieve a single article by ID."""
+    """
+    Retrieve a single article by ID.
+
+    Pass ?content=0 to leave out the text and read it in slices from
+    /api/articles/<id>/content instead.
+    """
     try:
-        article = database.get_article_by_id(article_id)
+        include_content = request.args.get('content', '1') != '0'
+
+        # Answer conditional requests from the validators alone, without loading content
+        validators = database.get_article_validators(article_id)
+        if validators is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+
+        etag = http_cache.make_etag('json' if include_content else 'json-meta', validators['content_hash'],
+                                    validators['title'], validators['url'], validators['saved_date'],
+                                    validators['modified_date'], *validators['tags'])
+        last_modified = http_cache.parse_db_timestamp(validators['modified_date'] or validators['saved_date'])
+        cached = http_cache.not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
 
+        article = database.get_article_by_id(article_id)
         if article is None:
             return jsonify({"error": "Article not found", "status": 404}), 404
 
-        return jsonify(article), 200
+        if not include_content:
+            del article['content']
+
+        response = jsonify(article)
+        http_cache.set_validators(response, etag, last_modified)
+        return response, 200
+
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/articles/<int:article_id>/content', methods=['GET'])
+def api_get_article_content(article_id):
+    """
+    Read an article's text in slices: ?offset=<chars>&length=<chars>.
+
+    Follow next_offset until it is null to read the whole article.
+    """
+    try:
+        offset = request.args.get('offset', 0, type=int)
+        length = request.args.get('length', database.CONTENT_CHUNK_CHARS, type=int)
+
+        validators = database.get_article_validators(article_id)
+        if validators is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+
+        etag = http_cache.make_etag('content', validators['content_hash'], offset, length)
+        last_modified = http_cache.parse_db_timestamp(validators['modified_date'] or validators['saved_date'])
+        cached = http_cache.not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+
+        try:
+            chunk = database.get_article_content(article_id, offset, length)
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": 400}), 400
+        if chunk is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+
+        response = jsonify(chunk)
+        http_cache.set_validators(response, etag, last_modified)
+        return response, 200
+
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/articles/<int:article_id>/sections', methods=['GET'])
+def api_get_article_sections(article_id):
+    """List an article's sections (headings, offsets and word counts) without its text."""
+    try:
+        validators = database.get_article_validators(article_id)
+        if validators is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+
+        etag = http_cache.make_etag('sections', validators['content_hash'])
+        last_modified = http_cache.parse_db_timestamp(validators['modified_date'] or validators['saved_date'])
+        cached = http_cache.not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+
+        sections = database.get_article_sections(article_id)
+        if sections is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+
+        response = jsonify({"article_id": article_id, "sections": sections, "count": len(sections)})
+        http_cache.set_validators(response, etag, last_modified)
+        return response, 200
+
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/articles/<int:article_id>/sections/<int:position>', methods=['GET'])
+def api_get_article_section(article_id, position):
+    """Read one section of an article (0 is the lead)."""
+    try:
+        validators = database.get_article_validators(article_id)
+        if validators is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+
+        etag = http_cache.make_etag('section', validators['content_hash'], position)
+        last_modified = http_cache.parse_db_timestamp(validators['modified_date'] or validators['saved_date'])
+        cached = http_cache.not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+
+        section = database.get_article_section(article_id, position)
+        if section is None:
+            return jsonify({"error": "Section not found", "status": 404}), 404
+
+        response = jsonify(section)
+        http_cache.set_validators(response, etag, last_modified)
+        return response, 200
 
     except Exception as e:
         logging.error(f"API error: {e}")
@@ -197,12 +470,7 @@ def api_search_articles():
         if not query or not query.strip():
             return jsonify({"error": "Query parameter required", "status": 400}), 400
 
-        results = database.search_articles(query)
-
-        return jsonify({
-            "results": results,
-            "count": len(results)
-        }), 200
+        return jsonstream.list_response("results", database.stream_search_results(query))
 
     except Exception as e:
         logging.error(f"API error: {e}")
@@ -210,6 +478,19 @@ def api_search_articles():
             return jsonify({"error": "Invalid JSON", "status": 400}), 400
         return jsonify({"error": "Internal server error", "status": 500}), 500
 
+@app.route('/api/suggest', methods=['GET'])
+def api_suggest():
+    """Suggest saved titles for a partial query: ?q=pyth&limit=10&fuzzy=1."""
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', suggest.SUGGEST_LIMIT, type=int)
+        fuzzy = request.args.get('fuzzy', '0').lower() in ('1', 'true', 'yes')
+        suggestions = suggest.suggest(query, limit=limit, fuzzy=fuzzy)
+        return jsonstream.json_response({"query": query, "suggestions": suggestions, "count": len(suggestions)})
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
 @app.route('/api/articles/<int:article_id>', methods=['DELETE'])
 def api_delete_article(article_id):
     """Delete a saved article from database."""
@@ -230,48 +511,53 @@ def api_get_stats():
     """Get database statistics."""
     try:
         stats = database.get_stats()
+        stats['fetcher'] = fetcher.get_fetcher_stats()
+        stats['lookup_cache'] = lookup.get_stats()
+        stats['suggest'] = suggest.get_stats()
+        stats['read_only'] = database.DB_READ_ONLY
         return jsonify(stats), 200
 
     except Exception as e:
         logging.error(f"API error: {e}")
         return jsonify({"error": "Internal server error", "status": 500}), 500
 
+def collect_runtime_metrics():
+    """Counters kept by the fetcher and the caches, sampled for /metrics."""
+    fetch = fetcher.get_fetcher_stats()
+    reads = database.get_cache_stats()
+    lookups = dict(lookup.stats)
+    return [
+        ('wikifetch_wikipedia_requests_total', 'counter', 'HTTP requests sent to the Wikipedia API.',
+         fetch['requests']),
+        ('wikifetch_wikipedia_retries_total', 'counter', 'Wikipedia API requests that were retried.',
+         fetch['retries']),
+        ('wikifetch_wikipedia_coalesced_total', 'counter', 'Fetches that joined an in-flight fetch of the same title.',
+         fetch['coalesced']),
+        ('wikifetch_wikipedia_in_flight', 'gauge', 'Wikipedia fetches in progress.', fetch['in_flight']),
+        ('wikifetch_read_cache_hits_total', 'counter', 'Read cache hits.', reads['hits']),
+        ('wikifetch_read_cache_misses_total', 'counter', 'Read cache misses.', reads['misses']),
+        ('wikifetch_read_cache_bytes', 'gauge', 'Approximate bytes held by the read cache.', reads['bytes']),
+        ('wikifetch_lookup_cache_hits_total', 'counter', 'Searches answered from the lookup cache.',
+         lookups['hits'] + lookups['stale_hits']),
+        ('wikifetch_lookup_cache_misses_total', 'counter', 'Searches that had to wait for Wikipedia.',
+         lookups['misses']),
+        ('wikifetch_lookup_revalidations_total', 'counter', 'Background revalidations of cached lookups.',
+         lookups['revalidations'])
+    ]
+
+metrics.register_collector(collect_runtime_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose request, database and fetch timings in the Prometheus text format."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Migration Routes
 @app.route('/migration-status', methods=['GET'])
 def get_migration_status():
     """Get status of txt files vs database articles."""
     try:
-        # Get all txt files
-        txt_files = []
-        if os.path.exists(SAVE_DIR):
-            txt_files = [f for f in os.listdir(SAVE_DIR) if f.endswith('.txt')]
-
-        # Get all article titles from database
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT title FROM articles')
-        db_titles = {row['title'] for row in cursor.fetchall()}
-        conn.close()
-
-        # Categorize files
-        unmigrated_files = []
-        migrated_files = []
-
-        for txt_file in txt_files:
-            # Parse title from filename (reverse the underscore replacement)
-            title = txt_file.replace('.txt', '').replace('_', ' ')
-
-            if title in db_titles:
-                migrated_files.append(txt_file)
-            else:
-                unmigrated_files.append(txt_file)
-
-        return jsonify({
-            "unmigrated": unmigrated_files,
-            "migrated": migrated_files,
-            "total_txt_files": len(txt_files),
-            "total_db_articles": len(db_titles)
-        }), 200
+        return jsonify(ingest.get_migration_status(SAVE_DIR)), 200
 
     except Exception as e:
         logging.error(f"Migration status error: {e}")
@@ -283,113 +569,154 @@ def migrate_files():
     try:
         data = request.get_json()
 
-        if not data or 'files' not in data:
+        if not data or ('files' not in data and not data.get('all')):
             return jsonify({"error": "Files parameter required", "status": 400}), 400
 
-        files_to_migrate = data['files']
+        # "all": true imports every unmigrated file without listing them client-side
+        if data.get('all'):
+            files_to_migrate = ingest.get_migration_status(SAVE_DIR)['unmigrated']
+        else:
+            files_to_migrate = data['files']
         delete_after = data.get('delete_after', False)
 
         if not isinstance(files_to_migrate, list):
             return jsonify({"error": "Files must be an array", "status": 400}), 400
 
-        results = []
+        # Large directories can outlive the worker timeout; run them as a job
+        if data.get('background', False):
+            job_id = jobs.submit('migrate', {"files": files_to_migrate, "delete_after": delete_after})
+            return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
 
-        for file_name in files_to_migrate:
-            result = {"file": file_name, "status": "error", "message": "Unknown error"}
+        return jsonify(ingest.migrate_files(files_to_migrate, SAVE_DIR, delete_after)), 200
+
+    except Exception as e:
+        logging.error(f"Migration error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/fetch/batch', methods=['POST'])
+def api_fetch_batch():
+    """Fetch many Wikipedia titles in parallel and save them in bulk."""
+    try:
+        data = request.get_json()
+
+        if not data or 'titles' not in data:
+            return jsonify({"error": "Titles parameter required", "status": 400}), 400
+
+        titles = data['titles']
+        tags = data.get('tags', [])
+
+        if not isinstance(titles, list) or len(titles) == 0:
+            return jsonify({"error": "Titles must be a non-empty array", "status": 400}), 400
+        if len(titles) > ingest.BATCH_FETCH_MAX_TITLES:
+            return jsonify({"error": f"At most {ingest.BATCH_FETCH_MAX_TITLES} titles per batch", "status": 400}), 400
+        if not isinstance(tags, list):
+            return jsonify({"error": "Tags must be an array", "status": 400}), 400
+
+        if data.get('background', False):
+            job_id = jobs.submit('fetch_batch', {"titles": titles, "tags": tags})
+            return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
+
+        results = ingest.fetch_articles_batch(titles, tags=tags)
 
-            try:
-                file_path = os.path.join(SAVE_DIR, file_name)
-
-                # Check if file exists
-                if not os.path.exists(file_path):
-                    result["message"] = "File not found"
-                    results.append(result)
-                    continue
-
-                # Read file content
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                # Parse content: First line should be "Title: X"
-                if not content.startswith("Title: "):
-                    result["message"] = "File malformed (no Title: line)"
-                    results.append(result)
-                    continue
-
-                # Split on first double newline
-                parts = content.split('\n\n', 1)
-                if len(parts) < 2:
-                    result["message"] = "File malformed (no content after title)"
-                    results.append(result)
-                    continue
-
-                # Extract title
-                title_line = parts[0]
-                title = title_line.replace("Title: ", "").strip()
-
-                # Extract content
-                article_content = parts[1].strip()
-
-                if not title:
-                    result["message"] = "Title is empty"
-                    results.append(result)
-                    continue
-
-                if len(article_content) < 10:
-                    result["message"] = "Content too short"
-                    results.append(result)
-                    continue
-
-                # Generate Wikipedia URL
-                url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
-
-                # Calculate metrics
-                word_count = len(article_content.split())
-                char_count = len(article_content)
-
-                # Insert into database
-                try:
-                    article_id = database.insert_article(
-                        title=title,
-                        content=article_content,
-                        url=url,
-                        word_count=word_count,
-                        char_count=char_count,
-                        tags=[]
-                    )
-
-                    result["status"] = "success"
-                    result["message"] = f"Imported successfully (ID: {article_id})"
-                    result["article_id"] = article_id
-
-                    # Delete file if requested
-                    if delete_after:
-                        os.remove(file_path)
-                        result["message"] += " and file deleted"
-
-                except ValueError as e:
-                    if "already saved" in str(e).lower():
-                        result["message"] = "Article already exists in database"
-                    else:
-                        result["message"] = str(e)
-
-            except PermissionError:
-                result["message"] = "File read permission error"
-            except Exception as e:
-                result["message"] = f"Error: {str(e)}"
-
-            results.append(result)
-
-        # Return results
         success_count = sum(1 for r in results if r['status'] == 'success')
+        skipped_count = sum(1 for r in results if r['status'] == 'skipped')
         return jsonify({
             "results": results,
             "success_count": success_count,
+            "skipped_count": skipped_count,
             "total_count": len(results)
         }), 200
 
     except Exception as e:
-        logging.error(f"Migration error: {e}")
+        logging.error(f"Batch fetch error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+# Revision Routes
+def refresh_summary(results):
+    """Count the outcomes of ingest.refresh_articles."""
+    return {
+        "results": results,
+        "updated_count": sum(1 for r in results if r['status'] == 'updated'),
+        "unchanged_count": sum(1 for r in results if r['status'] == 'unchanged'),
+        "error_count": sum(1 for r in results if r['status'] == 'error'),
+        "total_count": len(results)
+    }
+
+@app.route('/api/articles/<int:article_id>/revisions', methods=['GET'])
+def api_get_article_revisions(article_id):
+    """List an article's revisions, newest (the current text) first."""
+    try:
+        revisions = database.get_article_revisions(article_id)
+        if revisions is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+        return jsonify({"article_id": article_id, "revisions": revisions, "count": len(revisions)}), 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/articles/<int:article_id>/revisions/<int:revision>', methods=['GET'])
+def api_get_article_revision(article_id, revision):
+    """Read the full text of one revision of an article."""
+    try:
+        found = database.get_article_revision(article_id, revision)
+        if found is None:
+            return jsonify({"error": "Revision not found", "status": 404}), 404
+
+        # A revision's text never changes once it has been replaced
+        etag = http_cache.make_etag('revision', found['content_hash'], revision)
+        cached = http_cache.not_modified(etag)
+        if cached is not None:
+            return cached
+
+        response = jsonify(found)
+        http_cache.set_validators(response, etag)
+        return response, 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/articles/<int:article_id>/refresh', methods=['POST'])
+def api_refresh_article(article_id):
+    """Refetch one article and store it as a new revision if it changed."""
+    try:
+        results = ingest.refresh_articles([article_id])
+        result = results[0]
+        if result['status'] == 'error':
+            status = 404 if result['message'] in ("Article not found", "Article not found on Wikipedia") else 502
+            return jsonify({"error": result['message'], "status": status}), status
+        return jsonify(result), 200
+    except Exception as e:
+        logging.error(f"Refresh error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/refresh', methods=['POST'])
+def api_refresh_articles():
+    """Refetch many articles in parallel; unchanged pages are skipped by content hash."""
+    try:
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+
+        if data.get('all', False):
+            ids = None
+        elif not isinstance(ids, list) or len(ids) == 0:
+            return jsonify({"error": "Provide an ids array or \"all\": true", "status": 400}), 400
+        elif not all(isinstance(article_id, int) for article_id in ids):
+            return jsonify({"error": "IDs must be integers", "status": 400}), 400
+        elif len(ids) > ingest.BATCH_FETCH_MAX_TITLES:
+            return jsonify({"error": f"At most {ingest.BATCH_FETCH_MAX_TITLES} articles per refresh", "status": 400}), 400
+
+        if data.get('background', False):
+            job_id = jobs.submit('refresh', {"ids": ids})
+            return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
+
+        if ids is None and database.count_articles() > ingest.BATCH_FETCH_MAX_TITLES:
+            return jsonify({"error": "Library too large to refresh synchronously; use \"background\": true",
+                            "status": 400}), 400
+
+        return jsonify(refresh_summary(ingest.refresh_articles(ids))), 200
+
+    except Exception as e:
+        logging.error(f"Refresh error: {e}")
         return jsonify({"error": "Internal server error", "status": 500}), 500
 
 # Favorites Routes
@@ -397,8 +724,7 @@ def migrate_files():
 def api_get_favorites():
     """Get all favorited articles."""
     try:
-        favorites = database.get_favorites()
-        return jsonify({"favorites": favorites, "count": len(favorites)}), 200
+        return jsonstream.list_response("favorites", database.stream_favorites())
     except Exception as e:
         logging.error(f"API error: {e}")
         return jsonify({"error": "Internal server error", "status": 500}), 500
@@ -427,6 +753,53 @@ def api_remove_favorite(article_id):
         logging.error(f"API error: {e}")
         return jsonify({"error": "Internal server error", "status": 500}), 500
 
+# Duplicate Routes
+def parse_threshold():
+    """Read ?threshold= (0 to 1) for near-duplicate lookups; None means the configured default."""
+    threshold = request.args.get('threshold', type=float)
+    if threshold is not None and not 0 < threshold <= 1:
+        raise ValueError("threshold must be greater than 0 and at most 1")
+    return threshold
+
+@app.route('/api/duplicates', methods=['GET'])
+def api_get_duplicate_clusters():
+    """List clusters of near-duplicate articles, largest first."""
+    try:
+        try:
+            threshold = parse_threshold()
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": 400}), 400
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+
+        clusters = database.get_near_duplicate_clusters(threshold, limit)
+        return jsonify({"clusters": clusters, "count": len(clusters)}), 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/articles/<int:article_id>/duplicates', methods=['GET'])
+def api_get_article_duplicates(article_id):
+    """List the near-duplicates of one article and its exact-duplicate aliases."""
+    try:
+        try:
+            threshold = parse_threshold()
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": 400}), 400
+
+        duplicates = database.get_near_duplicates(article_id, threshold)
+        if duplicates is None:
+            return jsonify({"error": "Article not found", "status": 404}), 404
+
+        return jsonify({
+            "article_id": article_id,
+            "aliases": database.get_article_aliases(article_id),
+            "near_duplicates": duplicates,
+            "count": len(duplicates)
+        }), 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
 # Tags Routes
 @app.route('/api/tags', methods=['GET'])
 def api_get_tags():
@@ -442,20 +815,56 @@ def api_get_tags():
 def api_get_articles_by_tag(tag_name):
     """Get all articles with a specific tag."""
     try:
-        articles = database.get_articles_by_tag(tag_name)
-        return jsonify({"articles": articles, "count": len(articles)}), 200
+        return jsonstream.list_response("articles", database.stream_articles_by_tag(tag_name))
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/tags/articles', methods=['GET'])
+def api_get_articles_by_tags():
+    """Get articles with any (or all) of several tags: ?tags=a,b&match=any|all."""
+    try:
+        tags = [tag for tag in request.args.get('tags', '').split(',') if tag.strip()]
+        if not tags:
+            return jsonify({"error": "Tags parameter required", "status": 400}), 400
+        try:
+            batches = database.stream_articles_by_tags(tags, request.args.get('match', 'any'))
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": 400}), 400
+        return jsonstream.list_response("articles", batches)
     except Exception as e:
         logging.error(f"API error: {e}")
         return jsonify({"error": "Internal server error", "status": 500}), 500
 
+def parse_tag_list(data, key):
+    """
+    Read a list of tag names from a JSON body.
+
+    Raises:
+        ValueError: If the value is not an array of strings
+    """
+    tags = data.get(key) or []
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError(f"{key.capitalize()} must be an array of tag names")
+    return tags
+
 @app.route('/api/articles/<int:article_id>/tags', methods=['POST'])
 def api_add_tag_to_article(article_id):
-    """Add tag to an article."""
+    """Add one tag ({"tag": ...}) or several ({"tags": [...]}) to an article."""
     try:
         data = request.get_json()
-        if not data or 'tag' not in data:
+        if not data or ('tag' not in data and 'tags' not in data):
             return jsonify({"error": "Tag parameter required", "status": 400}), 400
 
+        if 'tags' in data:
+            try:
+                result = database.update_tags_bulk([article_id], add=parse_tag_list(data, 'tags'))
+            except ValueError as e:
+                return jsonify({"error": str(e), "status": 400}), 400
+            if result['not_found']:
+                return jsonify({"error": "Article not found", "status": 404}), 404
+            return jsonify({"message": "Tags added successfully", "added": result['added']}), 200
+
         tag_name = data['tag'].strip()
         if not tag_name:
             return jsonify({"error": "Tag cannot be empty", "status": 400}), 400
@@ -485,41 +894,284 @@ def api_bulk_delete():
         logging.error(f"API error: {e}")
         return jsonify({"error": "Internal server error", "status": 500}), 500
 
+@app.route('/api/bulk/tags', methods=['POST'])
+def api_bulk_tags():
+    """Add and remove tags on multiple articles in one transaction."""
+    try:
+        data = request.get_json()
+        if not data or 'ids' not in data:
+            return jsonify({"error": "IDs array required", "status": 400}), 400
+
+        ids = data['ids']
+        if not isinstance(ids, list) or len(ids) == 0:
+            return jsonify({"error": "IDs must be a non-empty array", "status": 400}), 400
+
+        try:
+            result = database.update_tags_bulk(ids, add=parse_tag_list(data, 'add'),
+                                               remove=parse_tag_list(data, 'remove'))
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": 400}), 400
+        return jsonify(result), 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
 # Export Routes
 @app.route('/api/export/<int:article_id>', methods=['GET'])
 def api_export_article(article_id):
     """Export article as text, markdown, or HTML."""
     try:
         format_type = request.args.get('format', 'txt')
-        article = database.get_article_by_id(article_id)
+        validators = database.get_article_validators(article_id)
+
+        if not validators:
+            return jsonify({"error": "Article not found", "status": 404}), 404
 
+        if format_type not in exporter.EXPORT_FORMATS:
+            return jsonify({"error": "Invalid format. Use txt, md, or html", "status": 400}), 400
+
+        # Exports only contain title and content, so tag changes do not invalidate them
+        etag = http_cache.make_etag(format_type, validators['content_hash'], validators['title'])
+        last_modified = http_cache.parse_db_timestamp(validators['modified_date'] or validators['saved_date'])
+        cached = http_cache.not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+
+        article = database.get_article_by_id(article_id)
         if not article:
             return jsonify({"error": "Article not found", "status": 404}), 404
 
-        from flask import Response
+        mimetype, _ = exporter.EXPORT_FORMATS[format_type]
+        filename = f"{article['title']}.{format_type}"
+        response = Response(exporter.render_article(article, format_type), mimetype=mimetype,
+                            headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+        return http_cache.set_validators(response, etag, last_modified)
 
-        if format_type == 'txt':
-            content = f"Title: {article['title']}\n\n{article['content']}"
-            return Response(content, mimetype='text/plain',
-                          headers={'Content-Disposition': f'attachment; filename="{article["title"]}.txt"'})
+    except Exception as e:
+        logging.error(f"Export error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
 
-        elif format_type == 'md':
-            content = f"# {article['title']}\n\n{article['content']}"
-            return Response(content, mimetype='text/markdown',
-                          headers={'Content-Disposition': f'attachment; filename="{article["title"]}.md"'})
+def parse_export_filters(source):
+    """
+    Read bulk export filters from query args or a JSON body.
+
+    Returns:
+        Tuple of (article IDs or None, filter dict for database.iter_articles)
+
+    Raises:
+        ValueError: If a filter is malformed
+    """
+    ids = source.get('ids')
+    if isinstance(ids, str):
+        ids = [part for part in ids.split(',') if part.strip()]
+    if ids is not None:
+        if not isinstance(ids, list):
+            raise ValueError("IDs must be an array")
+        try:
+            ids = [int(article_id) for article_id in ids]
+        except (TypeError, ValueError):
+            raise ValueError("IDs must be integers")
+
+    favorites = source.get('favorites', False)
+    if isinstance(favorites, str):
+        favorites = favorites.lower() in ('1', 'true', 'yes')
+
+    filters = {"tag": source.get('tag') or None, "favorites": bool(favorites), "since": None, "until": None}
+    if source.get('since'):
+        filters['since'] = exporter.parse_date_filter(source['since'])
+    if source.get('until'):
+        filters['until'] = exporter.parse_date_filter(source['until'], end_of_day=True)
+    return ids, filters
+
+@app.route('/api/export', methods=['GET'])
+def api_export_stream():
+    """Stream many (or all) articles as NDJSON, tar.gz or zip."""
+    try:
+        archive_type = request.args.get('archive', 'ndjson')
+        format_type = request.args.get('format', 'txt')
+        try:
+            ids, filters = parse_export_filters(request.args)
+            chunks = exporter.stream_export(archive_type, format_type, ids, **filters)
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": 400}), 400
 
-        elif format_type == 'html':
-            content = f"<!DOCTYPE html><html><head><meta charset='UTF-8'><title>{article['title']}</title></head><body><h1>{article['title']}</h1><pre>{article['content']}</pre></body></html>"
-            return Response(content, mimetype='text/html',
-                          headers={'Content-Disposition': f'attachment; filename="{article["title"]}.html"'})
+        mimetype, extension = exporter.EXPORT_ARCHIVES[archive_type]
+        return Response(chunks, mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="wikifetch_export.{extension}"'})
 
-        else:
+    except Exception as e:
+        logging.error(f"Export error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/export', methods=['POST'])
+def api_export_bulk():
+    """Export many (or all) articles to a zip archive in the background."""
+    try:
+        data = request.get_json(silent=True) or {}
+        format_type = data.get('format', 'txt')
+
+        if format_type not in exporter.EXPORT_FORMATS:
             return jsonify({"error": "Invalid format. Use txt, md, or html", "status": 400}), 400
+        try:
+            ids, filters = parse_export_filters(data)
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": 400}), 400
+
+        job_id = jobs.submit('export', {"ids": ids, "format": format_type, "filters": filters})
+        return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
 
     except Exception as e:
         logging.error(f"Export error: {e}")
         return jsonify({"error": "Internal server error", "status": 500}), 500
 
+@app.route('/api/import', methods=['POST'])
+def api_import():
+    """Import articles from an NDJSON, tar(.gz) or zip body or file upload."""
+    try:
+        policy = request.args.get('policy', 'skip')
+        format_type = request.args.get('format') or None
+        defer = request.args.get('defer')
+        defer_indexes = None if defer is None else defer.lower() in ('1', 'true', 'yes')
+
+        if policy not in database.IMPORT_POLICIES:
+            return jsonify({"error": "Invalid policy. Use skip, replace, or newest", "status": 400}), 400
+        if format_type is not None and format_type not in importer.IMPORT_FORMATS:
+            return jsonify({"error": "Invalid format. Use ndjson, tar, or zip", "status": 400}), 400
+
+        # Either a multipart upload named "file" or the raw request body
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                return jsonify({"error": "File upload required", "status": 400}), 400
+            stream = upload.stream
+        else:
+            stream = request.stream
+
+        # Large restores can outlive the worker timeout; spool them and run a job
+        if request.args.get('background', '').lower() in ('1', 'true', 'yes'):
+            path = importer.spool_upload(stream)
+            job_id = jobs.submit('import', {"path": path, "policy": policy, "format": format_type,
+                                            "defer_indexes": defer_indexes})
+            return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
+
+        summary = importer.import_stream(stream, policy=policy, format_type=format_type, defer_indexes=defer_indexes)
+        return jsonify(summary), 200
+
+    except Exception as e:
+        logging.error(f"Import error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+# Admin Routes
+@app.route('/api/admin/compress', methods=['POST'])
+def api_compress_articles():
+    """Compress existing plain-text articles in the background."""
+    try:
+        job_id = jobs.submit('compress')
+        return jsonify({"job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/admin/stats/recompute', methods=['POST'])
+def api_recompute_stats():
+    """Recompute statistics aggregates from scratch and report drift (?dry_run=1 to only report)."""
+    try:
+        dry_run = request.args.get('dry_run', '0').lower() in ('1', 'true', 'yes')
+        report = database.recompute_library_stats(dry_run=dry_run)
+        if report['drift'] or report['tag_drift']:
+            logging.warning(f"Statistics drift detected: {report['drift']} {report['tag_drift']}")
+        return jsonify(report), 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+# Snapshot Routes
+@app.route('/api/snapshot', methods=['GET'])
+def api_snapshot():
+    """
+    Download a consistent copy of the database, for read-only replicas (see snapshot.py).
+
+    A sharded library is downloaded one shard file at a time (?shard=k, 0 by default).
+    Only served when SNAPSHOT_ENDPOINT is enabled.
+    """
+    try:
+        if not database.SNAPSHOT_ENDPOINT:
+            return jsonify({"error": "Snapshot endpoint is disabled", "status": 404}), 404
+
+        shard = request.args.get('shard', 0, type=int)
+        shards = database.shard_count()
+        if not 0 <= shard < shards:
+            return jsonify({"error": "No such shard", "status": 404}), 404
+
+        fd, path = tempfile.mkstemp(prefix='wikifetch-snapshot-', suffix='.db')
+        os.close(fd)
+        try:
+            with database.on_shard(shard):
+                articles = database.backup_database(path)
+            snapshot_file = open(path, 'rb')
+        finally:
+            # The open file stays readable until the response is done with it
+            os.remove(path)
+        response = send_file(snapshot_file, mimetype='application/vnd.sqlite3', as_attachment=True,
+                             download_name=os.path.basename(database.shard_path(shard, 'wikifetch.db')))
+        response.content_length = os.fstat(snapshot_file.fileno()).st_size
+        response.headers['X-Snapshot-Articles'] = str(articles)
+        response.headers['X-Snapshot-Shards'] = str(shards)
+        return response
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+# Job Routes
+@app.route('/api/jobs', methods=['GET'])
+def api_list_jobs():
+    """List recent background jobs."""
+    try:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        job_list = jobs.list_jobs(limit=limit, status=request.args.get('status'))
+        return jsonify({"jobs": job_list, "count": len(job_list)}), 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Get progress and result of a background job."""
+    try:
+        job = jobs.get_job(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found", "status": 404}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """Cancel a queued or running background job."""
+    try:
+        if not jobs.cancel_job(job_id):
+            return jsonify({"error": "Job not found or already finished", "status": 404}), 404
+        return jsonify({"message": "Cancellation requested"}), 202
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
+@app.route('/api/jobs/<int:job_id>/download', methods=['GET'])
+def api_download_job_result(job_id):
+    """Download the archive produced by a finished export job."""
+    try:
+        job = jobs.get_job(job_id)
+        if job is None or job['kind'] != 'export':
+            return jsonify({"error": "Export job not found", "status": 404}), 404
+        if job['status'] != jobs.SUCCEEDED or not os.path.exists(job['result']['path']):
+            return jsonify({"error": "Export is not ready", "status": 409}), 409
+        return send_file(job['result']['path'], mimetype='application/zip', as_attachment=True,
+                         download_name=f"wikifetch_export_{job_id}.zip")
+    except Exception as e:
+        logging.error(f"API error: {e}")
+        return jsonify({"error": "Internal server error", "status": 500}), 500
+
 if __name__ == '__main__':
     import os
     port = int(os.getenv('PORT', 5000))
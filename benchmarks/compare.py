@@ -0,0 +1,84 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Works with the JSON written by --output of benchmarks.database_calls and
+benchmarks.load. Latency percentiles that grew, and throughput that
+dropped, by more than --threshold percent are reported as regressions
+(latency changes under --min-delta-ms are treated as noise),
+and the exit status is 1 if there are any.
+
+Usage:
+    python -m benchmarks.compare before.json after.json [--threshold 10] [--metrics p50_ms p95_ms p99_ms]
+"""
+import argparse
+import sys
+
+from benchmarks.results import load
+
+def flatten(results, prefix=''):
+    """Map 'name/operation' paths to latency summaries (and throughput numbers) in a results tree."""
+    flat = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict) and 'p50_ms' in value:
+            flat[path] = value
+        elif isinstance(value, dict):
+            flat.update(flatten(value, f'{path}/'))
+        elif key == 'throughput_rps':
+            flat[path] = {"throughput_rps": value}
+    return flat
+
+def compare(before, after, metrics, threshold, min_delta_ms=0.0):
+    """
+    Returns:
+        List of (path, metric, before, after, change percent, regressed) rows
+    """
+    old = flatten(before['results'])
+    new = flatten(after['results'])
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        for metric in metrics + ['throughput_rps']:
+            a = old[path].get(metric)
+            b = new[path].get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a * 100
+            # Latency should go down, throughput up
+            worse = -change if metric == 'throughput_rps' else change
+            # Ignore jitter on sub-millisecond calls
+            noise = metric != 'throughput_rps' and abs(b - a) < min_delta_ms
+            rows.append((path, metric, a, b, change, worse > threshold and not noise))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='percent change counted as a regression')
+    parser.add_argument('--metrics', nargs='+', default=['p50_ms', 'p95_ms', 'p99_ms'])
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='latency changes smaller than this are never regressions')
+    parser.add_argument('--all', action='store_true', help='list unchanged rows too')
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    if before.get('benchmark') != after.get('benchmark'):
+        sys.exit(f"Cannot compare a {before.get('benchmark')} run with a {after.get('benchmark')} run")
+    if before.get('params') != after.get('params'):
+        print(f"Warning: parameters differ ({before.get('params')} vs {after.get('params')})")
+    print(f"before: {before['environment'].get('commit')} {before['environment'].get('date')}")
+    print(f"after:  {after['environment'].get('commit')} {after['environment'].get('date')}\n")
+
+    rows = compare(before, after, args.metrics, args.threshold, args.min_delta_ms)
+    regressions = [row for row in rows if row[5]]
+    print(f'{"benchmark":<44} {"metric":<15} {"before":>10} {"after":>10} {"change":>8}')
+    for path, metric, a, b, change, regressed in rows:
+        if args.all or abs(change) > args.threshold:
+            flag = '  REGRESSION' if regressed else ''
+            print(f'{path:<44} {metric:<15} {a:>10.3f} {b:>10.3f} {change:>+7.1f}%{flag}')
+
+    print(f'\n{len(regressions)} regression(s) over {args.threshold:g}% in {len(rows)} comparisons')
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Synthetic article corpus generation for benchmarks."""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import database
+
+# Small vocabulary with a skewed (Zipf-like) word distribution
+VOCABULARY = [
+    'history', 'science', 'python', 'language', 'computer', 'network', 'security',
+    'database', 'system', 'theory', 'music', 'river', 'mountain', 'city', 'empire',
+    'biology', 'chemistry', 'physics', 'algorithm', 'protocol', 'war', 'treaty',
+    'painting', 'novel', 'film', 'election', 'economy', 'island', 'species', 'planet',
+    'galaxy', 'energy', 'engine', 'railway', 'bridge', 'castle', 'temple', 'festival',
+    'mathematics', 'geometry', 'injection', 'compiler', 'kernel', 'philosophy', 'ocean',
+] + [f'word{i}' for i in range(2000)]
+
+def random_text(rng, word_count):
+    """Return a paragraph-structured text of roughly word_count words."""
+    words = rng.choices(VOCABULARY, weights=[1.0 / (i + 1) for i in range(len(VOCABULARY))], k=word_count)
+    paragraphs = []
+    for start in range(0, len(words), 120):
+        paragraphs.append(' '.join(words[start:start + 120]).capitalize() + '.')
+    return '\n\n'.join(paragraphs)
+
+def generate_articles(count, seed=42, min_words=200, max_words=3000):
+    """
+    Yield synthetic article rows.
+
+    Args:
+        count: Number of articles to generate
+        seed: Random seed for reproducible runs
+        min_words: Minimum article length in words
+        max_words: Maximum article length in words
+
+    Yields:
+        Tuples of (title, content, summary, url, saved_date, word_count, character_count)
+    """
+    rng = random.Random(seed)
+    base_date = datetime(2020, 1, 1)
+    for i in range(count):
+        title = f'{rng.choice(VOCABULARY).capitalize()} {rng.choice(VOCABULARY)} {i}'
+        # Log-normal-ish lengths: most articles short, a few very long
+        word_count = min(max_words, max(min_words, int(rng.lognormvariate(6.5, 0.8))))
+        content = random_text(rng, word_count)
+        saved_date = (base_date + timedelta(seconds=i * 37)).isoformat(sep=' ')
+        yield (
+            title,
+            content,
+            content[:200],
+            f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
+            saved_date,
+            word_count,
+            len(content),
+        )
+
+# Tag names; like words, a few tags are used far more often than the rest
+TAGS = [f'topic-{i}' for i in range(200)]
+
+def populate(db_path, count, seed=42, batch_size=5000, tags=True, favorite_rate=0.02):
+    """
+    Fill the articles table of an initialized database with synthetic rows.
+
+    Args:
+        db_path: Path to a database created with database.init_db()
+        count: Number of articles to insert
+        seed: Random seed
+        batch_size: Rows per transaction
+        tags: Give articles 0-4 tags from TAGS (Zipf-distributed)
+        favorite_rate: Fraction of articles marked as favorites
+    """
+    conn = sqlite3.connect(db_path)
+    rng = random.Random(seed + 1)
+    if tags:
+        conn.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in TAGS])
+        tag_ids = [row[0] for row in conn.execute('SELECT id FROM tags WHERE name LIKE ? ORDER BY id', ('topic-%',))]
+        tag_weights = [1.0 / (i + 1) for i in range(len(tag_ids))]
+    batch = []
+    for row in generate_articles(count, seed=seed):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _insert_batch(conn, batch, rng, tag_ids if tags else None, tag_weights if tags else None, favorite_rate)
+            batch = []
+    if batch:
+        _insert_batch(conn, batch, rng, tag_ids if tags else None, tag_weights if tags else None, favorite_rate)
+    # Plain inserts skip the app's write paths; index the new rows as the app would at startup
+    database.sync_text_indexes(conn.cursor())
+    conn.commit()
+    conn.close()
+
+def _insert_batch(conn, rows, rng, tag_ids, tag_weights, favorite_rate):
+    conn.executemany('''
+        INSERT INTO articles (title, content, summary, url, saved_date, word_count, character_count, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(*row, database.content_hash(row[1])) for row in rows])
+    # AUTOINCREMENT IDs of one executemany are consecutive
+    last_id = conn.execute('SELECT MAX(id) FROM articles').fetchone()[0]
+    ids = range(last_id - len(rows) + 1, last_id + 1)
+    if tag_ids:
+        links = set()
+        for article_id in ids:
+            for tag_id in rng.choices(tag_ids, weights=tag_weights, k=rng.randint(0, 4)):
+                links.add((article_id, tag_id))
+        conn.executemany('INSERT INTO article_tags (article_id, tag_id) VALUES (?, ?)', sorted(links))
+    if favorite_rate:
+        conn.executemany('INSERT INTO favorites (article_id) VALUES (?)',
+                         [(article_id,) for article_id in ids if rng.random() < favorite_rate])
+    conn.commit()
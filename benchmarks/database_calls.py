@@ -0,0 +1,165 @@
+"""
+Benchmark: latency of each public database function on a synthetic library.
+
+Every function is called --repeat times with arguments drawn from the
+corpus (random IDs, titles, tags and search words); writes run last, on
+articles the benchmark inserts itself. The read cache is cleared before
+each call unless --cache is given, so the numbers measure SQLite work.
+
+Usage:
+    python -m benchmarks.database_calls [--size 10000] [--repeat 200] [--only search_articles get_stats]
+    python -m benchmarks.database_calls --size 1000000 --db /tmp/bench-1m.db --output before.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database
+from benchmarks.corpus import TAGS, VOCABULARY, populate, random_text
+from benchmarks.results import save, summarize
+
+# Functions whose cost grows with the library are called at most this often
+SLOW_REPEAT = 5
+
+def build_cases(rng, max_id):
+    """
+    Return (name, call(i), slow) tuples; call runs one timed operation.
+
+    Writes come last and only touch articles they created.
+    """
+    def article_id():
+        return rng.randint(1, max_id)
+
+    def titles(count):
+        return [title for title in database.get_article_titles(
+            [article_id() for _ in range(count)]).values()]
+
+    def word():
+        return rng.choice(VOCABULARY[:60])
+
+    def deep_cursor():
+        preview = database.get_article_preview(article_id())
+        return database.encode_cursor(preview['saved_date'], preview['id']) if preview else None
+
+    def iterate(count):
+        for done, _ in enumerate(database.iter_articles(batch_size=count), start=1):
+            if done >= count:
+                break
+
+    created = []
+
+    def insert(i):
+        created.append(database.insert_article(f'Benchmark insert {i} {rng.random()}',
+                                               random_text(rng, 800), 'https://example.org'))
+
+    def insert_bulk(i):
+        database.insert_articles_bulk([{"title": f'Benchmark bulk {i}-{n} {rng.random()}',
+                                        "content": random_text(rng, 800), "url": 'https://example.org'}
+                                       for n in range(50)])
+
+    def update(i):
+        target = created[i % len(created)]
+        database.update_article_content(target, random_text(rng, 800), 'https://example.org')
+
+    def retag(i):
+        names = rng.sample(TAGS, 10)
+        database.update_tags_bulk(created[-50:], add=names[:5], remove=names[5:])
+
+    def delete(i):
+        if created:
+            database.delete_article(created.pop())
+
+    return [
+        ("get_article_by_id", lambda i: database.get_article_by_id(article_id()), False),
+        ("get_article_preview", lambda i: database.get_article_preview(article_id()), False),
+        ("get_article_validators", lambda i: database.get_article_validators(article_id()), False),
+        ("get_article_content", lambda i: database.get_article_content(article_id()), False),
+        ("get_article_content (offset 5000)", lambda i: database.get_article_content(article_id(), 5000, 2000), False),
+        ("get_article_sections", lambda i: database.get_article_sections(article_id()), False),
+        ("get_article_section", lambda i: database.get_article_section(article_id(), 0), False),
+        ("get_all_articles", lambda i: database.get_all_articles(50, rng.randint(0, max(0, max_id - 50))), False),
+        ("get_articles_page (first)", lambda i: database.get_articles_page(50), False),
+        ("get_articles_page (deep)", lambda i: database.get_articles_page(50, deep_cursor()), False),
+        ("search_articles", lambda i: database.search_articles(word()), False),
+        ("search_articles (two words)", lambda i: database.search_articles(f'{word()} {word()}'), False),
+        ("get_stats", lambda i: database.get_stats(), False),
+        ("count_articles", lambda i: database.count_articles(), False),
+        ("get_article_tags", lambda i: database.get_article_tags(article_id()), False),
+        ("get_all_tags", lambda i: database.get_all_tags(), False),
+        ("get_articles_by_tag", lambda i: database.get_articles_by_tag(rng.choice(TAGS[:20])), True),
+        ("get_articles_by_tags (any of 3)",
+         lambda i: database.get_articles_by_tags(rng.sample(TAGS[:50], 3)), True),
+        ("get_articles_by_tags (all of 2)",
+         lambda i: database.get_articles_by_tags(rng.sample(TAGS[:10], 2), 'all'), True),
+        ("get_favorites", lambda i: database.get_favorites(), True),
+        ("is_favorite", lambda i: database.is_favorite(article_id()), False),
+        ("get_article_ids_by_title (50)", lambda i: database.get_article_ids_by_title(titles(50)), False),
+        ("get_article_titles (50)", lambda i: database.get_article_titles([article_id() for _ in range(50)]), False),
+        ("get_article_aliases", lambda i: database.get_article_aliases(article_id()), False),
+        ("get_article_revisions", lambda i: database.get_article_revisions(article_id()), False),
+        ("get_near_duplicates", lambda i: database.get_near_duplicates(article_id()), False),
+        ("get_near_duplicate_clusters", lambda i: database.get_near_duplicate_clusters(), True),
+        ("get_compression_stats", lambda i: database.get_compression_stats(), True),
+        ("iter_articles (500)", lambda i: iterate(500), False),
+        ("insert_article", insert, False),
+        ("insert_articles_bulk (50)", insert_bulk, False),
+        ("add_tag", lambda i: database.add_tag(created[i % len(created)], rng.choice(TAGS)), False),
+        ("update_tags_bulk (50 x 5)", retag, False),
+        ("add_favorite", lambda i: database.add_favorite(created[i % len(created)]), False),
+        ("remove_favorite", lambda i: database.remove_favorite(created[i % len(created)]), False),
+        ("update_article_content", update, False),
+        ("delete_article", delete, False),
+    ]
+
+def run(size, repeat, only=None, use_cache=False, db_path=None, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = db_path or os.path.join(tmp, 'bench.db')
+        database.init_db()
+        existing = database.count_articles()
+        if existing < size:
+            start = time.perf_counter()
+            populate(database.DB_PATH, size - existing, seed=seed + existing)
+            print(f'Populated {size - existing} articles in {time.perf_counter() - start:.1f}s')
+        max_id = database.count_articles()
+
+        rng = random.Random(seed)
+        print(f'\n== {max_id} articles, {repeat} calls per function, read cache {"on" if use_cache else "off"} ==')
+        print(f'{"function":<36} {"calls":>6} {"mean ms":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+
+        results = {}
+        for name, call, slow in build_cases(rng, max_id):
+            if only and name.split(' ')[0] not in only:
+                continue
+            samples = []
+            for i in range(min(repeat, SLOW_REPEAT) if slow else repeat):
+                if not use_cache:
+                    database.clear_cache()
+                start = time.perf_counter()
+                call(i)
+                samples.append(time.perf_counter() - start)
+            summary = summarize(samples)
+            results[name] = summary
+            print(f'{name:<36} {summary["count"]:>6} {summary["mean_ms"]:>9.3f} {summary["p50_ms"]:>9.3f} '
+                  f'{summary["p95_ms"]:>9.3f} {summary["p99_ms"]:>9.3f}')
+        return max_id, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000, help='articles in the library (1000 to 1000000)')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--only', nargs='+', help='function names to run (default: all)')
+    parser.add_argument('--cache', action='store_true', help='leave the read cache on between calls')
+    parser.add_argument('--db', help='keep the library in this file and reuse it on later runs')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON (compare runs with benchmarks.compare)')
+    args = parser.parse_args()
+
+    size, results = run(args.size, args.repeat, args.only, args.cache, args.db, args.seed)
+    if args.output:
+        save(args.output, 'database_calls',
+             {"size": size, "repeat": args.repeat, "cache": args.cache, "seed": args.seed}, results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: streaming bulk export throughput and peak memory.
+
+Each format is exported in a fresh process, so the reported peak RSS is the
+export's own footprint and not the corpus generation's. Memory should stay
+flat as the library grows; only EXPORT_BATCH_SIZE articles are held at once.
+SQLite's memory map is off by default here, since every mapped page an
+export touches would otherwise count towards RSS.
+
+Usage:
+    python -m benchmarks.export [--size 100000] [--archives ndjson tar.gz zip]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+import exporter
+from benchmarks.corpus import populate
+
+def peak_rss_mb():
+    # VmHWM is reset by exec, unlike ru_maxrss, which Linux carries over from the parent
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def export_once(db_path, archive_type, format_type, mmap_size):
+    """Drain one streaming export (runs in a child process)."""
+    database.DB_PATH = db_path
+    database.DB_MMAP_SIZE = mmap_size
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    total_bytes = 0
+    for chunk in exporter.stream_export(archive_type, format_type):
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "bytes": total_bytes,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+def run(size, archives, format_type, mmap_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        database.DB_PATH = db_path
+        database.init_db()
+
+        start = time.perf_counter()
+        populate(db_path, size)
+        print(f'\n== {size} articles (populated in {time.perf_counter() - start:.1f}s, '
+              f'batch size {exporter.EXPORT_BATCH_SIZE}) ==')
+        print(f'{"archive":<10} {"seconds":>9} {"articles/s":>11} {"MB out":>9} {"MB/s":>8} '
+              f'{"RSS start":>10} {"RSS peak":>9}')
+
+        context = multiprocessing.get_context('spawn')
+        for archive_type in archives:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(export_once, db_path, archive_type, format_type, mmap_size).result()
+            mb = result['bytes'] / (1024 * 1024)
+            print(f'{archive_type:<10} {result["seconds"]:>9.2f} {size / result["seconds"]:>11.0f} '
+                  f'{mb:>9.1f} {mb / result["seconds"]:>8.1f} '
+                  f'{result["rss_before_mb"]:>9.1f}M {result["peak_rss_mb"]:>8.1f}M')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--archives', nargs='+', default=list(exporter.EXPORT_ARCHIVES),
+                        choices=list(exporter.EXPORT_ARCHIVES))
+    parser.add_argument('--format', default='txt', choices=list(exporter.EXPORT_FORMATS))
+    parser.add_argument('--mmap-size', type=int, default=0,
+                        help='DATABASE_MMAP_SIZE for the export; mapped pages count towards RSS (default: 0)')
+    args = parser.parse_args()
+
+    run(args.size, args.archives, args.format, args.mmap_size)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""
+Load test: drive the Flask app over HTTP with request mixes and report latency percentiles.
+
+The app runs in a child process on a threaded local server, against a
+synthetic library and the stub Wikipedia API (benchmarks.stub_wikipedia),
+so no request leaves the machine. Client threads keep one HTTP/1.1
+connection each and pick operations by the mix's weights.
+
+Usage:
+    python -m benchmarks.load [--size 10000] [--mixes list get search export stats mixed]
+                              [--concurrency 8] [--duration 10] [--output load.json]
+"""
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import database
+from benchmarks import stub_wikipedia
+from benchmarks.corpus import TAGS, VOCABULARY, populate
+from benchmarks.results import save, summarize
+
+# Operation weights per mix
+MIXES = {
+    "list": {"list": 1},
+    "get": {"get": 1},
+    "search": {"search": 1},
+    "export": {"export": 9, "export_bulk": 1},
+    "stats": {"stats": 1},
+    "mixed": {"list": 30, "get": 35, "search": 20, "export": 5, "export_bulk": 1, "stats": 5, "fetch": 4},
+}
+
+def build_request(operation, rng, max_id):
+    """Return (method, path, body, headers) for one operation."""
+    if operation == "list":
+        return 'GET', f'/api/articles?limit=50&offset={rng.randint(0, max(0, max_id - 50))}', None, {}
+    if operation == "get":
+        return 'GET', f'/api/articles/{rng.randint(1, max_id)}', None, {}
+    if operation == "search":
+        body = json.dumps({"query": rng.choice(VOCABULARY[:60])})
+        return 'POST', '/api/search', body, {'Content-Type': 'application/json'}
+    if operation == "export":
+        return 'GET', f'/api/export/{rng.randint(1, max_id)}?format={rng.choice(["txt", "md", "html"])}', None, {}
+    if operation == "export_bulk":
+        # A rarely used tag keeps streamed exports small
+        return 'GET', f'/api/export?archive=ndjson&tag={rng.choice(TAGS[150:])}', None, {}
+    if operation == "stats":
+        return 'GET', '/api/stats', None, {}
+    if operation == "fetch":
+        body = urllib.parse.urlencode({"query": f'Load test page {rng.randint(1, 10 ** 9)}'})
+        return 'POST', '/', body, {'Content-Type': 'application/x-www-form-urlencoded'}
+    raise ValueError(f'Unknown operation: {operation}')
+
+def serve_app(workdir, db_path, api_url, ready):
+    """Run the app on a threaded local server (child process)."""
+    os.chdir(workdir)
+    # This module (and so database) is already imported here: set the path directly
+    database.DB_PATH = db_path
+    os.environ['WIKIPEDIA_API_URL'] = api_url
+    os.environ['JOB_WORKERS'] = '0'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    from werkzeug.serving import make_server
+    import app as wikifetch
+
+    server = make_server('127.0.0.1', 0, wikifetch.app, threaded=True)
+    ready.put(server.server_port)
+    server.serve_forever()
+
+def client(port, weights, max_id, deadline, seed, samples, lock):
+    rng = random.Random(seed)
+    operations = list(weights)
+    operation_weights = [weights[name] for name in operations]
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    local = []
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights=operation_weights)[0]
+        method, path, body, headers = build_request(operation, rng, max_id)
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            status = None
+        local.append((operation, time.perf_counter() - start, status))
+    connection.close()
+    with lock:
+        samples.extend(local)
+
+def run_mix(port, mix, max_id, concurrency, duration, warmup, seed):
+    weights = MIXES[mix]
+    # The warm-up run's samples are discarded
+    for seconds in (warmup, duration):
+        if not seconds:
+            continue
+        samples = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(port, weights, max_id, deadline, seed + n, samples, lock))
+                   for n in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    errors = sum(1 for _, _, status in samples if status is None or status >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "latency": summarize([latency for _, latency, _ in samples]),
+        "operations": {operation: summarize([latency for name, latency, _ in samples if name == operation])
+                       for operation in weights}
+    }
+
+def run(size, mixes, concurrency, duration, warmup, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        database.DB_PATH = db_path
+        database.init_db()
+        start = time.perf_counter()
+        populate(db_path, size, seed=seed)
+        print(f'Populated {size} articles in {time.perf_counter() - start:.1f}s')
+
+        stub_server, api_url = stub_wikipedia.serve(stub_wikipedia.StubWikipedia(seed=seed))
+        context = multiprocessing.get_context('spawn')
+        ready = context.Queue()
+        server = context.Process(target=serve_app, args=(tmp, db_path, api_url, ready), daemon=True)
+        server.start()
+        try:
+            port = ready.get(timeout=60)
+            print(f'\n== {size} articles, {concurrency} clients, {duration}s per mix ==')
+            print(f'{"mix":<8} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+            results = {}
+            for mix in mixes:
+                result = run_mix(port, mix, size, concurrency, duration, warmup, seed)
+                results[mix] = result
+                latency = result['latency']
+                print(f'{mix:<8} {result["requests"]:>9} {result["errors"]:>7} {result["throughput_rps"]:>9.1f} '
+                      f'{latency["p50_ms"] or 0:>9.2f} {latency["p95_ms"] or 0:>9.2f} {latency["p99_ms"] or 0:>9.2f}')
+            print(f'Stub Wikipedia requests: {stub_server.stub.request_count}')
+            return results
+        finally:
+            server.terminate()
+            server.join()
+            stub_server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--mixes', nargs='+', default=list(MIXES), choices=list(MIXES))
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10, help='measured seconds per mix')
+    parser.add_argument('--warmup', type=float, default=1, help='unmeasured seconds before each mix')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON (compare runs with benchmarks.compare)')
+    args = parser.parse_args()
+
+    results = run(args.size, args.mixes, args.concurrency, args.duration, args.warmup, args.seed)
+    if args.output:
+        save(args.output, 'load', {"size": args.size, "concurrency": args.concurrency, "duration": args.duration,
+                                   "warmup": args.warmup, "seed": args.seed}, results)
+
+if __name__ == '__main__':
+    main()
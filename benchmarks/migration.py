@@ -0,0 +1,90 @@
+"""
+Benchmark: streaming, parallel file migration vs the previous per-file loop.
+
+Generates synthetic legacy .txt files, then times both the import and the
+/migration-status check for each implementation.
+
+Usage:
+    python -m benchmarks.migration [--files 50000] [--workers N] [--skip-legacy]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database
+import ingest
+from benchmarks.corpus import random_text
+
+def write_files(directory, count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        title = f'Synthetic article {i}'
+        body = random_text(rng, rng.randint(100, 1500))
+        with open(os.path.join(directory, f"{title.replace(' ', '_')}.txt"), 'w', encoding='utf-8') as f:
+            f.write(f'Title: {title}\n\n{body}')
+
+def legacy_migrate(directory, files):
+    """The pre-engine /migrate loop: read fully, one insert_article per file."""
+    success = 0
+    for file_name in files:
+        with open(os.path.join(directory, file_name), 'r', encoding='utf-8') as f:
+            content = f.read()
+        title, body = content.split('\n\n', 1)
+        title = title.replace('Title: ', '').strip()
+        try:
+            database.insert_article(title, body.strip(), f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}")
+            success += 1
+        except ValueError:
+            pass
+    return success
+
+def legacy_status(directory):
+    """The pre-manifest /migration-status: listdir plus a set of every title."""
+    txt_files = [f for f in os.listdir(directory) if f.endswith('.txt')]
+    conn = database.get_db_connection()
+    db_titles = {row['title'] for row in conn.execute('SELECT title FROM articles').fetchall()}
+    conn.close()
+    return sum(1 for f in txt_files if f.replace('.txt', '').replace('_', ' ') not in db_titles)
+
+def fresh_db(tmp, name):
+    database.DB_PATH = os.path.join(tmp, name)
+    database.init_db()
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f'{label:<40} {time.perf_counter() - start:>9.2f}s')
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=ingest.MIGRATION_WORKERS)
+    parser.add_argument('--skip-legacy', action='store_true', help='only run the new engine')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'downloaded_data')
+        os.makedirs(directory)
+        timed(f'generate {args.files} files', write_files, directory, args.files)
+        files = sorted(f for f in os.listdir(directory) if f.endswith('.txt'))
+
+        print(f'\n== streaming engine ({args.workers} workers) ==')
+        fresh_db(tmp, 'engine.db')
+        result = timed('migrate', ingest.migrate_files, files, directory, workers=args.workers)
+        print(f"{'imported':<40} {result['success_count']:>10}")
+        status = timed('migration status', ingest.get_migration_status, directory)
+        print(f"{'unmigrated after import':<40} {len(status['unmigrated']):>10}")
+
+        if not args.skip_legacy:
+            print('\n== legacy per-file loop ==')
+            fresh_db(tmp, 'legacy.db')
+            imported = timed('migrate', legacy_migrate, directory, files)
+            print(f"{'imported':<40} {imported:>10}")
+            remaining = timed('migration status', legacy_status, directory)
+            print(f"{'unmigrated after import':<40} {remaining:>10}")
+
+if __name__ == '__main__':
+    main()
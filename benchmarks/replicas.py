@@ -0,0 +1,162 @@
+"""
+Load test: read-only replicas serving reads while new snapshots are swapped in.
+
+A primary and --replicas read-only replicas (DATABASE_READ_ONLY=1) run in
+child processes on threaded local servers. The replicas share one
+snapshot file, as they would on a shared volume. Client threads spread
+over the replicas send a read mix, while this process keeps saving new
+articles on the primary and installing a fresh snapshot from the
+primary's /api/snapshot every --swap-every seconds (python -m snapshot
+install does the same). Reported are latency, throughput and errors
+(there should be none: requests in flight finish on the old snapshot),
+and how long each swap took to show up on the replicas.
+
+Usage:
+    python -m benchmarks.replicas [--size 10000] [--replicas 2] [--concurrency 8]
+                                  [--duration 10] [--swap-every 2] [--output replicas.json]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import database
+import snapshot
+from benchmarks.corpus import populate
+from benchmarks.load import client, serve_app
+from benchmarks.results import save, summarize
+
+# Operation weights (reads only; see benchmarks.load.build_request)
+READ_MIX = {"list": 30, "get": 35, "search": 20, "export": 5, "stats": 5}
+
+def serve_replica(workdir, db_path, check_seconds, ready):
+    """Run the app read-only on a threaded local server (child process)."""
+    database.DB_READ_ONLY = True
+    database.SNAPSHOT_CHECK_SECONDS = check_seconds
+    # Replicas never fetch from Wikipedia
+    serve_app(workdir, db_path, 'http://127.0.0.1:9', ready)
+
+def serve_primary(workdir, db_path, ready):
+    """Run the app with /api/snapshot enabled on a threaded local server (child process)."""
+    database.SNAPSHOT_ENDPOINT = True
+    serve_app(workdir, db_path, 'http://127.0.0.1:9', ready)
+
+def article_count(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        connection.request('GET', '/api/stats')
+        return json.loads(connection.getresponse().read())['total_articles']
+    finally:
+        connection.close()
+
+def ship_snapshots(primary_port, replica_ports, replica_path, swap_every, deadline, swaps):
+    """Save articles on the primary and install a new snapshot every swap_every seconds."""
+    source = f'http://127.0.0.1:{primary_port}/api/snapshot'
+    batch = 0
+    while time.perf_counter() + swap_every < deadline:
+        time.sleep(swap_every)
+        batch += 1
+        database.insert_articles_bulk([
+            {"title": f'Replica batch {batch} article {n}', "content": f'Shipped in snapshot {batch}, article {n}.',
+             "url": f'https://example.org/replica/{batch}/{n}'}
+            for n in range(10)])
+        start = time.perf_counter()
+        installed = snapshot.install(source, replica_path)
+        shipped = time.perf_counter() - start
+        # Time until every replica answers from the new snapshot
+        while any(article_count(port) != installed['articles'] for port in replica_ports):
+            time.sleep(0.01)
+        swaps.append({"ship_seconds": shipped, "visible_seconds": time.perf_counter() - start - shipped,
+                      "bytes": installed['bytes']})
+
+def run(size, replicas, concurrency, duration, swap_every, check_seconds, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'primary.db')
+        replica_path = os.path.join(tmp, 'replica', 'wikifetch.db')
+        database.DB_PATH = db_path
+        database.init_db()
+        start = time.perf_counter()
+        populate(db_path, size, seed=seed)
+        print(f'Populated {size} articles in {time.perf_counter() - start:.1f}s')
+        snapshot.create(replica_path)
+
+        context = multiprocessing.get_context('spawn')
+        ready = context.Queue()
+        servers = [context.Process(target=serve_primary, args=(tmp, db_path, ready), daemon=True)]
+        servers += [context.Process(target=serve_replica, args=(tmp, replica_path, check_seconds, ready), daemon=True)
+                    for _ in range(replicas)]
+        try:
+            # The primary reports first; replica start order does not matter
+            servers[0].start()
+            primary_port = ready.get(timeout=60)
+            for server in servers[1:]:
+                server.start()
+            replica_ports = [ready.get(timeout=60) for _ in range(replicas)]
+
+            samples = []
+            swaps = []
+            lock = threading.Lock()
+            started = time.perf_counter()
+            deadline = started + duration
+            threads = [threading.Thread(target=client, args=(replica_ports[n % replicas], READ_MIX, size, deadline,
+                                                             seed + n, samples, lock))
+                       for n in range(concurrency)]
+            threads.append(threading.Thread(target=ship_snapshots, args=(primary_port, replica_ports, replica_path,
+                                                                         swap_every, deadline, swaps)))
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            for server in servers:
+                server.terminate()
+                server.join()
+
+        errors = sum(1 for _, _, status in samples if status is None or status >= 400)
+        result = {
+            "requests": len(samples),
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            "latency": summarize([latency for _, latency, _ in samples]),
+            "swaps": len(swaps),
+            "ship": summarize([swap['ship_seconds'] for swap in swaps]),
+            "visible": summarize([swap['visible_seconds'] for swap in swaps]),
+        }
+        latency = result['latency']
+        print(f'\n== {size} articles, {replicas} replicas, {concurrency} clients, {duration}s ==')
+        print(f'{"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9} '
+              f'{"swaps":>6} {"ship ms":>9} {"visible ms":>11}')
+        print(f'{result["requests"]:>9} {errors:>7} {result["throughput_rps"]:>9.1f} '
+              f'{latency["p50_ms"] or 0:>9.2f} {latency["p99_ms"] or 0:>9.2f} {len(swaps):>6} '
+              f'{result["ship"]["p50_ms"] or 0:>9.1f} {result["visible"]["p50_ms"] or 0:>11.1f}')
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--replicas', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--swap-every', type=float, default=2, help='seconds between snapshots')
+    parser.add_argument('--check-seconds', type=float, default=database.SNAPSHOT_CHECK_SECONDS,
+                        help="replicas' SNAPSHOT_CHECK_SECONDS")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON (compare runs with benchmarks.compare)')
+    args = parser.parse_args()
+
+    result = run(args.size, args.replicas, args.concurrency, args.duration, args.swap_every,
+                 args.check_seconds, args.seed)
+    if args.output:
+        save(args.output, 'replicas', {"size": args.size, "replicas": args.replicas,
+                                       "concurrency": args.concurrency, "duration": args.duration,
+                                       "swap_every": args.swap_every, "check_seconds": args.check_seconds,
+                                       "seed": args.seed}, {"reads": result})
+
+if __name__ == '__main__':
+    main()
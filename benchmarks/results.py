@@ -0,0 +1,62 @@
+"""Latency summaries and JSON result files shared by the benchmarks."""
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+def summarize(samples):
+    """
+    Summarize latency samples given in seconds.
+
+    Returns:
+        Dictionary with count, mean_ms, p50_ms, p95_ms, p99_ms and max_ms
+    """
+    if not samples:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ms = sorted(sample * 1000 for sample in samples)
+    if len(ms) > 1:
+        cuts = statistics.quantiles(ms, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ms[0]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(p50, 4),
+        "p95_ms": round(p95, 4),
+        "p99_ms": round(p99, 4),
+        "max_ms": round(ms[-1], 4)
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment():
+    """Describe the machine and build a result was measured on."""
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+def save(path, benchmark, params, results):
+    """Write a result file that benchmarks.compare can diff against another run."""
+    document = {"benchmark": benchmark, "environment": environment(), "params": params, "results": results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+    print(f'\nResults written to {path}')
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
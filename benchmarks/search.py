@@ -0,0 +1,70 @@
+"""
+Benchmark: FTS5 search vs the previous LIKE '%q%' scan.
+
+Usage:
+    python -m benchmarks.search [--sizes 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import database
+from benchmarks.corpus import populate
+
+QUERIES = ['python', 'injection', 'railway bridge', 'galaxy', 'word1500', 'nonexistentterm']
+
+def like_search(db_path, query):
+    """The pre-FTS implementation of database.search_articles."""
+    pattern = f'%{query}%'
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('''
+        SELECT id, title, summary, url, word_count, saved_date,
+               CASE WHEN title LIKE ? THEN 2 ELSE 1 END as relevance_score
+        FROM articles
+        WHERE title LIKE ? OR content LIKE ?
+        ORDER BY relevance_score DESC, saved_date DESC
+    ''', (pattern, pattern, pattern)).fetchall()
+    conn.close()
+    return rows
+
+def time_call(func, query, repeat):
+    """Return the median latency in milliseconds and the result count."""
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(func(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), count
+
+def run(size, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        database.DB_PATH = db_path
+        database.init_db()
+
+        start = time.perf_counter()
+        populate(db_path, size)
+        print(f'\n== {size} articles (populated in {time.perf_counter() - start:.1f}s) ==')
+        print(f'{"query":<20} {"LIKE ms":>10} {"FTS5 ms":>10} {"speedup":>9} {"hits":>8}')
+
+        for query in QUERIES:
+            like_ms, like_hits = time_call(lambda q: like_search(db_path, q), query, repeat)
+            fts_ms, fts_hits = time_call(database.search_articles, query, repeat)
+            speedup = like_ms / fts_ms if fts_ms else float('inf')
+            print(f'{query:<20} {like_ms:>10.2f} {fts_ms:>10.2f} {speedup:>8.1f}x {fts_hits:>8}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.repeat)
+
+if __name__ == '__main__':
+    main()
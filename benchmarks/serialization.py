@@ -0,0 +1,131 @@
+"""
+Benchmark: CPU time and allocations of serializing list endpoint results.
+
+Compares the old path (sqlite3.Row -> dict per row, then Flask's jsonify)
+with the streaming path (row tuples -> jsonstream, a batch at a time) for
+favorites, tag and search results of every article in a synthetic library.
+The streaming path is measured with orjson and with the standard library
+encoder. CPU time is process time; allocations are tracemalloc's peak
+above the starting point. Both are reported per 10k rows. The read cache
+is cleared before each call.
+
+Usage:
+    python -m benchmarks.serialization [--size 10000] [--repeat 10] [--output serialization.json]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from flask import Flask
+
+import database
+import jsonstream
+from benchmarks.corpus import VOCABULARY, populate
+from benchmarks.results import save, summarize
+
+def build_cases():
+    """Return (name, list key, old call, streaming call) tuples."""
+    word = VOCABULARY[0]
+    return [
+        ("favorites", "favorites", database.get_favorites, database.stream_favorites),
+        ("tag", "articles", lambda: database.get_articles_by_tag('benchmark'),
+         lambda: database.stream_articles_by_tag('benchmark')),
+        ("tags (all)", "articles", lambda: database.get_articles_by_tags(['benchmark', 'everything'], 'all'),
+         lambda: database.stream_articles_by_tags(['benchmark', 'everything'], 'all')),
+        ("search", "results", lambda: database.search_articles(word), lambda: database.stream_search_results(word)),
+    ]
+
+def run_old(app, key, call):
+    rows = call()
+    with app.app_context():
+        body = app.json.response({key: rows, "count": len(rows)}).get_data()
+    return len(rows), len(body)
+
+def run_streaming(key, call):
+    size = 0
+    for chunk in jsonstream.stream_list(key, call()):
+        size += len(chunk)
+    return size
+
+def measure(call, repeat):
+    """Return (process seconds samples, peak allocated bytes, call result)."""
+    samples = []
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        database.clear_cache()
+        start = time.process_time()
+        result = call()
+        samples.append(time.process_time() - start)
+    # Allocations are traced on a separate run: tracing slows everything down
+    database.clear_cache()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    call()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return samples, peak, result
+
+def run(size, repeat, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_db()
+        start = time.perf_counter()
+        populate(database.DB_PATH, size, seed=seed, tags=False, favorite_rate=1.0)
+        ids = list(range(1, database.count_articles() + 1))
+        database.update_tags_bulk(ids, add=['benchmark', 'everything'])
+        print(f'Populated {size} articles in {time.perf_counter() - start:.1f}s')
+
+        # jsonify only needs an app's JSON provider, not the WikiFetch app itself
+        flask_app = Flask(__name__)
+        encoder = 'orjson' if jsonstream.orjson is not None else 'json'
+        print(f'\n== {size} articles, {repeat} runs, figures per 10k rows ==')
+        print(f'{"result":<12} {"path":<22} {"rows":>7} {"KiB":>8} {"cpu ms":>9} {"peak MiB":>9}')
+
+        results = {}
+        for name, key, old, streaming in build_cases():
+            paths = [("rows + jsonify", lambda: run_old(flask_app, key, old))]
+            paths.append((f"streaming ({encoder})", lambda: run_streaming(key, streaming)))
+            if jsonstream.orjson is not None:
+                paths.append(("streaming (json)", lambda: _without_orjson(run_streaming, key, streaming)))
+
+            results[name] = {}
+            rows = None
+            for label, call in paths:
+                samples, peak, result = measure(call, repeat)
+                if rows is None:
+                    rows, body_size = result
+                else:
+                    body_size = result
+                scale = 10000 / rows if rows else 0
+                summary = summarize([sample * scale for sample in samples])
+                summary["peak_mib"] = round(peak * scale / 2 ** 20, 3)
+                summary["rows"] = rows
+                results[name][label] = summary
+                print(f'{name:<12} {label:<22} {rows:>7} {body_size / 1024:>8.0f} '
+                      f'{summary["p50_ms"]:>9.1f} {summary["peak_mib"]:>9.2f}')
+        return results
+
+def _without_orjson(func, *args):
+    saved, jsonstream.orjson = jsonstream.orjson, None
+    try:
+        return func(*args)
+    finally:
+        jsonstream.orjson = saved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON (compare runs with benchmarks.compare)')
+    args = parser.parse_args()
+
+    results = run(args.size, args.repeat, args.seed)
+    if args.output:
+        save(args.output, 'serialization', {"size": args.size, "repeat": args.repeat, "seed": args.seed}, results)
+
+if __name__ == '__main__':
+    main()
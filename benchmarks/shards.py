@@ -0,0 +1,109 @@
+"""
+Benchmark: write throughput and scatter-gather read latency, 1 vs N shards.
+
+For each shard count a fresh library is filled by --writers threads
+saving batches with database.insert_articles_bulk at the same time, so
+writers to different shards stop queueing on one SQLite write lock. Then
+library-wide reads (search, first list page, deep OFFSET page, tag
+listing, stats) and single-article reads are timed with the read cache
+cleared before every call, so each one reaches the shards.
+
+On one shard all of it is plain SQLite; with more shards the difference
+is the cost (or gain) of fanning out and merging. Parallel reads only pay
+off with CPU cores to spare; see DATABASE_SHARD_THREADS.
+
+Usage:
+    python -m benchmarks.shards [--size 20000] [--shards 1 4] [--writers 4] [--queries 200] [--output shards.json]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import database
+from benchmarks.corpus import TAGS, VOCABULARY, generate_articles
+from benchmarks.results import save, summarize
+
+def fill(size, writers, batch_size, seed):
+    """Save size articles from several threads at once; return articles per second."""
+    articles = [{"title": title, "content": content, "url": url}
+                for title, content, _, url, _, _, _ in generate_articles(size, seed=seed)]
+    batches = [articles[start:start + batch_size] for start in range(0, size, batch_size)]
+    rng = random.Random(seed)
+    tags = [[rng.choice(TAGS[:20])] for _ in batches]
+    next_batch = iter(range(len(batches)))
+    lock = threading.Lock()
+
+    def writer():
+        while True:
+            with lock:
+                index = next(next_batch, None)
+            if index is None:
+                return
+            database.insert_articles_bulk(batches[index], tags=tags[index])
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return size / (time.perf_counter() - start)
+
+def time_uncached(call, arguments):
+    samples = []
+    for argument in arguments:
+        database.clear_cache()
+        start = time.perf_counter()
+        call(argument)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def run(shards, size, writers, batch_size, queries, seed):
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'wikifetch.db')
+        database.DB_SHARDS = shards
+        database.init_db()
+        result = {"write_articles_per_s": round(fill(size, writers, batch_size, seed), 1)}
+
+        rng = random.Random(seed)
+        ids = list(database.get_article_titles())
+        words = [rng.choice(VOCABULARY[:45]) for _ in range(queries)]
+        result["search"] = time_uncached(database.search_articles, words)
+        result["list_first_page"] = time_uncached(lambda _: database.get_articles_page(50), range(queries))
+        result["list_offset_1000"] = time_uncached(lambda _: database.get_all_articles(50, 1000), range(queries))
+        result["tag_articles"] = time_uncached(database.get_articles_by_tag, rng.choices(TAGS[:20], k=queries))
+        result["stats"] = time_uncached(lambda _: database.get_stats(), range(queries))
+        result["get_article"] = time_uncached(database.get_article_by_id, rng.choices(ids, k=queries))
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON (compare runs with benchmarks.compare)')
+    args = parser.parse_args()
+
+    results = {}
+    print(f'{"shards":>6} {"writes/s":>9} {"search p50":>11} {"page p50":>9} {"offset p50":>11} '
+          f'{"tag p50":>9} {"stats p50":>10} {"get p50":>9}')
+    for shards in args.shards:
+        result = run(shards, args.size, args.writers, args.batch_size, args.queries, args.seed)
+        results[str(shards)] = result
+        print(f'{shards:>6} {result["write_articles_per_s"]:>9.0f} {result["search"]["p50_ms"]:>9.2f}ms '
+              f'{result["list_first_page"]["p50_ms"]:>7.2f}ms {result["list_offset_1000"]["p50_ms"]:>9.2f}ms '
+              f'{result["tag_articles"]["p50_ms"]:>7.2f}ms {result["stats"]["p50_ms"]:>8.2f}ms '
+              f'{result["get_article"]["p50_ms"]:>7.3f}ms')
+    if args.output:
+        save(args.output, 'shards', {"size": args.size, "shards": args.shards, "writers": args.writers,
+                                     "batch_size": args.batch_size, "queries": args.queries, "seed": args.seed},
+             results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Local stand-in for the MediaWiki API, for benchmarks and offline testing.
+
+Serves the subset of `action=query` used by fetcher.py from an in-memory
+page table. Point the app at it with:
+
+    python -m benchmarks.stub_wikipedia --port 8765
+    WIKIPEDIA_API_URL=http://127.0.0.1:8765/w/api.php python app.py
+
+Unknown titles are generated on the fly unless --strict is given, so any
+query resolves to a synthetic article.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import random_text
+
+class StubWikipedia:
+    """
+    In-memory page table plus behaviour knobs for the stub server.
+
+    Args:
+        pages: Optional dict of title -> content
+        disambiguations: Optional dict of title -> list of option titles
+        redirects: Optional dict of alias title -> target title
+        latency: Seconds to sleep before answering each request
+        fail_rate: Fraction of requests answered with HTTP 503
+        strict: If True, unknown titles are reported missing
+    """
+
+    def __init__(self, pages=None, disambiguations=None, redirects=None,
+                 latency=0.0, fail_rate=0.0, strict=False, seed=1):
+        self.pages = dict(pages or {})
+        self.disambiguations = dict(disambiguations or {})
+        self.redirects = dict(redirects or {})
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.strict = strict
+        self.request_count = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def content_for(self, title):
+        with self._lock:
+            if title not in self.pages:
+                if self.strict:
+                    return None
+                lead = f'{title} is a synthetic article served by the stub API.'
+                body = random_text(self._rng, self._rng.randint(200, 2000))
+                self.pages[title] = f'{lead}\n\n\n== History ==\n{body}'
+            return self.pages[title]
+
+    def page(self, title):
+        title = title[:1].upper() + title[1:]
+        target = self.redirects.get(title, title)
+        url = f"https://en.wikipedia.org/wiki/{urllib.parse.quote(target.replace(' ', '_'))}"
+        if target in self.disambiguations:
+            return {"title": target, "fullurl": url, "extract": f'{target} may refer to:',
+                    "pageprops": {"disambiguation": ""}}
+        content = self.content_for(target)
+        if content is None:
+            return {"title": target, "missing": True}
+        return {"title": target, "fullurl": url, "extract": content}
+
+    def handle(self, params):
+        """Return the JSON response for one API call."""
+        if params.get('list') == 'search':
+            query = params.get('srsearch', '')
+            hits = [t for t in self.pages if query.lower() in t.lower()][:1]
+            if not hits and not self.strict:
+                hits = [query]
+            return {"query": {"search": [{"title": t} for t in hits]}}
+
+        title = params.get('titles', '')
+        if params.get('prop') == 'links':
+            options = self.disambiguations.get(title, [])
+            return {"query": {"pages": [{"title": title, "links": [{"title": o} for o in options]}]}}
+        return {"query": {"pages": [self.page(title)]}}
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with stub._lock:
+                stub.request_count += 1
+                fail = stub._rng.random() < stub.fail_rate
+            if stub.latency:
+                time.sleep(stub.latency)
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+            body = json.dumps(stub.handle(params)).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(stub=None, host='127.0.0.1', port=0):
+    """
+    Start the stub server on a background thread.
+
+    Returns:
+        (server, api_url); call server.shutdown() when finished
+    """
+    stub = stub or StubWikipedia()
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    server.stub = stub
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/w/api.php'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--strict', action='store_true')
+    args = parser.parse_args()
+
+    stub = StubWikipedia(latency=args.latency, fail_rate=args.fail_rate, strict=args.strict)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    print(f'Stub Wikipedia API on http://{args.host}:{args.port}/w/api.php')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: title suggestion latency, build time and memory at 10k to 1M titles.
+
+The index is loaded straight from synthetic titles (no database), then
+queried with prefixes of existing titles (1 to 12 characters) and, for
+fuzzy matching, with 6 to 14 character prefixes after one or two random
+typos (never in the first character). The fuzzy hit rate is the share of
+those queries with a suggestion that starts with the prefix as it was
+before the typos. Insert and delete patches are timed on the built index
+as well. Memory is the growth of the process RSS while the index is built.
+
+The synthetic titles share a small vocabulary, which makes them far more
+crowded than real titles; fuzzy figures here are a worst case.
+
+Usage:
+    python -m benchmarks.suggest [--sizes 10000 100000 1000000] [--queries 2000] [--output suggest.json]
+"""
+import argparse
+import gc
+import os
+import random
+import string
+import time
+
+import suggest
+from benchmarks.corpus import VOCABULARY
+from benchmarks.results import save, summarize
+
+def synthetic_titles(count, seed):
+    """Yield (id, title) pairs: one to four corpus words, some with a qualifier, all distinct."""
+    rng = random.Random(seed)
+    qualifiers = ['(film)', '(album)', '(river)', '(disambiguation)', 'of Europe', 'in the 19th century']
+    for article_id in range(1, count + 1):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(1, 4))]
+        title = ' '.join(words).capitalize()
+        if rng.random() < 0.3:
+            title += ' ' + rng.choice(qualifiers)
+        yield article_id, f'{title} {article_id}'
+
+def typo(rng, text, edits):
+    """Apply random substitutions, deletions, insertions or transpositions."""
+    chars = list(text)
+    for _ in range(edits):
+        position = rng.randrange(1, max(2, len(chars)))
+        kind = rng.choice(('substitute', 'delete', 'insert', 'transpose'))
+        if kind == 'substitute' and position < len(chars):
+            chars[position] = rng.choice(string.ascii_lowercase)
+        elif kind == 'delete' and position < len(chars):
+            del chars[position]
+        elif kind == 'transpose' and position < len(chars) - 1:
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+        else:
+            chars.insert(position, rng.choice(string.ascii_lowercase))
+    return ''.join(chars)
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+def time_calls(call, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def run_size(size, query_count, seed):
+    rng = random.Random(seed)
+    titles = list(synthetic_titles(size, seed))
+    gc.collect()
+    rss_before = rss_mb()
+    index = suggest.TitleIndex()
+    start = time.perf_counter()
+    index.load(titles)
+    build_seconds = time.perf_counter() - start
+    memory_mb = rss_mb() - rss_before
+
+    sample = [suggest.normalize(title) for _, title in rng.sample(titles, query_count)]
+    prefixes = [text[:rng.randint(1, 12)] for text in sample]
+    intended = [text[:rng.randint(6, 14)] for text in sample]
+    misspelled = [typo(rng, text, rng.randint(1, 2)) for text in intended]
+    limit = suggest.SUGGEST_LIMIT
+
+    result = {"build_seconds": round(build_seconds, 3), "memory_mb": round(memory_mb, 1)}
+    result["prefix"] = time_calls(lambda query: index.prefix(query, limit), prefixes)
+    result["fuzzy"] = time_calls(
+        lambda query: index.fuzzy(query, limit, suggest.allowed_edits(query)), misspelled)
+    hits = sum(1 for query, text in zip(misspelled, intended)
+               if any(suggest.normalize(title).startswith(text) for title, _, _ in
+                      index.fuzzy(query, limit, suggest.allowed_edits(query))))
+    result["fuzzy_hit_rate"] = round(hits / len(sample), 3)
+
+    # Patches: insert new titles, then delete them again
+    new_ids = list(range(size + 1, size + 1 + min(query_count, 500)))
+    extra = {article_id: [f'Benchmark insert {article_id}'] for article_id in new_ids}
+    result["insert"] = time_calls(
+        lambda article_id: index._patch([article_id], [(article_id, extra[article_id][0])]), new_ids)
+    result["delete"] = time_calls(lambda article_id: index._patch([article_id], []), new_ids)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON (compare runs with benchmarks.compare)')
+    args = parser.parse_args()
+
+    results = {}
+    print(f'{"titles":>9} {"build s":>8} {"MB":>7} {"prefix p50":>11} {"prefix p99":>11} '
+          f'{"fuzzy p50":>10} {"fuzzy p99":>10} {"hits":>7} {"insert p50":>11}')
+    for size in args.sizes:
+        result = run_size(size, min(args.queries, size), args.seed)
+        results[str(size)] = result
+        print(f'{size:>9} {result["build_seconds"]:>8.2f} {result["memory_mb"]:>7.0f} '
+              f'{result["prefix"]["p50_ms"]:>9.4f}ms {result["prefix"]["p99_ms"]:>9.4f}ms '
+              f'{result["fuzzy"]["p50_ms"]:>8.3f}ms {result["fuzzy"]["p99_ms"]:>8.3f}ms '
+              f'{result["fuzzy_hit_rate"]:>7.2f} {result["insert"]["p50_ms"]:>9.4f}ms')
+    if args.output:
+        save(args.output, 'suggest', {"sizes": args.sizes, "queries": args.queries, "seed": args.seed}, results)
+
+if __name__ == '__main__':
+    main()
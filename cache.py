@@ -0,0 +1,158 @@
+import copy
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Read cache configuration (all overridable through environment variables)
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 300))
+# Share invalidations between processes (gunicorn workers) through the database
+CACHE_SHARED = os.getenv('CACHE_SHARED', '1') == '1'
+CACHE_SYNC_SECONDS = float(os.getenv('CACHE_SYNC_SECONDS', 1))
+
+# Returned by ByteLRUCache.get() when there is no usable entry
+MISS = object()
+
+def estimate_size(value):
+    """Approximate the memory held by a cached value (dicts, lists and scalars)."""
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class ByteLRUCache:
+    """
+    Thread-safe LRU cache bounded by the approximate size of its values.
+
+    Entries are grouped by namespace so a whole namespace (e.g. every cached
+    search) can be dropped at once, and expire after a TTL. Values are copied
+    on the way in and out, so callers may mutate what they get back.
+
+    Every invalidation advances a generation stamp. A value loaded before an
+    invalidation is refused by put(), so a slow reader cannot store data that
+    a concurrent write has already replaced.
+
+    Args:
+        max_bytes: Size budget; 0 disables the cache
+        ttl: Seconds an entry stays valid (0 for no expiry)
+    """
+
+    def __init__(self, max_bytes, ttl=0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._namespaces = {}
+        self._bytes = 0
+        self._stamp = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def stamp(self):
+        """Return the current generation; pass it to put() with values loaded afterwards."""
+        return self._stamp
+
+    def get(self, namespace, key):
+        """Return a copy of the cached value, or MISS."""
+        if not self.enabled:
+            return MISS
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self.misses += 1
+                return MISS
+            value, size, expires = entry
+            if expires and expires < time.monotonic():
+                self._remove((namespace, key))
+                self.expirations += 1
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end((namespace, key))
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, namespace, key, value, stamp=None):
+        """
+        Store a value, evicting least recently used entries to stay in budget.
+
+        Returns:
+            True if stored; False if the cache is off, the value is too large
+            (over a quarter of the budget) or an invalidation happened since stamp
+        """
+        if not self.enabled:
+            return False
+        size = estimate_size(value)
+        if size > self.max_bytes // 4:
+            return False
+        value = copy.deepcopy(value)
+        expires = time.monotonic() + self.ttl if self.ttl else 0
+
+        with self._lock:
+            if stamp is not None and stamp != self._stamp:
+                return False
+            if (namespace, key) in self._entries:
+                self._remove((namespace, key))
+            self._entries[(namespace, key)] = (value, size, expires)
+            self._namespaces.setdefault(namespace, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, namespace, key=None):
+        """Drop one entry, or the whole namespace when key is None."""
+        with self._lock:
+            self._stamp += 1
+            self.invalidations += 1
+            if key is None:
+                for cached_key in list(self._namespaces.get(namespace, ())):
+                    self._remove((namespace, cached_key))
+            elif (namespace, key) in self._entries:
+                self._remove((namespace, key))
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._stamp += 1
+            self._entries.clear()
+            self._namespaces.clear()
+            self._bytes = 0
+
+    def _remove(self, full_key):
+        _, size, _ = self._entries.pop(full_key)
+        self._bytes -= size
+        keys = self._namespaces.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key[1])
+            if not keys:
+                del self._namespaces[full_key[0]]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
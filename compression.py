@@ -0,0 +1,126 @@
+import difflib
+import json
+import os
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content compression configuration
+# CONTENT_COMPRESSION: 'auto' (zstd when installed, else zlib), 'zstd', 'zlib' or 'none'
+CONTENT_COMPRESSION = os.getenv('CONTENT_COMPRESSION', 'auto')
+CONTENT_COMPRESSION_MIN_BYTES = int(os.getenv('CONTENT_COMPRESSION_MIN_BYTES', 1024))
+CONTENT_COMPRESSION_LEVEL = int(os.getenv('CONTENT_COMPRESSION_LEVEL', 6))
+
+# Only keep the compressed form if it saves at least this much
+MAX_USEFUL_RATIO = 0.9
+
+# zstd (de)compressor objects are not thread-safe; keep one per thread
+_local = threading.local()
+
+def preferred_codec():
+    """Return the codec new rows should use, or None when compression is off."""
+    if CONTENT_COMPRESSION == 'none':
+        return None
+    if CONTENT_COMPRESSION in ('auto', 'zstd') and zstandard is not None:
+        return 'zstd'
+    return 'zlib'
+
+def compress_text(text, codec=None):
+    """
+    Compress article text if it is large enough and compresses well.
+
+    Args:
+        text: Article text
+        codec: Force a codec ('zstd' or 'zlib'); defaults to preferred_codec()
+
+    Returns:
+        Tuple of (codec, blob, uncompressed byte size); codec and blob are
+        None when the text should be stored as plain TEXT
+    """
+    raw = text.encode('utf-8')
+    codec = codec or preferred_codec()
+    if codec is None or len(raw) < CONTENT_COMPRESSION_MIN_BYTES:
+        return None, None, len(raw)
+
+    if codec == 'zstd':
+        if not hasattr(_local, 'compressor'):
+            _local.compressor = zstandard.ZstdCompressor(level=CONTENT_COMPRESSION_LEVEL)
+        blob = _local.compressor.compress(raw)
+    else:
+        blob = zlib.compress(raw, CONTENT_COMPRESSION_LEVEL)
+
+    # Per row: incompressible text stays plain
+    if len(blob) > len(raw) * MAX_USEFUL_RATIO:
+        return None, None, len(raw)
+    return codec, blob, len(raw)
+
+def decompress_text(codec, blob):
+    """
+    Decompress a blob produced by compress_text.
+
+    Raises:
+        ValueError: If the codec is unknown or its library is not installed
+    """
+    if codec == 'zlib':
+        return zlib.decompress(blob).decode('utf-8')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("Article is zstd-compressed but the zstandard package is not installed")
+        if not hasattr(_local, 'decompressor'):
+            _local.decompressor = zstandard.ZstdDecompressor()
+        return _local.decompressor.decompress(blob).decode('utf-8')
+    raise ValueError(f"Unknown content codec: {codec}")
+
+def make_delta(base, text):
+    """
+    Encode text as a line delta against base (see apply_delta).
+
+    Lines base shares with text are stored as [start, end) line ranges of
+    base; everything else is stored literally. The encoded delta is
+    zlib-compressed JSON, so its size follows the size of the change rather
+    than the size of the text.
+
+    Returns:
+        Delta as bytes
+    """
+    base_lines = base.splitlines(keepends=True)
+    text_lines = text.splitlines(keepends=True)
+    ops = []
+    # autojunk skips very frequent lines (blank lines) as match anchors, which
+    # keeps long articles fast; they are still copied or stored as usual
+    matcher = difflib.SequenceMatcher(None, base_lines, text_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j1 < j2:
+            ops.append(''.join(text_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                         CONTENT_COMPRESSION_LEVEL)
+
+def apply_delta(base, delta):
+    """
+    Rebuild the text a delta from make_delta was computed for.
+
+    Args:
+        base: The same base text make_delta was given
+        delta: Delta bytes
+
+    Raises:
+        ValueError: If the delta cannot be decoded
+    """
+    try:
+        ops = json.loads(zlib.decompress(delta).decode('utf-8'))
+    except (zlib.error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid revision delta: {e}")
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return ''.join(parts)
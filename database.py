@@ -1,20 +1,489 @@
 import sqlite3
 import os
+import re
+import json
+import base64
+import hashlib
+import heapq
+import itertools
+import queue
+import threading
+import time
+import functools
+import inspect
+import contextlib
+import contextvars
+import urllib.parse
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import cache
+import compression
+import fingerprint
 
 # Database configuration
 DB_PATH = os.getenv('DATABASE_PATH', './data/wikifetch.db')
 
+# Connection tuning (all overridable through environment variables)
+DB_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', 8))
+DB_JOURNAL_MODE = os.getenv('DATABASE_JOURNAL_MODE', 'WAL')
+DB_SYNCHRONOUS = os.getenv('DATABASE_SYNCHRONOUS', 'NORMAL')
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DATABASE_BUSY_TIMEOUT_MS', 5000))
+DB_CACHE_SIZE_KB = int(os.getenv('DATABASE_CACHE_SIZE_KB', 16384))
+DB_MMAP_SIZE = int(os.getenv('DATABASE_MMAP_SIZE', 256 * 1024 * 1024))
+
+# Read-only replicas open DB_PATH (usually a snapshot, see create_snapshot)
+# without writing to it. Immutable files are read without any locking;
+# turn DATABASE_IMMUTABLE off to read a database another process writes to.
+DB_READ_ONLY = os.getenv('DATABASE_READ_ONLY', '0').lower() in ('1', 'true', 'yes')
+DB_IMMUTABLE = os.getenv('DATABASE_IMMUTABLE', '1').lower() in ('1', 'true', 'yes')
+# How often a replica checks whether a new snapshot has been moved into place
+SNAPSHOT_CHECK_SECONDS = float(os.getenv('SNAPSHOT_CHECK_SECONDS', 1.0))
+# Serving snapshots over HTTP (/api/snapshot) copies the whole database per
+# request, so it is off unless a primary opts in
+SNAPSHOT_ENDPOINT = os.getenv('SNAPSHOT_ENDPOINT', '0').lower() in ('1', 'true', 'yes')
+
+# Articles can be spread over several SQLite files (shards, see shard_count).
+# A new library gets DATABASE_SHARDS of them; 0 keeps an existing library's
+# layout (python -m shards rebalance changes it).
+DB_SHARDS = int(os.getenv('DATABASE_SHARDS', 0))
+# Threads that run the per-shard parts of library-wide calls in parallel
+DB_SHARD_THREADS = int(os.getenv('DATABASE_SHARD_THREADS', 16))
+
+# Article text is served in slices of this many characters (see get_article_content)
+CONTENT_CHUNK_CHARS = int(os.getenv('CONTENT_CHUNK_CHARS', 20000))
+CONTENT_CHUNK_MAX_CHARS = int(os.getenv('CONTENT_CHUNK_MAX_CHARS', 200000))
+
+# Sharded storage. Articles are hash-partitioned over shard_count() SQLite
+# files by ID: an article lives on shard (id % SHARD_BUCKETS) % shards. New
+# IDs carry their title's bucket (see _with_new_ids), so an article stays
+# on its title's home shard whatever the number of shards. Shard 0 is
+# DB_PATH, which also keeps jobs, the lookup cache and the migration
+# manifest; shard k is stored beside it (see shard_path). Public functions
+# keep their signatures: calls about one article run on its shard, the rest
+# run on every shard in parallel and merge the results (see sharded).
+SHARD_BUCKETS = 1024
+
+# Layout of the library at DB_PATH, from its shard_layout table
+_layout = {"path": None, "shards": 1, "lock": threading.Lock()}
+
+# The shard this context's connections go to, and whether this is one
+# shard's part of a library-wide call (which then stays on that shard)
+_shard = contextvars.ContextVar('shard', default=0)
+_in_shard = contextvars.ContextVar('in_shard', default=False)
+
+def shard_path(shard, path=None):
+    """Return the file of a shard: path (default DB_PATH) for shard 0, e.g. wikifetch-2.db beside it for shard 2."""
+    path = DB_PATH if path is None else path
+    if shard == 0:
+        return path
+    root, ext = os.path.splitext(path)
+    return f'{root}-{shard}{ext}'
+
+def read_shard_layout(path):
+    """
+    Read the layout recorded in a database file.
+
+    Returns:
+        Dictionary with shards, shard (this file's number), buckets and
+        target (differs from shards while a rebalance is unfinished), or
+        None for a missing file or one from before sharding
+    """
+    if not os.path.exists(path):
+        return None
+    if DB_READ_ONLY:
+        conn = sqlite3.connect(read_only_uri(path), uri=True)
+    else:
+        conn = sqlite3.connect(path)
+    try:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute('SELECT shards, shard, buckets, target FROM shard_layout WHERE id = 1').fetchone()
+        return dict(row) if row else None
+    except sqlite3.OperationalError:
+        # No shard_layout table yet
+        return None
+    finally:
+        conn.close()
+
+def shard_count():
+    """Return the number of shards the library at DB_PATH is split into (1 if it is not)."""
+    if _layout["path"] != DB_PATH:
+        with _layout["lock"]:
+            if _layout["path"] != DB_PATH:
+                layout = read_shard_layout(DB_PATH)
+                _layout["shards"] = layout['shards'] if layout else 1
+                _layout["path"] = DB_PATH
+    return _layout["shards"]
+
+def _reload_layout():
+    with _layout["lock"]:
+        _layout["path"] = None
+
+def _title_bucket(title):
+    return zlib.crc32(title.encode('utf-8')) % SHARD_BUCKETS
+
+def shard_of_article(article_id):
+    """Return the shard an article ID belongs to (0 for anything that is not an ID)."""
+    try:
+        return int(article_id) % SHARD_BUCKETS % shard_count()
+    except (TypeError, ValueError):
+        return 0
+
+@contextlib.contextmanager
+def on_shard(shard):
+    """
+    Run the block's database calls on one shard only.
+
+    Calls about articles on other shards find nothing, and library-wide
+    calls (counts, listings, searches) cover this shard's articles only.
+    """
+    shard_token = _shard.set(shard)
+    in_shard_token = _in_shard.set(True)
+    try:
+        yield
+    finally:
+        _in_shard.reset(in_shard_token)
+        _shard.reset(shard_token)
+
+def _enter_shard(shard):
+    _shard.set(shard)
+    _in_shard.set(True)
+
+def _run_on_shard(shard, func, *args, **kwargs):
+    """Call func on one shard, in the current thread."""
+    context = contextvars.copy_context()
+    context.run(_enter_shard, shard)
+    return context.run(func, *args, **kwargs)
+
+def _iterate_on_shard(shard, func, *args, **kwargs):
+    """Iterate over func(*args, **kwargs) with every step run on one shard."""
+    context = contextvars.copy_context()
+    context.run(_enter_shard, shard)
+    iterator = context.run(lambda: iter(func(*args, **kwargs)))
+    try:
+        while True:
+            try:
+                item = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        # Hand the iterator's connection back now, not when it is collected
+        if hasattr(iterator, 'close'):
+            context.run(iterator.close)
+
+def iterate_shards(func, *args, **kwargs):
+    """Yield from func(*args, **kwargs) on every shard in turn, e.g. to read the whole library."""
+    for shard in range(shard_count()):
+        yield from _iterate_on_shard(shard, func, *args, **kwargs)
+
+# Thread pool for per-shard work, recreated after a fork like the connection pools
+_shard_threads = {"pid": None, "executor": None, "lock": threading.Lock()}
+
+def _executor():
+    with _shard_threads["lock"]:
+        if _shard_threads["pid"] != os.getpid():
+            _shard_threads["executor"] = ThreadPoolExecutor(max_workers=DB_SHARD_THREADS, thread_name_prefix='shard')
+            _shard_threads["pid"] = os.getpid()
+        return _shard_threads["executor"]
+
+def _parallel(tasks):
+    """
+    Run callables at the same time (the first in this thread) and return their results in order.
+
+    Every task finishes before the first error, if any, is raised, so no
+    task is still using a connection the caller is about to close.
+    """
+    if len(tasks) <= 1:
+        return [task() for task in tasks]
+    futures = [_executor().submit(task) for task in tasks[1:]]
+    results = []
+    error = None
+    try:
+        results.append(tasks[0]())
+    except Exception as e:
+        error = e
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return results
+
+def _gather(func, calls):
+    """Run func on several shards in parallel; calls are (shard, args, kwargs) tuples."""
+    return _parallel([functools.partial(_run_on_shard, shard, func, *args, **kwargs)
+                      for shard, args, kwargs in calls])
+
+def _on_every_shard(func, *args, **kwargs):
+    """Return func's result on every shard, in shard order."""
+    return _gather(func, [(shard, args, kwargs) for shard in range(shard_count())])
+
+def _group_by_shard(article_ids):
+    """Split article IDs into {shard: IDs stored there}, keeping their order."""
+    groups = {}
+    for article_id in article_ids:
+        groups.setdefault(shard_of_article(article_id), []).append(article_id)
+    return groups
+
+def _select_with_connection(select, *args):
+    """Run select(cursor, *args) on a connection to the current shard."""
+    conn = get_db_connection()
+    try:
+        return select(conn.cursor(), *args)
+    finally:
+        conn.close()
+
+def _select_by_shard(select, article_ids):
+    """Run select(cursor, IDs) on each shard for the IDs stored there and merge the dictionaries it returns."""
+    groups = _group_by_shard(article_ids)
+    found = {}
+    for part in _gather(_select_with_connection, [(shard, (select, ids), {}) for shard, ids in groups.items()]):
+        found.update(part)
+    return found
+
+def sharded(implementation):
+    """
+    Call implementation(func, *args, **kwargs) instead of func on a sharded library.
+
+    With one shard, and within one shard's part of another call, func runs
+    as it is, so an unsharded library takes exactly the same paths as before.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _in_shard.get() or shard_count() == 1:
+                return func(*args, **kwargs)
+            return implementation(func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def _on_article_shard(func, *args, **kwargs):
+    """Run a call about one article (its ID comes first) on the article's shard."""
+    article_id = args[0] if args else kwargs['article_id']
+    return _run_on_shard(shard_of_article(article_id), func, *args, **kwargs)
+
+def _on_every_shard_merged(merge):
+    """Run a call on every shard and combine the results with merge(results, *args, **kwargs)."""
+    def implementation(func, *args, **kwargs):
+        return merge(_on_every_shard(func, *args, **kwargs), *args, **kwargs)
+    return implementation
+
+def _on_id_shards(merge):
+    """
+    Run a call about a list of article IDs (None for all) on each shard for
+    the IDs stored there, and combine the results with merge(results, IDs, ...).
+    """
+    def implementation(func, article_ids=None, *args, **kwargs):
+        if article_ids is None:
+            results = _on_every_shard(func, None, *args, **kwargs)
+        else:
+            article_ids = list(article_ids)
+            # No IDs still makes one call, for its validation and empty result
+            groups = _group_by_shard(article_ids) or {0: []}
+            results = _gather(func, [(shard, (ids, *args), kwargs) for shard, ids in groups.items()])
+        return merge(results, article_ids, *args, **kwargs)
+    return implementation
+
+def _merge_sum(results, *args, **kwargs):
+    return sum(results)
+
+def _merge_dicts(results, *args, **kwargs):
+    merged = {}
+    for result in results:
+        merged.update(result)
+    return merged
+
+def _merge_sorted(*columns):
+    """Merge for lists each sorted by columns, descending (as their SQL orders them)."""
+    def merge(results, *args, **kwargs):
+        return list(heapq.merge(*results, key=lambda row: tuple(row[column] for column in columns), reverse=True))
+    return merge
+
+def _merge_tags(results, *args, **kwargs):
+    """Merge get_all_tags results: one entry per name (each shard numbers its own tags), counts summed."""
+    tags = {}
+    for result in results:
+        for tag in result:
+            merged = tags.setdefault(tag['name'], dict(tag, article_count=0))
+            merged['article_count'] += tag['article_count']
+    return [tags[name] for name in sorted(tags)]
+
+def _merge_compression_stats(results, *args, **kwargs):
+    stats = {key: sum(result[key] for result in results)
+             for key in ('content_bytes', 'stored_bytes', 'compressed_articles')}
+    content_bytes = stats['content_bytes']
+    stats['compression_ratio'] = round(stats['stored_bytes'] / content_bytes, 4) if content_bytes else 1.0
+    return stats
+
+def _merge_stats(results, *args, **kwargs):
+    stats = dict(results[0])
+    for key in ('total_articles', 'total_words', 'total_characters', 'favorites_count'):
+        stats[key] = sum(result[key] or 0 for result in results)
+    oldest = [result['oldest_article_date'] for result in results if result['oldest_article_date']]
+    newest = [result['newest_article_date'] for result in results if result['newest_article_date']]
+    stats['oldest_article_date'] = min(oldest) if oldest else None
+    stats['newest_article_date'] = max(newest) if newest else None
+    stats['database_size_mb'] = round(sum(result['database_size_mb'] for result in results), 2)
+    stats['compression'] = _merge_compression_stats([result['compression'] for result in results])
+    stats['connection_pool'] = get_pool_stats()
+    return stats
+
+def _merge_recomputed_stats(results, *args, **kwargs):
+    """Merge recompute_library_stats results; drift is summed per field, tag drift listed per shard."""
+    aggregates = {name: sum(result['aggregates'][name] for result in results) for name in results[0]['aggregates']}
+    drift = {}
+    for name in {name for result in results for name in result['drift']}:
+        stored = sum(result['drift'][name]['stored'] if name in result['drift'] else result['aggregates'][name]
+                     for result in results)
+        drift[name] = {"stored": stored, "actual": aggregates[name]}
+    return {
+        "aggregates": aggregates,
+        "drift": drift,
+        "tag_drift": [tag for result in results for tag in result['tag_drift']],
+        "fixed": any(result['fixed'] for result in results)
+    }
+
+def _merge_tag_updates(results, article_ids, *args, **kwargs):
+    """Merge update_tags_bulk results, listing missing IDs in request order."""
+    missing = {article_id for result in results for article_id in result['not_found']}
+    return {
+        "articles": sum(result['articles'] for result in results),
+        "added": sum(result['added'] for result in results),
+        "removed": sum(result['removed'] for result in results),
+        "not_found": [article_id for article_id in dict.fromkeys(int(article_id) for article_id in article_ids)
+                      if article_id in missing]
+    }
+
+def _merge_titles(results, article_ids, *args, **kwargs):
+    titles = _merge_dicts(results)
+    # All titles come in ID order, as from one file
+    return dict(sorted(titles.items())) if article_ids is None else titles
+
+def _combined_progress(progress, count):
+    """
+    Split a progress(done, total) callback into one per shard, each
+    reporting the sums over all shards.
+
+    Once progress raises (e.g. a cancelled job), every shard's callback
+    raises the same error, so all of them stop. progress runs in the
+    caller's context, so its own database calls (job progress) go to
+    shard 0, not to the shard reporting.
+    """
+    if progress is None:
+        return [None] * count
+    reports = [(0, 0)] * count
+    failed = []
+    lock = threading.Lock()
+    context = contextvars.copy_context()
+
+    def report(shard, done, total):
+        with lock:
+            if failed:
+                raise failed[0]
+            reports[shard] = (done, total)
+            totals = [shard_total for _, shard_total in reports]
+            try:
+                context.run(progress, sum(shard_done for shard_done, _ in reports),
+                            None if None in totals else sum(totals))
+            except Exception as e:
+                failed.append(e)
+                raise
+    return [functools.partial(report, shard) for shard in range(count)]
+
 def init_db():
-    """Initialize database and create tables if they don't exist."""
+    """
+    Initialize database and create tables if they don't exist.
+
+    A sharded library (see shard_count) gets them in every shard file. A
+    new library is split into DATABASE_SHARDS shards; an existing one keeps
+    its layout, and a DATABASE_SHARDS that does not match it is an error
+    rather than a silent reshuffle.
+
+    Read-only replicas only check that DB_PATH holds a WikiFetch database;
+    its schema is whatever the primary that made the snapshot created.
+
+    Raises:
+        FileNotFoundError: Read-only and there is no database at DB_PATH,
+            or a shard file is missing
+        RuntimeError: DATABASE_SHARDS does not match the library's layout,
+            or a rebalance was interrupted (run python -m shards rebalance)
+    """
+    if DB_READ_ONLY:
+        for shard in range(shard_count()):
+            path = shard_path(shard)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Read-only database not found: {path}")
+            with on_shard(shard):
+                conn = get_db_connection()
+                try:
+                    conn.execute('SELECT 1 FROM articles LIMIT 1').fetchall()
+                finally:
+                    conn.close()
+        return
+
     # Create data directory if it doesn't exist
     db_dir = os.path.dirname(DB_PATH)
     if db_dir and not os.path.exists(db_dir):
         os.makedirs(db_dir, exist_ok=True)
 
-    conn = sqlite3.connect(DB_PATH)
+    shards = _check_layout()
+    for shard in range(shards):
+        _init_shard(shard, shards)
+    _reload_layout()
+
+def _check_layout():
+    """Return the number of shards the library at DB_PATH has (or, if new, is to have)."""
+    if not 0 <= DB_SHARDS <= SHARD_BUCKETS:
+        raise ValueError(f"DATABASE_SHARDS must be between 0 and {SHARD_BUCKETS}")
+    layout = read_shard_layout(DB_PATH)
+    if layout is None:
+        # A library from before sharding is one shard until it is rebalanced
+        shards = 1 if _has_articles(DB_PATH) else (DB_SHARDS or 1)
+    else:
+        if layout['target'] != layout['shards']:
+            raise RuntimeError(f"Rebalancing to {layout['target']} shards did not finish; "
+                               f"run python -m shards rebalance {layout['target']}")
+        if layout['buckets'] != SHARD_BUCKETS:
+            raise RuntimeError(f"Library uses {layout['buckets']} shard buckets, not {SHARD_BUCKETS}")
+        shards = layout['shards']
+        for shard in range(1, shards):
+            if not os.path.exists(shard_path(shard)):
+                raise FileNotFoundError(f"Shard {shard} of {shards} not found: {shard_path(shard)}")
+    if DB_SHARDS and DB_SHARDS != shards:
+        raise RuntimeError(f"Library has {shards} shard(s) but DATABASE_SHARDS is {DB_SHARDS}; "
+                           f"run python -m shards rebalance {DB_SHARDS}")
+    return shards
+
+def _has_articles(path):
+    if not os.path.exists(path):
+        return False
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT 1 FROM articles LIMIT 1').fetchone() is not None
+    except sqlite3.OperationalError:
+        # No articles table yet
+        return False
+    finally:
+        conn.close()
+
+def _init_shard(shard, shards, target=None):
+    """
+    Create or upgrade the schema of one shard file and record its layout.
+
+    Args:
+        shard: Shard number (0 is DB_PATH)
+        shards: Number of shards the library has
+        target: Number of shards a rebalance in progress is moving to
+    """
+    conn = _shard_connection(shard)
     cursor = conn.cursor()
 
+    # Journal mode is persistent in the database file, so set it once here
+    cursor.execute(f'PRAGMA journal_mode={DB_JOURNAL_MODE}')
+
     # Create articles table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS articles (
@@ -26,15 +495,32 @@ def init_db():
             saved_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             fetched_date TIMESTAMP,
             word_count INTEGER,
-            character_count INTEGER
+            character_count INTEGER,
+            content_z BLOB,
+            content_codec TEXT,
+            content_size INTEGER,
+            stored_size INTEGER,
+            content_hash TEXT,
+            modified_date TIMESTAMP
         )
     ''')
 
+    # Columns added after the first release
+    add_missing_columns(cursor, 'articles', {
+        'content_z': 'BLOB',
+        'content_codec': 'TEXT',
+        'content_size': 'INTEGER',
+        'stored_size': 'INTEGER',
+        'content_hash': 'TEXT',
+        'modified_date': 'TIMESTAMP'
+    })
+
     # Create tags table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS tags (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE
+            name TEXT NOT NULL UNIQUE,
+            article_count INTEGER NOT NULL DEFAULT 0
         )
     ''')
 
@@ -58,424 +544,3797 @@ def init_db():
         )
     ''')
 
+    # Create jobs table for background work (see jobs.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            params TEXT,
+            progress_done INTEGER DEFAULT 0,
+            progress_total INTEGER,
+            result TEXT,
+            error TEXT,
+            cancel_requested INTEGER DEFAULT 0,
+            worker TEXT,
+            attempts INTEGER DEFAULT 0,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_date TIMESTAMP,
+            finished_date TIMESTAMP,
+            heartbeat_date TIMESTAMP
+        )
+    ''')
+
+    # Create migration manifest: legacy files already imported, by path
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS migration_manifest (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            article_id INTEGER,
+            migrated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Other titles whose text is identical to a saved article (see insert_article)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_aliases (
+            title TEXT PRIMARY KEY,
+            article_id INTEGER NOT NULL,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Earlier versions of refreshed articles, each stored as a delta that
+    # rebuilds it from the next newer version (see update_article_content)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_revisions (
+            article_id INTEGER NOT NULL,
+            revision INTEGER NOT NULL,
+            content_hash TEXT,
+            fetched_date TIMESTAMP,
+            word_count INTEGER,
+            character_count INTEGER,
+            delta BLOB NOT NULL,
+            replaced_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (article_id, revision),
+            FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+        )
+    ''')
+
+    # Wikipedia lookups by normalized query, including misses (see lookup.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lookup_cache (
+            query TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            title TEXT,
+            options TEXT,
+            checked_at REAL NOT NULL
+        )
+    ''')
+
+    # Read-cache invalidations, polled by other processes (see _sync_cache)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_invalidations (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            namespace TEXT NOT NULL,
+            key TEXT
+        )
+    ''')
+
     # Create indexes for better query performance
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_title ON articles(title)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_saved_date ON articles(saved_date)')
+    # (saved_date, id) serves both ordering and keyset pagination; it supersedes
+    # the earlier single-column saved_date index
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_saved_date_id ON articles(saved_date, id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_saved_date')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_tags_name ON tags(name)')
+    # Tag -> articles lookups; the primary key only serves article -> tags
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_article_tags_tag ON article_tags(tag_id, article_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_content_hash ON articles(content_hash)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_article_aliases_article ON article_aliases(article_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lookup_cache_kind ON lookup_cache(kind, checked_at)')
+
+    # Tag and alias changes alter an article's API representation: bump its modified_date
+    for trigger in ('article_tags_touch_insert', 'article_tags_touch_delete', 'article_aliases_touch_insert'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute('''
+        CREATE TRIGGER article_tags_touch_insert AFTER INSERT ON article_tags BEGIN
+            UPDATE articles SET modified_date = CURRENT_TIMESTAMP WHERE id = new.article_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER article_tags_touch_delete AFTER DELETE ON article_tags BEGIN
+            UPDATE articles SET modified_date = CURRENT_TIMESTAMP WHERE id = old.article_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER article_aliases_touch_insert AFTER INSERT ON article_aliases BEGIN
+            UPDATE articles SET modified_date = CURRENT_TIMESTAMP WHERE id = new.article_id;
+        END
+    ''')
+
+    # Full-text search index over title and content
+    init_fts(cursor)
+
+    # Per-section offsets and section-level search
+    init_sections(cursor)
+
+    # MinHash signatures and LSH buckets for near-duplicate detection
+    init_fingerprints(cursor)
+
+    # Index articles other programs wrote since the last start
+    sync_text_indexes(cursor)
+
+    # Incrementally maintained library statistics
+    init_library_stats(cursor)
+
+    # Which shard of the library this file is (see shard_count)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shard_layout (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            shards INTEGER NOT NULL,
+            shard INTEGER NOT NULL,
+            buckets INTEGER NOT NULL,
+            target INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO shard_layout (id, shards, shard, buckets, target) VALUES (1, ?, ?, ?, ?)
+    ''', (shards, shard, SHARD_BUCKETS, shards if target is None else target))
 
     conn.commit()
     conn.close()
 
-def get_db_connection():
-    """Return a database connection with row factory for dict-like access."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def insert_article(title, content, url, word_count=None, char_count=None, tags=None):
+def add_missing_columns(cursor, table, columns):
     """
-    Insert a new article into the database with optional tags.
+    Add columns that an existing table is missing.
 
     Args:
-        title: Article title (required)
-        content: Full article text (required)
-        url: Wikipedia URL (required)
-        word_count: Number of words (optional, will be calculated if not provided)
-        char_count: Number of characters (optional, will be calculated if not provided)
-        tags: List of tag names (optional)
+        cursor: Cursor on an open connection (caller commits)
+        table: Table name
+        columns: Dictionary of column name -> SQL type
 
     Returns:
-        Inserted article ID
+        List of the column names that were added
+    """
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    added = []
+    for name, sql_type in columns.items():
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {sql_type}')
+            added.append(name)
+    return added
 
-    Raises:
-        sqlite3.IntegrityError: If article with same title already exists
-        ValueError: If validation fails
+def init_fts(cursor):
     """
-    if tags is None:
-        tags = []
+    Create the FTS5 index for articles.
 
-    # Validation
-    if not title or not title.strip():
-        raise ValueError("Title is required")
-    if not content or len(content) < 10:
-        raise ValueError("Content is required and must be at least 10 characters")
-    if len(title) > 500:
-        raise ValueError("Title must be less than 500 characters")
+    The index is an external-content table over the articles_text view, so
+    article text is not stored twice and compressed rows are indexed by
+    their plain text. The write paths keep it in sync (see
+    _index_articles), not triggers, so writing articles needs none of the
+    app's SQL functions. Databases created before the index existed, or
+    with the earlier index over the raw articles table, are rebuilt once.
 
-    title = title.strip()
+    Args:
+        cursor: Cursor on an open connection (caller commits)
+    """
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'")
+    row = cursor.fetchone()
+    needs_backfill = row is None
+    if row is not None and "content='articles_text'" not in row[0]:
+        # Index predates compressed storage; recreate it over the view
+        cursor.execute('DROP TABLE articles_fts')
+        needs_backfill = True
 
-    # Calculate summary: First 200 characters, truncated at last complete word
-    summary = content[:200]
-    if len(content) > 200:
-        last_space = summary.rfind(' ')
-        if last_space > 0:
-            summary = summary[:last_space] + '...'
+    # Earlier versions kept the index in sync with triggers
+    for trigger in ('articles_fts_insert', 'articles_fts_delete', 'articles_fts_update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
 
-    # Calculate word and character counts if not provided
-    if word_count is None:
-        word_count = len(content.split())
-    if char_count is None:
-        char_count = len(content)
+    # Plain-text view of articles, decompressing stored content
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS articles_text AS
+        SELECT id, title, article_text(content, content_z, content_codec) AS content
+        FROM articles
+    ''')
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title,
+            content,
+            content='articles_text',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
 
-    try:
-        # Insert article
-        cursor.execute('''
-            INSERT INTO articles (title, content, summary, url, fetched_date, word_count, character_count)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (title, content, summary, url, datetime.now().isoformat(), word_count, char_count))
+    # One-time backfill for existing databases
+    if needs_backfill:
+        cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+# Section rows are addressed in article_sections_fts as article_id * SECTION_SPAN + position
+SECTION_SPAN = 4096
+
+def init_sections(cursor):
+    """
+    Create the article_sections table and its section-level FTS5 index.
+
+    Article text is split on its "== Heading ==" lines (see parse_sections)
+    by the write paths as articles are saved or their text changes (see
+    _index_articles). The index is contentless: section text is read back
+    from the article with the stored offsets when a section has to be
+    removed from it. Databases created before sections existed are split
+    once here.
+
+    Args:
+        cursor: Cursor on an open connection (caller commits)
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'article_sections'")
+    needs_backfill = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_sections (
+            article_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            level INTEGER NOT NULL,
+            heading TEXT,
+            char_offset INTEGER NOT NULL,
+            char_length INTEGER NOT NULL,
+            word_count INTEGER NOT NULL,
+            PRIMARY KEY (article_id, position),
+            FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS article_sections_fts USING fts5(
+            heading,
+            content,
+            content='',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+
+    # Articles not in articles_fts yet are split by sync_text_indexes
+    if needs_backfill:
+        for articles in _article_text_batches(cursor, 'id IN (SELECT id FROM articles_fts_docsize)'):
+            _store_sections(cursor, articles)
+
+def init_fingerprints(cursor):
+    """
+    Create the MinHash signature table and its LSH band index.
+
+    The write paths store a signature of every article's word shingles and
+    one bucket per band in article_lsh (see _index_articles), so articles
+    that share a bucket are near-duplicate candidates without comparing
+    every pair. Databases created before fingerprints existed get them (and
+    any missing content hashes) computed once here.
+
+    Args:
+        cursor: Cursor on an open connection (caller commits)
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'article_fingerprints'")
+    needs_backfill = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_fingerprints (
+            article_id INTEGER PRIMARY KEY,
+            minhash BLOB NOT NULL,
+            FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            article_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, article_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Articles not in articles_fts yet are fingerprinted by sync_text_indexes
+    if needs_backfill:
+        for articles in _article_text_batches(cursor, 'id IN (SELECT id FROM articles_fts_docsize)'):
+            _store_fingerprints(cursor, articles)
+            _store_missing_hashes(cursor, articles)
+
+def sync_text_indexes(cursor, batch_size=500):
+    """
+    Bring the text indexes up to date with articles written by other programs.
+
+    The schema has no triggers that need the app's SQL functions, so any
+    SQLite client can insert and delete articles; only the app's write
+    paths index them, though. Articles missing from articles_fts were
+    inserted elsewhere and are indexed now. If the index still holds
+    deleted articles, their words cannot be removed without the deleted
+    text, so every index is rebuilt. init_db runs this on every start.
+
+    Args:
+        cursor: Cursor on an open connection (caller commits)
+        batch_size: Articles read at a time
+
+    Returns:
+        Dictionary with the number of articles indexed and whether the
+        indexes were rebuilt
+    """
+    cursor.execute('SELECT 1 FROM articles_fts_docsize WHERE id NOT IN (SELECT id FROM articles) LIMIT 1')
+    rebuild = cursor.fetchone() is not None
+    if rebuild:
+        cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('delete-all')")
+        cursor.execute("INSERT INTO article_sections_fts (article_sections_fts) VALUES ('delete-all')")
+        for table in ('article_sections', 'article_fingerprints', 'article_lsh'):
+            cursor.execute(f'DELETE FROM {table}')
+
+    indexed = 0
+    condition = 'id NOT IN (SELECT id FROM articles_fts_docsize)'
+    for articles in _article_text_batches(cursor, condition, batch_size):
+        _index_articles(cursor, articles)
+        _store_missing_hashes(cursor, articles)
+        indexed += len(articles)
+    return {"indexed": indexed, "rebuilt": rebuild}
+
+def _stored_text(content, content_z, content_codec):
+    """Return the plain text of an article stored as these articles columns."""
+    if content_codec is None:
+        return content
+    return compression.decompress_text(content_codec, content_z)
+
+def _row_text(row):
+    """Return the plain text of a row built by prepare_article_row."""
+    return _stored_text(row[1], row[2], row[3])
+
+def _article_text_batches(cursor, condition='1', batch_size=500):
+    """Yield the articles matching a SQL condition as lists of (id, title, plain text), in ID order."""
+    last_id = 0
+    while True:
+        cursor.execute(f'''
+            SELECT id, title, content, content_z, content_codec
+            FROM articles WHERE id > ? AND {condition} ORDER BY id LIMIT ?
+        ''', (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield [(article_id, title, _stored_text(content, content_z, codec))
+               for article_id, title, content, content_z, codec in rows]
+        last_id = rows[-1][0]
+
+def _indexed_articles(cursor, article_ids):
+    """Read (id, title, plain text) of saved articles as they are indexed, for _unindex_articles."""
+    cursor.execute('''
+        SELECT id, title, content, content_z, content_codec
+        FROM articles WHERE id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(list(article_ids)),))
+    return [(article_id, title, _stored_text(content, content_z, codec))
+            for article_id, title, content, content_z, codec in cursor.fetchall()]
+
+def _store_sections(cursor, articles):
+    sections = []
+    entries = []
+    for article_id, _, text in articles:
+        for position, (level, heading, offset, length, words) in enumerate(parse_sections(text)):
+            sections.append((article_id, position, level, heading, offset, length, words))
+            entries.append((article_id * SECTION_SPAN + position, heading, text[offset:offset + length]))
+    cursor.executemany('''
+        INSERT INTO article_sections (article_id, position, level, heading, char_offset, char_length, word_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', sections)
+    cursor.executemany('INSERT INTO article_sections_fts (rowid, heading, content) VALUES (?, ?, ?)', entries)
+
+def _store_fingerprints(cursor, articles):
+    signatures = [(article_id, fingerprint.minhash(text)) for article_id, _, text in articles]
+    cursor.executemany('INSERT INTO article_fingerprints (article_id, minhash) VALUES (?, ?)', signatures)
+    cursor.executemany('INSERT INTO article_lsh (band, bucket, article_id) VALUES (?, ?, ?)',
+                       [(band, bucket, article_id) for article_id, signature in signatures
+                        for band, bucket in enumerate(fingerprint.lsh_buckets(signature))])
+
+def _store_missing_hashes(cursor, articles):
+    cursor.executemany('UPDATE articles SET content_hash = ? WHERE id = ? AND content_hash IS NULL',
+                       [(content_hash(text), article_id) for article_id, _, text in articles])
+
+def _index_articles(cursor, articles, fts_max_id=None):
+    """
+    Add new (or changed) articles to the text indexes, in the caller's transaction.
+
+    The indexes are articles_fts, the article's sections with
+    article_sections_fts, and its MinHash signature with its LSH buckets.
+
+    Args:
+        cursor: Cursor inside a write transaction
+        articles: List of (id, title, plain text) tuples
+        fts_max_id: Leave articles with higher IDs out of articles_fts (a
+                    deferred import indexes its new rows there at the end)
+    """
+    if not articles:
+        return
+    cursor.executemany('INSERT INTO articles_fts (rowid, title, content) VALUES (?, ?, ?)',
+                       [article for article in articles if fts_max_id is None or article[0] <= fts_max_id])
+    _store_sections(cursor, articles)
+    _store_fingerprints(cursor, articles)
+
+def _unindex_articles(cursor, articles, fts_max_id=None):
+    """
+    Remove articles from the text indexes before they are deleted or their text changes.
+
+    FTS5 removes an entry by its indexed text, so the caller reads it
+    (see _indexed_articles) in the same write transaction.
+
+    Args:
+        cursor: Cursor inside a write transaction
+        articles: List of (id, title, plain text) tuples, as indexed
+        fts_max_id: Articles with higher IDs are not in articles_fts (see _index_articles)
+    """
+    if not articles:
+        return
+    cursor.executemany("INSERT INTO articles_fts (articles_fts, rowid, title, content) VALUES ('delete', ?, ?, ?)",
+                       [article for article in articles if fts_max_id is None or article[0] <= fts_max_id])
+    ids = json.dumps([article_id for article_id, _, _ in articles])
+    texts = {article_id: text for article_id, _, text in articles}
+    cursor.execute('''
+        SELECT article_id, position, heading, char_offset, char_length
+        FROM article_sections WHERE article_id IN (SELECT value FROM json_each(?))
+    ''', (ids,))
+    cursor.executemany(
+        "INSERT INTO article_sections_fts (article_sections_fts, rowid, heading, content) VALUES ('delete', ?, ?, ?)",
+        [(article_id * SECTION_SPAN + position, heading, texts[article_id][offset:offset + length])
+         for article_id, position, heading, offset, length in cursor.fetchall()])
+    cursor.execute('DELETE FROM article_sections WHERE article_id IN (SELECT value FROM json_each(?))', (ids,))
+    cursor.execute('''
+        SELECT article_id, minhash FROM article_fingerprints WHERE article_id IN (SELECT value FROM json_each(?))
+    ''', (ids,))
+    cursor.executemany('DELETE FROM article_lsh WHERE band = ? AND bucket = ? AND article_id = ?',
+                       [(band, bucket, article_id) for article_id, signature in cursor.fetchall()
+                        for band, bucket in enumerate(fingerprint.lsh_buckets(signature))])
+    cursor.execute('DELETE FROM article_fingerprints WHERE article_id IN (SELECT value FROM json_each(?))', (ids,))
+
+# Per-article contributions to library_stats; {row} is 'new' or 'old' in triggers
+LIBRARY_STATS_TERMS = {
+    'article_count': '1',
+    'total_words': 'COALESCE({row}.word_count, 0)',
+    'total_characters': 'COALESCE({row}.character_count, 0)',
+    # Rows saved before compression existed have no sizes recorded yet
+    'content_bytes': 'COALESCE({row}.content_size, length(CAST({row}.content AS BLOB)))',
+    'stored_bytes': 'COALESCE({row}.stored_size, length(CAST({row}.content AS BLOB)))',
+    'compressed_articles': '({row}.content_codec IS NOT NULL)'
+}
+
+def init_library_stats(cursor):
+    """
+    Create the single-row library_stats table and the triggers that maintain it.
+
+    Article counts, word/character totals, content sizes and the favorites
+    count are adjusted by triggers as rows change, and tags.article_count
+    tracks per-tag counts, so reading statistics never needs a table scan.
+    The aggregates are computed from scratch when first created (or when an
+    upgrade adds new ones); recompute_library_stats() repairs any drift.
+
+    Deleting an article also deletes its tag links, favorite and alias
+    titles, which the schema declares as ON DELETE CASCADE but SQLite only
+    enforces with foreign keys turned on.
+
+    Args:
+        cursor: Cursor on an open connection (caller commits)
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS library_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            article_count INTEGER NOT NULL DEFAULT 0,
+            total_words INTEGER NOT NULL DEFAULT 0,
+            total_characters INTEGER NOT NULL DEFAULT 0,
+            content_bytes INTEGER NOT NULL DEFAULT 0,
+            stored_bytes INTEGER NOT NULL DEFAULT 0,
+            compressed_articles INTEGER NOT NULL DEFAULT 0,
+            favorites_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    columns = {name: 'INTEGER NOT NULL DEFAULT 0' for name in LIBRARY_STATS_TERMS if name != 'article_count'}
+    columns['favorites_count'] = 'INTEGER NOT NULL DEFAULT 0'
+    added = add_missing_columns(cursor, 'library_stats', columns)
+    added += add_missing_columns(cursor, 'tags', {'article_count': 'INTEGER NOT NULL DEFAULT 0'})
+
+    cursor.execute('INSERT OR IGNORE INTO library_stats (id) VALUES (1)')
+    if cursor.rowcount or added:
+        _recompute_library_stats(cursor)
+
+    # Triggers are recreated on every start so their definitions stay current
+    for trigger in ('library_stats_insert', 'library_stats_delete', 'library_stats_update',
+                    'articles_cascade_delete', 'tag_count_insert', 'tag_count_delete',
+                    'favorites_count_insert', 'favorites_count_delete'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    add_new = ', '.join(f'{name} = {name} + {term.format(row="new")}' for name, term in LIBRARY_STATS_TERMS.items())
+    sub_old = ', '.join(f'{name} = {name} - {term.format(row="old")}' for name, term in LIBRARY_STATS_TERMS.items())
+    delta = ', '.join(f'{name} = {name} + {term.format(row="new")} - {term.format(row="old")}'
+                      for name, term in LIBRARY_STATS_TERMS.items() if name != 'article_count')
+
+    cursor.execute(f'''
+        CREATE TRIGGER library_stats_insert AFTER INSERT ON articles BEGIN
+            UPDATE library_stats SET {add_new} WHERE id = 1;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER library_stats_delete AFTER DELETE ON articles BEGIN
+            UPDATE library_stats SET {sub_old} WHERE id = 1;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER library_stats_update
+        AFTER UPDATE OF content, content_codec, content_size, stored_size, word_count, character_count ON articles
+        BEGIN
+            UPDATE library_stats SET {delta} WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER articles_cascade_delete AFTER DELETE ON articles BEGIN
+            DELETE FROM article_tags WHERE article_id = old.id;
+            DELETE FROM favorites WHERE article_id = old.id;
+            DELETE FROM article_aliases WHERE article_id = old.id;
+            DELETE FROM article_revisions WHERE article_id = old.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER tag_count_insert AFTER INSERT ON article_tags BEGIN
+            UPDATE tags SET article_count = article_count + 1 WHERE id = new.tag_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER tag_count_delete AFTER DELETE ON article_tags BEGIN
+            UPDATE tags SET article_count = article_count - 1 WHERE id = old.tag_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER favorites_count_insert AFTER INSERT ON favorites BEGIN
+            UPDATE library_stats SET favorites_count = favorites_count + 1 WHERE id = 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER favorites_count_delete AFTER DELETE ON favorites BEGIN
+            UPDATE library_stats SET favorites_count = favorites_count - 1 WHERE id = 1;
+        END
+    ''')
+
+def _compute_library_stats(cursor):
+    """Compute library_stats and per-tag counts from scratch (full scans)."""
+    sums = ', '.join(f'COALESCE(SUM({term.format(row="articles")}), 0) as {name}'
+                     for name, term in LIBRARY_STATS_TERMS.items())
+    cursor.execute(f'SELECT {sums} FROM articles')
+    actual = dict(cursor.fetchone())
+    # Links left behind by deletes before the cascade trigger existed do not count
+    cursor.execute('SELECT COUNT(*) as count FROM favorites f JOIN articles a ON a.id = f.article_id')
+    actual['favorites_count'] = cursor.fetchone()['count']
+
+    cursor.execute('''
+        SELECT t.id, t.name, t.article_count as stored, COUNT(a.id) as actual
+        FROM tags t
+        LEFT JOIN article_tags at ON t.id = at.tag_id
+        LEFT JOIN articles a ON a.id = at.article_id
+        GROUP BY t.id
+    ''')
+    tag_counts = [dict(row) for row in cursor.fetchall()]
+    return actual, tag_counts
+
+def _recompute_library_stats(cursor):
+    # Remove orphaned links first; their deletes fire the count triggers
+    cursor.execute('DELETE FROM article_tags WHERE article_id NOT IN (SELECT id FROM articles)')
+    cursor.execute('DELETE FROM favorites WHERE article_id NOT IN (SELECT id FROM articles)')
+    actual, tag_counts = _compute_library_stats(cursor)
+    assignments = ', '.join(f'{name} = ?' for name in actual)
+    cursor.execute(f'UPDATE library_stats SET {assignments} WHERE id = 1', tuple(actual.values()))
+    cursor.executemany('UPDATE tags SET article_count = ? WHERE id = ?',
+                       [(tag['actual'], tag['id']) for tag in tag_counts if tag['actual'] != tag['stored']])
+    return actual, tag_counts
+
+@sharded(_on_every_shard_merged(_merge_recomputed_stats))
+def recompute_library_stats(dry_run=False):
+    """
+    Recompute the aggregates from scratch and report drift.
+
+    Args:
+        dry_run: Only report drift, do not fix it
+
+    Returns:
+        Dictionary with the recomputed values, the fields and tags whose
+        stored value differed, and whether anything was fixed
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Hold the write lock so no insert lands between computing and storing
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('SELECT * FROM library_stats WHERE id = 1')
+        stored = dict(cursor.fetchone())
+        actual, tag_counts = _compute_library_stats(cursor)
+
+        drift = {name: {"stored": stored[name], "actual": value}
+                 for name, value in actual.items() if stored[name] != value}
+        tag_drift = [{"tag": tag['name'], "stored": tag['stored'], "actual": tag['actual']}
+                     for tag in tag_counts if tag['stored'] != tag['actual']]
+
+        if dry_run:
+            conn.rollback()
+        else:
+            _recompute_library_stats(cursor)
+            # Orphaned links may have been removed and tag counts corrected
+            changes = [('tags', None), ('tag_articles', None), ('tag_queries', None), ('favorites', None)]
+            _log_invalidations(cursor, changes)
+            conn.commit()
+            _invalidate(changes)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {
+        "aggregates": actual,
+        "drift": drift,
+        "tag_drift": tag_drift,
+        "fixed": bool(drift or tag_drift) and not dry_run
+    }
+
+def encode_cursor(saved_date, article_id):
+    """Encode a keyset position as an opaque, URL-safe token."""
+    raw = json.dumps([saved_date, article_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """
+    Decode a token produced by encode_cursor.
+
+    Returns:
+        Tuple of (saved_date, article_id)
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        saved_date, article_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(saved_date, str) or not isinstance(article_id, int):
+        raise ValueError("Invalid cursor")
+    return saved_date, article_id
+
+def build_fts_query(query):
+    """
+    Turn free-text user input into a safe FTS5 MATCH expression.
+
+    Each word becomes a quoted prefix term, so FTS5 operators and punctuation
+    in the input are treated as plain text. All terms must match.
+
+    Args:
+        query: Raw search string
+
+    Returns:
+        FTS5 query string, or None if the input has no searchable terms
+    """
+    terms = re.findall(r'\w+', query, flags=re.UNICODE)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+# "== Heading ==" lines (levels 2 to 6) in Wikipedia plain-text extracts
+SECTION_HEADING_RE = re.compile(r'^(={2,6})[ \t]*(.+?)[ \t]*\1[ \t]*$', re.MULTILINE)
+
+def parse_sections(text):
+    """
+    Split article text into sections on its "== Heading ==" lines.
+
+    The lead (text before the first heading) is always section 0, with
+    level 0 and no heading. Offsets and lengths are in characters and cover
+    a section's body, without its heading line. Past SECTION_SPAN - 1
+    headings the rest of the article stays in the last section.
+
+    Returns:
+        List of (level, heading, offset, length, word_count) tuples
+    """
+    starts = [(0, 0, None, 0)]
+    for match in SECTION_HEADING_RE.finditer(text):
+        if len(starts) == SECTION_SPAN:
+            break
+        body_start = match.end() + 1 if text.startswith('\n', match.end()) else match.end()
+        starts.append((match.start(), len(match.group(1)), match.group(2), body_start))
+
+    sections = []
+    for index, (_, level, heading, body_start) in enumerate(starts):
+        end = starts[index + 1][0] if index + 1 < len(starts) else len(text)
+        sections.append((level, heading, body_start, end - body_start, len(text[body_start:end].split())))
+    return sections
+
+def register_functions(conn):
+    """
+    Register article_text(content, content_z, content_codec), the SQL
+    function that reads an article's plain text.
+
+    The articles_text view (and so rebuilding articles_fts from it) uses
+    it; nothing that writes articles does, so other SQLite clients can
+    write to the database without it.
+    """
+    conn.create_function('article_text', 3, _stored_text, deterministic=True)
+
+def article_from_row(row):
+    """
+    Convert an articles row to a dictionary with plain-text content.
+
+    Storage-only columns (compressed blob, codec, sizes and HTTP validators)
+    are dropped.
+    """
+    article = dict(row)
+    codec = article.pop('content_codec', None)
+    blob = article.pop('content_z', None)
+    for column in ('content_size', 'stored_size', 'content_hash', 'modified_date'):
+        article.pop(column, None)
+    if codec is not None:
+        article['content'] = compression.decompress_text(codec, blob)
+    return article
+
+class PooledConnection(sqlite3.Connection):
+    """
+    SQLite connection that returns itself to the pool on close().
+
+    Existing helpers keep calling conn.close() as before; the connection is
+    only really closed when the pool is full or has been reset.
+    """
+
+    def close(self):
+        self.pool.release(self)
+
+    def really_close(self):
+        super().close()
+
+class ConnectionPool:
+    """
+    Per-process, queue-based pool of configured SQLite connections.
+
+    Connections are shared across threads (one thread at a time), so they are
+    opened with check_same_thread=False. The pool is rebuilt automatically
+    after a fork (e.g. gunicorn workers) or when DB_PATH changes, and
+    renew() retires every open connection (busy ones when they come back).
+    Each shard of a sharded library has a pool of its own (see _shard_pool).
+    """
+
+    def __init__(self, max_size, shard=0):
+        self.max_size = max_size
+        self.shard = shard
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._reset(shard_path(shard))
+
+    def _reset(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=self.max_size)
+        # Connections from before a reset (another file or process) are never reused
+        self.generation += 1
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    def _connect(self):
+        if DB_READ_ONLY:
+            conn = sqlite3.connect(read_only_uri(self.path), uri=True, factory=PooledConnection,
+                                   check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.path, factory=PooledConnection, check_same_thread=False)
+        conn.generation = self.generation
+        conn.pool = self
+        register_functions(conn)
+        conn.execute(f'PRAGMA synchronous={DB_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}')
+        conn.execute(f'PRAGMA cache_size=-{DB_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def acquire(self):
+        path = shard_path(self.shard)
+        with self._lock:
+            if self.pid != os.getpid() or self.path != path:
+                # Connections inherited from a parent process must not be reused
+                self._reset(path)
+            try:
+                conn = self._idle.get_nowait()
+                self.hits += 1
+            except queue.Empty:
+                conn = None
+                self.misses += 1
+
+        if conn is None:
+            conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.ProgrammingError:
+            # Already closed
+            return
+
+        with self._lock:
+            reusable = (self.pid == os.getpid() and self.path == shard_path(self.shard)
+                        and conn.generation == self.generation)
+            if reusable:
+                try:
+                    self._idle.put_nowait(conn)
+                    return
+                except queue.Full:
+                    pass
+            self.discarded += 1
+        conn.really_close()
+
+    def renew(self):
+        """
+        Stop reusing the connections opened so far.
+
+        Idle ones are closed now; ones in use carry on with the file they
+        opened and are closed when released. Used when a new snapshot has
+        replaced the database file.
+        """
+        with self._lock:
+            self.generation += 1
+            idle, self._idle = self._idle, queue.LifoQueue(maxsize=self.max_size)
+        while True:
+            try:
+                idle.get_nowait().really_close()
+            except queue.Empty:
+                break
+
+    def clear(self):
+        """Close every idle connection."""
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().really_close()
+                except queue.Empty:
+                    break
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": self.max_size,
+                "idle": self._idle.qsize(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "generation": self.generation,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0
+            }
+
+def read_only_uri(path, immutable=None):
+    """Return the SQLite URI that opens path read-only (and immutable, by default if DB_IMMUTABLE)."""
+    uri = f"file:{urllib.parse.quote(os.path.abspath(path))}?mode=ro"
+    return uri + '&immutable=1' if (DB_IMMUTABLE if immutable is None else immutable) else uri
+
+_pool = ConnectionPool(DB_POOL_SIZE)
+# Pools by shard, created on first use; shard 0 is _pool
+_pools = {0: _pool}
+_pools_lock = threading.Lock()
+
+def _shard_pool(shard):
+    pool = _pools.get(shard)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(shard, ConnectionPool(DB_POOL_SIZE, shard))
+    return pool
+
+def _shard_connection(shard):
+    """Return a pooled connection to one shard's file, whatever shard this context is on."""
+    return _shard_pool(shard).acquire()
+
+def get_db_connection():
+    """
+    Return a pooled database connection with row factory for dict-like access.
+
+    The connection goes to the current shard: shard 0 (DATABASE_PATH)
+    unless a sharded call is running one of its parts (see on_shard).
+    Call conn.close() when done to hand the connection back to the pool.
+    """
+    if DB_READ_ONLY:
+        _check_snapshot()
+    return _shard_connection(_shard.get())
+
+def get_pool_stats():
+    """Return connection pool hit/miss counters for this process (summed over shards if sharded)."""
+    if _in_shard.get() or shard_count() == 1:
+        return _shard_pool(_shard.get()).stats()
+    pools = [_shard_pool(shard).stats() for shard in range(shard_count())]
+    stats = {key: sum(pool[key] for pool in pools) for key in ('size', 'idle', 'hits', 'misses', 'discarded')}
+    stats['generation'] = max(pool['generation'] for pool in pools)
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0.0
+    return stats
+
+# Per-process read cache for hot articles, searches, tags and favorites
+_cache = cache.ByteLRUCache(cache.CACHE_MAX_BYTES, cache.CACHE_TTL_SECONDS)
+# Last invalidation log entry applied, by database file (each shard logs its own writes)
+_cache_sync = {"seqs": {}, "checked": 0.0, "lock": threading.Lock()}
+
+# Invalidation log entries kept for processes that have fallen behind
+CACHE_LOG_KEEP = 10000
+
+def cached(namespace):
+    """
+    Cache a read function's results in the process-wide read cache.
+
+    The cache key is the call's arguments (the bare value for one-argument
+    functions, so entries can be invalidated by ID or tag name). None results
+    are not cached, since a missing article may be inserted later.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def cache_key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            # Lists (of IDs or names) are keyed as tuples
+            values = tuple(tuple(value) if isinstance(value, list) else value
+                           for value in bound.arguments.values())
+            return values[0] if len(values) == 1 else values
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _in_shard.get():
+                # One shard's part of a call; the whole result is what gets cached
+                return func(*args, **kwargs)
+            key = cache_key(*args, **kwargs)
+
+            _sync_cache()
+            value = _cache.get(namespace, key)
+            if value is not cache.MISS:
+                return value
+
+            stamp = _cache.stamp()
+            value = func(*args, **kwargs)
+            if value is not None:
+                _cache.put(namespace, key, value, stamp)
+            return value
+
+        # For readers that share the entry (see _stream_rows)
+        wrapper.cache_namespace = namespace
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorator
+
+def _log_invalidations(cursor, entries):
+    """Record invalidations in the writer's transaction so other processes see them."""
+    if not cache.CACHE_SHARED or not _cache.enabled:
+        return
+    cursor.executemany('INSERT INTO cache_invalidations (namespace, key) VALUES (?, ?)',
+                       [(namespace, None if key is None else json.dumps(key)) for namespace, key in entries])
+    cursor.execute('DELETE FROM cache_invalidations WHERE seq <= last_insert_rowid() - ?', (CACHE_LOG_KEEP,))
+
+# Callables told about every applied invalidation (see add_change_listener)
+_change_listeners = []
+
+def add_change_listener(listener):
+    """
+    Call listener(entries) whenever cache entries are invalidated.
+
+    entries is a list of (namespace, key) pairs, as logged by writers in
+    this process or picked up from other processes by _sync_cache; None
+    means everything may have changed. Listeners must be quick and must
+    not raise.
+    """
+    _change_listeners.append(listener)
+
+def _notify(entries):
+    for listener in _change_listeners:
+        listener(entries)
+
+def _invalidate(entries):
+    """Drop cache entries after the change that stales them has committed."""
+    for namespace, key in entries:
+        _cache.invalidate(namespace, key)
+    if entries:
+        _notify(entries)
+
+def _sync_cache():
+    """Apply invalidations committed by other processes, at most every CACHE_SYNC_SECONDS."""
+    if DB_READ_ONLY:
+        # A replica's file never changes; a new snapshot replaces it whole
+        _check_snapshot()
+        return
+    if not cache.CACHE_SHARED or not _cache.enabled:
+        return
+    now = time.monotonic()
+    if now - _cache_sync["checked"] < cache.CACHE_SYNC_SECONDS:
+        return
+    # One thread syncs at a time; the others carry on with what is cached
+    if not _cache_sync["lock"].acquire(blocking=False):
+        return
+    try:
+        for shard in range(shard_count()):
+            with on_shard(shard):
+                _sync_shard_cache()
+        _cache_sync["checked"] = now
+    except Exception:
+        # A failed sync just means checking again on the next lookup
+        pass
+    finally:
+        _cache_sync["lock"].release()
+
+def _sync_shard_cache():
+    """Apply the current shard's invalidation log entries that this process has not seen yet."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT MIN(seq) as first, MAX(seq) as last FROM cache_invalidations')
+        row = cursor.fetchone()
+        first, last = row['first'] or 0, row['last'] or 0
+        path = shard_path(_shard.get())
+        seen = _cache_sync["seqs"].get(path)
+        if seen is None or seen < first - 1:
+            # First sync, or the entries we missed were pruned
+            _cache.clear()
+            _notify(None)
+        elif last > seen:
+            cursor.execute('SELECT namespace, key FROM cache_invalidations WHERE seq > ? ORDER BY seq', (seen,))
+            _invalidate([(r['namespace'], None if r['key'] is None else json.loads(r['key']))
+                         for r in cursor.fetchall()])
+    finally:
+        conn.close()
+    _cache_sync["seqs"][path] = last
+
+def get_cache_stats():
+    """Return read cache size, hit ratio and eviction counters for this process."""
+    return _cache.stats()
+
+def clear_cache():
+    """Drop every cached read in this process."""
+    _cache.clear()
+
+# Identity of the database file a replica is reading (see _check_snapshot)
+_snapshot_state = {"file": None, "checked": 0.0, "lock": threading.Lock()}
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+def _check_snapshot():
+    """
+    Switch a replica to a new snapshot, at most every SNAPSHOT_CHECK_SECONDS.
+
+    Snapshots are installed by renaming a complete file over DB_PATH (see
+    snapshot.install), so a different inode means a new snapshot. Connections already reading the
+    old file finish on it (it stays readable until its last connection
+    closes); new ones open the new file, and cached reads start over. A
+    sharded library counts as changed when any of its files has.
+    """
+    now = time.monotonic()
+    if now - _snapshot_state["checked"] < SNAPSHOT_CHECK_SECONDS:
+        return
+    if not _snapshot_state["lock"].acquire(blocking=False):
+        return
+    try:
+        _snapshot_state["checked"] = now
+        try:
+            identity = tuple(_file_identity(shard_path(shard)) for shard in range(shard_count()))
+        except OSError:
+            # Mid-install on a filesystem without atomic rename; keep the current file
+            # (and look at the layout again, which an install may be changing)
+            _reload_layout()
+            return
+        previous, _snapshot_state["file"] = _snapshot_state["file"], identity
+        if previous is not None and previous != identity:
+            # The new snapshot may have a different number of shards
+            _reload_layout()
+            for pool in list(_pools.values()):
+                pool.renew()
+            _cache.clear()
+            with _tag_id_cache["lock"]:
+                _tag_id_cache["ids"] = {}
+            _notify(None)
+    finally:
+        _snapshot_state["lock"].release()
+
+def backup_database(path):
+    """
+    Copy the database to a new SQLite file, e.g. a snapshot for replicas.
+
+    The copy is made with SQLite's online backup API in one step, i.e. one
+    read transaction, so it is consistent and writers carry on meanwhile
+    (in WAL mode). It is switched to a rollback journal, so a replica can
+    open it immutable, with no -wal file to look for.
+
+    Args:
+        path: Destination file (must not be in use)
+
+    Returns:
+        Number of articles in the copy
+    """
+    source = get_db_connection()
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+        target.execute('PRAGMA journal_mode=DELETE')
+        return target.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+
+def rebalance_shards(shards, batch_size=500, progress=None):
+    """
+    Split the library into a different number of shards.
+
+    Articles whose shard changes are moved a batch at a time: each batch is
+    copied with its tags, favorites, aliases and revisions into its new
+    shard in one transaction, then deleted from the old one. The target is
+    recorded in every file first, and init_db refuses to start until the
+    rebalance has finished, so an interrupted run is completed by running
+    it again. Run it while the app is stopped; shard files no longer
+    needed are removed at the end.
+
+    Args:
+        shards: New number of shards (1 to SHARD_BUCKETS)
+        batch_size: Articles moved per transaction
+        progress: Optional callable(moved, None) called after each batch
+
+    Returns:
+        Dictionary with from and to (numbers of shards), moved (articles)
+        and removed (shard files deleted)
+
+    Raises:
+        ValueError: If shards is out of range
+        RuntimeError: On a read-only replica
+    """
+    if not 1 <= shards <= SHARD_BUCKETS:
+        raise ValueError(f"Shards must be between 1 and {SHARD_BUCKETS}")
+    if DB_READ_ONLY:
+        raise RuntimeError("Cannot rebalance a read-only database")
+
+    layout = read_shard_layout(DB_PATH)
+    current = layout['shards'] if layout else 1
+    # An interrupted rebalance may have left articles in files up to its target
+    files = max(current, layout['target'] if layout else 1, shards)
+    for shard in range(files):
+        if shard < shards or os.path.exists(shard_path(shard)):
+            _init_shard(shard, current, shards)
+
+    moved = 0
+    for source in range(files):
+        if not os.path.exists(shard_path(source)):
+            continue
+        while True:
+            conn = _shard_connection(source)
+            try:
+                cursor = conn.cursor()
+                cursor.execute('SELECT id FROM articles WHERE id % ? % ? != ? ORDER BY id LIMIT ?',
+                               (SHARD_BUCKETS, shards, source, batch_size))
+                article_ids = [row['id'] for row in cursor.fetchall()]
+            finally:
+                conn.close()
+            if not article_ids:
+                break
+            groups = {}
+            for article_id in article_ids:
+                groups.setdefault(article_id % SHARD_BUCKETS % shards, []).append(article_id)
+            for target, ids in groups.items():
+                _move_articles(source, target, ids)
+            moved += len(article_ids)
+            if progress:
+                progress(moved, None)
+
+    # New IDs must stay above every ID used so far, on whichever shard
+    last_id = 0
+    for shard in range(files):
+        if not os.path.exists(shard_path(shard)):
+            continue
+        conn = _shard_connection(shard)
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'articles'").fetchone()
+            last_id = max(last_id, row['seq'] if row else 0)
+        finally:
+            conn.close()
+
+    removed = []
+    for shard in range(shards, files):
+        path = shard_path(shard)
+        if not os.path.exists(path):
+            continue
+        conn = _shard_connection(shard)
+        try:
+            if conn.execute('SELECT 1 FROM articles LIMIT 1').fetchone():
+                raise RuntimeError(f"Shard {shard} still has articles: {path}")
+        finally:
+            conn.close()
+        _shard_pool(shard).renew()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        removed.append(path)
+
+    # Shard 0 last: its layout is what init_db and shard_count read
+    for shard in reversed(range(shards)):
+        conn = _shard_connection(shard)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'articles'", (last_id,))
+            if cursor.rowcount == 0:
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('articles', ?)", (last_id,))
+            cursor.execute('UPDATE shard_layout SET shards = ?, target = ? WHERE id = 1', (shards, shards))
+            conn.commit()
+        finally:
+            conn.close()
+
+    _reload_layout()
+    for pool in list(_pools.values()):
+        pool.renew()
+    _cache.clear()
+    with _tag_id_cache["lock"]:
+        _tag_id_cache["ids"] = {}
+    _notify(None)
+    return {"from": current, "to": shards, "moved": moved, "removed": removed}
+
+# Tables copied along with an article by _move_articles, with their article ID column
+SHARD_MOVE_TABLES = (('articles', 'id'), ('favorites', 'article_id'), ('article_aliases', 'article_id'),
+                     ('article_revisions', 'article_id'))
+
+def _move_articles(source, target, article_ids):
+    """Copy articles and what belongs to them from one shard file to another, then delete them from the first."""
+    ids = json.dumps(article_ids)
+    conn = _shard_connection(target)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('ATTACH DATABASE ? AS source', (shard_path(source),))
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            # Articles already there were copied (and indexed) by an interrupted run
+            cursor.execute('SELECT id FROM main.articles WHERE id IN (SELECT value FROM json_each(?))', (ids,))
+            present = {row['id'] for row in cursor.fetchall()}
+            for table, column in SHARD_MOVE_TABLES:
+                cursor.execute(f'PRAGMA main.table_info({table})')
+                columns = ', '.join(row['name'] for row in cursor.fetchall())
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO main.{table} ({columns})
+                    SELECT {columns} FROM source.{table} WHERE {column} IN (SELECT value FROM json_each(?))
+                ''', (ids,))
+            cursor.execute('SELECT COUNT(*) FROM main.articles WHERE id IN (SELECT value FROM json_each(?))', (ids,))
+            missing = len(article_ids) - cursor.fetchone()[0]
+            if missing:
+                # Another article has the title there; deleting the source would lose it
+                raise RuntimeError(f"Cannot move {missing} article(s) to shard {target}: title already saved there")
+            _index_articles(cursor, _indexed_articles(cursor, [article_id for article_id in article_ids
+                                                               if article_id not in present]))
+            # Tags are numbered per shard, so links are matched by name
+            cursor.execute('''
+                INSERT OR IGNORE INTO main.tags (name)
+                SELECT DISTINCT t.name FROM source.article_tags at JOIN source.tags t ON t.id = at.tag_id
+                WHERE at.article_id IN (SELECT value FROM json_each(?))
+            ''', (ids,))
+            cursor.execute('''
+                INSERT OR IGNORE INTO main.article_tags (article_id, tag_id)
+                SELECT at.article_id, mt.id
+                FROM source.article_tags at
+                JOIN source.tags st ON st.id = at.tag_id
+                JOIN main.tags mt ON mt.name = st.name
+                WHERE at.article_id IN (SELECT value FROM json_each(?))
+            ''', (ids,))
+            # Linking tags and aliases touched modified_date; keep the original
+            cursor.execute('''
+                UPDATE main.articles
+                SET modified_date = (SELECT s.modified_date FROM source.articles s WHERE s.id = main.articles.id)
+                WHERE id IN (SELECT value FROM json_each(?))
+            ''', (ids,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.execute('DETACH DATABASE source')
+    finally:
+        conn.close()
+
+    conn = _shard_connection(source)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        _unindex_articles(cursor, _indexed_articles(cursor, article_ids))
+        cursor.execute('DELETE FROM articles WHERE id IN (SELECT value FROM json_each(?))', (ids,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _article_change_entries(article_ids, tag_names=None):
+    """Cache entries staled by inserting or deleting articles."""
+    entries = [('search', None), ('tags', None), ('tag_queries', None), ('duplicates', None)]
+    if article_ids is None:
+        entries += [('article', None), ('validators', None), ('sections', None), ('favorites', None),
+                    ('favorite', None), ('tag_articles', None)]
+        return entries
+    for article_id in article_ids:
+        # Request bodies may carry IDs as strings; cache keys are ints
+        if isinstance(article_id, str) and article_id.isdigit():
+            article_id = int(article_id)
+        entries += [('article', article_id), ('validators', article_id), ('sections', article_id),
+                    ('favorite', article_id)]
+    if tag_names is None:
+        entries += [('favorites', None), ('tag_articles', None)]
+    else:
+        entries += [('tag_articles', name) for name in tag_names]
+    return entries
+
+def content_hash(content):
+    """Return the SHA-256 hex digest of article text (used for HTTP ETags)."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+INSERT_ARTICLE_SQL = '''
+    INSERT INTO articles (title, content, content_z, content_codec, content_size, stored_size,
+                          summary, url, fetched_date, word_count, character_count, content_hash, id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def prepare_article_row(title, content, url, word_count=None, char_count=None):
+    """
+    Validate an article and build its row for INSERT_ARTICLE_SQL.
+
+    Args:
+        title: Article title (required)
+        content: Full article text (required)
+        url: Wikipedia URL
+        word_count: Number of words (optional, will be calculated if not provided)
+        char_count: Number of characters (optional, will be calculated if not provided)
+
+    Returns:
+        Tuple of column values in INSERT_ARTICLE_SQL order, except the ID
+        (see _with_new_ids); large content is compressed (see
+        compression.py) and stored in content_z instead
+
+    Raises:
+        ValueError: If validation fails
+    """
+    # Validation
+    if not title or not title.strip():
+        raise ValueError("Title is required")
+    if not content or len(content) < 10:
+        raise ValueError("Content is required and must be at least 10 characters")
+    if len(title) > 500:
+        raise ValueError("Title must be less than 500 characters")
+
+    title = title.strip()
+
+    # Calculate summary: First 200 characters, truncated at last complete word
+    summary = content[:200]
+    if len(content) > 200:
+        last_space = summary.rfind(' ')
+        if last_space > 0:
+            summary = summary[:last_space] + '...'
+
+    # Calculate word and character counts if not provided
+    if word_count is None:
+        word_count = len(content.split())
+    if char_count is None:
+        char_count = len(content)
+
+    # Compress large bodies; the plain column then holds an empty string
+    codec, blob, content_size = compression.compress_text(content)
+    if codec is None:
+        stored = (content, None, None, content_size, content_size)
+    else:
+        stored = ('', blob, codec, content_size, len(blob))
+
+    return (title, *stored, summary, url, datetime.now().isoformat(), word_count, char_count,
+            content_hash(content))
+
+def _with_new_ids(cursor, rows):
+    """
+    Append the ID for each new article row (title first), as the last column of INSERT_ARTICLE_SQL.
+
+    An unsharded library leaves IDs to SQLite (None). A shard allocates
+    them above every ID it has used, with id % SHARD_BUCKETS being the
+    title's bucket when this shard owns that bucket (else the shard number),
+    so IDs are unique across shards and articles stay put when shards are
+    rebalanced. The write transaction starts here, so concurrent writers
+    to the shard cannot take the same IDs.
+    """
+    if shard_count() == 1:
+        return [(*row, None) for row in rows]
+    if not cursor.connection.in_transaction:
+        cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('''
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'articles'), 0),
+                   COALESCE((SELECT MAX(id) FROM articles), 0))
+    ''')
+    block = cursor.fetchone()[0] // SHARD_BUCKETS + 1
+    shard = _shard.get()
+    blocks = {}
+    rows_with_ids = []
+    for row in rows:
+        bucket = _title_bucket(row[0])
+        if bucket % shard_count() != shard:
+            bucket = shard
+        bucket_block = blocks.get(bucket, block)
+        blocks[bucket] = bucket_block + 1
+        rows_with_ids.append((*row, bucket_block * SHARD_BUCKETS + bucket))
+    return rows_with_ids
+
+def _placement_item(title, content):
+    """Return (stripped title, content hash) of a new article for _place_articles (None for missing values)."""
+    title = title.strip() if isinstance(title, str) else None
+    digest = content_hash(content) if isinstance(content, str) and content else None
+    return title or None, digest
+
+def _place_articles(items, lookup):
+    """
+    Choose the shard for each new article of a sharded library.
+
+    An article goes where its title is already saved (as a title or an
+    alias), else where its text is (to become an alias there), else to its
+    title's home shard. Repeats within items follow the first, so in-batch
+    duplicates meet on one shard. Untitled ones go to shard 0 to be rejected.
+
+    Args:
+        items: List of (title, content hash) pairs, see _placement_item
+        lookup: Callable(titles, hashes) returning ({title: ID}, {hash: ID})
+                for saved articles, e.g. _find_saved
+
+    Returns:
+        List of shard numbers, in items order
+    """
+    by_title, by_hash = lookup(list({title for title, _ in items if title}),
+                               list({digest for _, digest in items if digest}))
+    placed_titles = {}
+    placed_hashes = {}
+    shards = []
+    for title, digest in items:
+        if not title:
+            shard = 0
+        elif title in by_title:
+            shard = shard_of_article(by_title[title])
+        elif title in placed_titles:
+            shard = placed_titles[title]
+        elif digest in by_hash:
+            shard = shard_of_article(by_hash[digest])
+        elif digest in placed_hashes:
+            shard = placed_hashes[digest]
+        else:
+            shard = _title_bucket(title) % shard_count()
+        if title and title not in by_title:
+            placed_titles.setdefault(title, shard)
+            if digest:
+                placed_hashes.setdefault(digest, shard)
+        shards.append(shard)
+    return shards
+
+def _find_on_cursor(cursor, titles, hashes):
+    return _select_ids_by_title(cursor, titles), _select_ids_by_hash(cursor, hashes)
+
+def _merge_found(results):
+    """Merge _find_on_cursor results from several shards (the oldest article wins a hash)."""
+    by_title = {}
+    by_hash = {}
+    for titles, hashes in results:
+        by_title.update(titles)
+        for digest, article_id in hashes.items():
+            by_hash[digest] = min(article_id, by_hash.get(digest, article_id))
+    return by_title, by_hash
+
+def _find_saved(titles, hashes):
+    """Look up saved titles and texts on every shard, for _place_articles."""
+    return _merge_found(_on_every_shard(_select_with_connection, _find_on_cursor, titles, hashes))
+
+def _on_placed_shard(func, *args, **kwargs):
+    """Run insert_article on the shard the new article belongs on."""
+    arguments = inspect.signature(func).bind(*args, **kwargs).arguments
+    item = _placement_item(arguments.get('title'), arguments.get('content'))
+    return _run_on_shard(_place_articles([item], _find_saved)[0], func, *args, **kwargs)
+
+@sharded(_on_placed_shard)
+def insert_article(title, content, url, word_count=None, char_count=None, tags=None):
+    """
+    Insert a new article into the database with optional tags.
+
+    If another article already has exactly the same text, the title is
+    stored as an alias of that article instead of a second copy, and the
+    tags are added to it.
+
+    Args:
+        title: Article title (required)
+        content: Full article text (required)
+        url: Wikipedia URL (required)
+        word_count: Number of words (optional, will be calculated if not provided)
+        char_count: Number of characters (optional, will be calculated if not provided)
+        tags: List of tag names (optional)
+
+    Returns:
+        Inserted article ID (or the ID of the article it duplicates)
+
+    Raises:
+        sqlite3.IntegrityError: If article with same title already exists
+        ValueError: If validation fails
+    """
+    if tags is None:
+        tags = []
+
+    row = prepare_article_row(title, content, url, word_count, char_count)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('SELECT 1 FROM article_aliases WHERE title = ?', (row[0],))
+        if cursor.fetchone():
+            raise ValueError("Article already saved")
+
+        duplicate_of = _select_ids_by_hash(cursor, [row[11]]).get(row[11])
+        if duplicate_of is not None:
+            # Same text under another title: keep one copy
+            cursor.execute('SELECT 1 FROM articles WHERE title = ?', (row[0],))
+            if cursor.fetchone():
+                raise ValueError("Article already saved")
+            cursor.execute('INSERT INTO article_aliases (title, article_id) VALUES (?, ?)', (row[0], duplicate_of))
+            article_id = duplicate_of
+        else:
+            # Insert article
+            cursor.execute(INSERT_ARTICLE_SQL, _with_new_ids(cursor, [row])[0])
+            article_id = cursor.lastrowid
+            _index_articles(cursor, [(article_id, row[0], content)])
+
+        # Insert tags if provided
+        tag_ids = _tag_ids(cursor, tags)
+        cursor.executemany('INSERT OR IGNORE INTO article_tags (article_id, tag_id) VALUES (?, ?)',
+                           [(article_id, tag_id) for tag_id in tag_ids.values()])
+
+        changes = _article_change_entries([article_id], list(tag_ids))
+        _log_invalidations(cursor, changes)
+        conn.commit()
+        _invalidate(changes)
+        return article_id
+
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        if "UNIQUE constraint failed" in str(e):
+            raise ValueError("Article already saved")
+        raise
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+@cached('article')
+@sharded(_on_article_shard)
+def get_article_by_id(article_id):
+    """
+    Retrieve a single article by ID with its tags.
+
+    Args:
+        article_id: Article ID
+
+    Returns:
+        Dictionary with article data, tags and aliases arrays, or None if not found
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Get article data
+    cursor.execute('SELECT * FROM articles WHERE id = ?', (article_id,))
+    article = cursor.fetchone()
+
+    if not article:
+        conn.close()
+        return None
+
+    # Convert row to dictionary (decompressing content if needed)
+    article_dict = article_from_row(article)
+
+    # Get tags for this article
+    cursor.execute('''
+        SELECT tags.name
+        FROM tags
+        JOIN article_tags ON tags.id = article_tags.tag_id
+        WHERE article_tags.article_id = ?
+    ''', (article_id,))
+
+    tags = [row['name'] for row in cursor.fetchall()]
+    article_dict['tags'] = tags
+
+    # Other titles saved with exactly this text
+    cursor.execute('SELECT title FROM article_aliases WHERE article_id = ? ORDER BY title', (article_id,))
+    article_dict['aliases'] = [row['title'] for row in cursor.fetchall()]
+
+    conn.close()
+    return article_dict
+
+@sharded(_on_article_shard)
+def get_article_preview(article_id):
+    """
+    Get an article's metadata and summary without reading its text.
+
+    Returns:
+        Dictionary with id, title, summary, url, word_count,
+        character_count and saved_date, or None if not found
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, title, summary, url, word_count, character_count, saved_date
+            FROM articles WHERE id = ?
+        ''', (article_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+@cached('validators')
+@sharded(_on_article_shard)
+def get_article_validators(article_id):
+    """
+    Get the HTTP cache validators of an article without loading its content.
+
+    Articles saved before content hashes existed get theirs computed and
+    stored on first request (only computed, on a read-only replica).
+
+    Args:
+        article_id: Article ID
+
+    Returns:
+        Dictionary with id, title, url, content_hash, saved_date,
+        modified_date and tags, or None if not found
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, title, url, content_hash, saved_date, modified_date
+            FROM articles WHERE id = ?
+        ''', (article_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        validators = dict(row)
+
+        if validators['content_hash'] is None:
+            cursor.execute('SELECT article_text(content, content_z, content_codec) as content FROM articles WHERE id = ?',
+                           (article_id,))
+            validators['content_hash'] = content_hash(cursor.fetchone()['content'])
+            # Replicas compute it each time; the primary stores it for the next snapshot
+            if not DB_READ_ONLY:
+                cursor.execute('UPDATE articles SET content_hash = ? WHERE id = ?',
+                               (validators['content_hash'], article_id))
+                conn.commit()
+
+        cursor.execute('''
+            SELECT tags.name
+            FROM tags
+            JOIN article_tags ON tags.id = article_tags.tag_id
+            WHERE article_tags.article_id = ?
+            ORDER BY tags.name
+        ''', (article_id,))
+        validators['tags'] = [row['name'] for row in cursor.fetchall()]
+        return validators
+    finally:
+        conn.close()
+
+@sharded(_on_article_shard)
+def get_article_content(article_id, offset=0, length=None):
+    """
+    Read a slice of an article's text without loading the rest of the row.
+
+    Plain-text rows are sliced by SQLite with substr(); compressed rows have
+    to be decompressed whole, but only the slice is returned.
+
+    Args:
+        article_id: Article ID
+        offset: Character offset to start at (default 0)
+        length: Number of characters (default CONTENT_CHUNK_CHARS, capped at
+            CONTENT_CHUNK_MAX_CHARS)
+
+    Returns:
+        Dictionary with id, offset, length, total_length, content and
+        next_offset (None after the last slice), or None if not found
+
+    Raises:
+        ValueError: If offset is negative or length is not positive
+    """
+    if length is None:
+        length = CONTENT_CHUNK_CHARS
+    if offset < 0 or length < 1:
+        raise ValueError("offset must be 0 or more and length at least 1")
+    length = min(length, CONTENT_CHUNK_MAX_CHARS)
+
+    conn = get_db_connection()
+    try:
+        found = _read_text_slice(conn.cursor(), article_id, offset, length)
+    finally:
+        conn.close()
+    if found is None:
+        return None
+
+    chunk, total_length = found
+    end = offset + len(chunk)
+    return {
+        "id": article_id,
+        "offset": offset,
+        "length": len(chunk),
+        "total_length": total_length,
+        "content": chunk,
+        "next_offset": end if end < total_length else None
+    }
+
+def _read_text_slice(cursor, article_id, offset, length):
+    """Return (text[offset:offset + length], total length) of an article, or None."""
+    cursor.execute('''
+        SELECT content_codec, content_z,
+               CASE WHEN content_codec IS NULL THEN substr(content, ?, ?) END AS chunk,
+               CASE WHEN content_codec IS NULL THEN length(content) END AS total_length
+        FROM articles WHERE id = ?
+    ''', (offset + 1, length, article_id))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if row['content_codec'] is None:
+        return row['chunk'] or '', row['total_length'] or 0
+    # Compressed rows can only be sliced after decompressing them whole
+    text = compression.decompress_text(row['content_codec'], row['content_z'])
+    return text[offset:offset + length], len(text)
+
+def _section_from_row(row):
+    return {
+        "position": row['position'],
+        "level": row['level'],
+        "heading": row['heading'],
+        "offset": row['char_offset'],
+        "length": row['char_length'],
+        "word_count": row['word_count']
+    }
+
+@cached('sections')
+@sharded(_on_article_shard)
+def get_article_sections(article_id):
+    """
+    List an article's sections without reading its text.
+
+    Args:
+        article_id: Article ID
+
+    Returns:
+        List of dictionaries with position, level, heading, offset, length
+        and word_count (the lead is position 0), or None if not found
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT position, level, heading, char_offset, char_length, word_count
+            FROM article_sections WHERE article_id = ?
+            ORDER BY position
+        ''', (article_id,))
+        sections = [_section_from_row(row) for row in cursor.fetchall()]
+        if not sections:
+            # Every stored article has at least its lead section
+            return None
+        return sections
+    finally:
+        conn.close()
+
+@sharded(_on_article_shard)
+def get_article_section(article_id, position):
+    """
+    Read one section of an article, fetching only that part of its text.
+
+    Args:
+        article_id: Article ID
+        position: Section number from get_article_sections() (0 is the lead)
+
+    Returns:
+        Section dictionary with its content, or None if the article or
+        section does not exist
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT position, level, heading, char_offset, char_length, word_count
+            FROM article_sections WHERE article_id = ? AND position = ?
+        ''', (article_id, position))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        section = _section_from_row(row)
+        found = _read_text_slice(cursor, article_id, section['offset'], section['length'])
+    finally:
+        conn.close()
+    if found is None:
+        return None
+    section['article_id'] = article_id
+    section['content'] = found[0]
+    return section
+
+ARTICLE_LIST_SQL = '''
+    SELECT id, title, saved_date, word_count, substr(summary, 1, 100) as summary
+    FROM articles
+    ORDER BY saved_date DESC, id DESC
+    LIMIT ? OFFSET ?
+'''
+
+def _page_size(limit):
+    """Clamp a requested page size to 1..100 (50 if missing or too large)."""
+    if limit is None or limit > 100:
+        return 50
+    return max(limit, 1)
+
+def _newest_first(article):
+    return article['saved_date'], article['id']
+
+def _select_dicts(cursor, sql, params):
+    cursor.execute(sql, params)
+    return [dict(row) for row in cursor.fetchall()]
+
+def _list_on_shards(func, limit=50, offset=0):
+    """
+    Run get_all_articles on every shard: each lists its newest offset +
+    limit articles, and the page is cut from their merge (so deep offsets
+    cost more than on one file; get_articles_page does not).
+    """
+    limit = _page_size(limit)
+    if offset is None or offset < 0:
+        offset = 0
+    parts = _on_every_shard(_select_with_connection, _select_dicts, ARTICLE_LIST_SQL, (limit + offset, 0))
+    return list(itertools.islice(heapq.merge(*parts, key=_newest_first, reverse=True), offset, offset + limit))
+
+@sharded(_list_on_shards)
+def get_all_articles(limit=50, offset=0):
+    """
+    List all articles with pagination.
+
+    Args:
+        limit: Maximum number of articles to return (default 50)
+        offset: Number of articles to skip (default 0)
+
+    Returns:
+        List of article dictionaries with preview data
+    """
+    limit = _page_size(limit)
+    if offset is None or offset < 0:
+        offset = 0
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(ARTICLE_LIST_SQL, (limit, offset))
+
+    articles = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+
+    return articles
+
+def _page_on_shards(func, limit=50, cursor=None):
+    """Run get_articles_page on every shard and keep the newest limit articles of their pages."""
+    limit = _page_size(limit)
+    parts = _on_every_shard(func, limit, cursor)
+    articles = list(heapq.merge(*(page for page, _ in parts), key=_newest_first, reverse=True))
+    next_cursor = None
+    if len(articles) > limit or any(shard_cursor for _, shard_cursor in parts):
+        articles = articles[:limit]
+        next_cursor = encode_cursor(articles[-1]['saved_date'], articles[-1]['id'])
+    return articles, next_cursor
+
+@sharded(_page_on_shards)
+def get_articles_page(limit=50, cursor=None):
+    """
+    List articles newest first using keyset pagination on (saved_date, id).
+
+    Each page is an index range scan, so deep pages cost the same as the
+    first one (unlike OFFSET).
+
+    Args:
+        limit: Maximum number of articles to return (default 50, max 100)
+        cursor: Token from a previous page's next_cursor, or None for the first page
+
+    Returns:
+        Tuple of (list of article dictionaries, next_cursor or None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = _page_size(limit)
+
+    conn = get_db_connection()
+    db_cursor = conn.cursor()
+
+    # Fetch one extra row to know whether another page exists
+    if cursor:
+        saved_date, article_id = decode_cursor(cursor)
+        db_cursor.execute('''
+            SELECT id, title, saved_date, word_count, substr(summary, 1, 100) as summary
+            FROM articles
+            WHERE (saved_date, id) < (?, ?)
+            ORDER BY saved_date DESC, id DESC
+            LIMIT ?
+        ''', (saved_date, article_id, limit + 1))
+    else:
+        db_cursor.execute('''
+            SELECT id, title, saved_date, word_count, substr(summary, 1, 100) as summary
+            FROM articles
+            ORDER BY saved_date DESC, id DESC
+            LIMIT ?
+        ''', (limit + 1,))
+
+    articles = [dict(row) for row in db_cursor.fetchall()]
+    conn.close()
+
+    next_cursor = None
+    if len(articles) > limit:
+        articles = articles[:limit]
+        next_cursor = encode_cursor(articles[-1]['saved_date'], articles[-1]['id'])
+    return articles, next_cursor
+
+# bm25() returns lower values for better matches, so negate it for the score
+SEARCH_SQL = '''
+    SELECT
+        a.id,
+        a.title,
+        a.summary,
+        a.url,
+        a.word_count,
+        a.saved_date,
+        -bm25(articles_fts, 10.0, 1.0) as relevance_score
+    FROM articles_fts
+    JOIN articles a ON a.id = articles_fts.rowid
+    WHERE articles_fts MATCH ?
+    ORDER BY bm25(articles_fts, 10.0, 1.0), a.saved_date DESC
+'''
+
+def _best_sections(cursor, fts_query):
+    """Map article IDs to their best-matching section, as {position, heading}."""
+    cursor.execute(f'''
+        SELECT s.article_id, s.position, s.heading
+        FROM article_sections_fts f
+        JOIN article_sections s
+          ON s.article_id = f.rowid / {SECTION_SPAN} AND s.position = f.rowid % {SECTION_SPAN}
+        WHERE article_sections_fts MATCH ?
+        ORDER BY bm25(article_sections_fts, 2.0, 1.0)
+    ''', (fts_query,))
+    best_sections = {}
+    for article_id, position, heading in cursor.fetchall():
+        best_sections.setdefault(article_id, {"position": position, "heading": heading})
+    return best_sections
+
+@cached('search')
+@sharded(_on_every_shard_merged(_merge_sorted('relevance_score', 'saved_date')))
+def search_articles(query):
+    """
+    Search articles by query string in title and content.
+
+    Uses the FTS5 index with BM25 ranking; title matches are weighted
+    higher than content matches.
+
+    Args:
+        query: Search term
+
+    Returns:
+        List of matching articles with relevance score (higher is better)
+        and the section that matches best, as {position, heading}
+    """
+    if not query or not query.strip():
+        return []
+
+    fts_query = build_fts_query(query.strip())
+    if fts_query is None:
+        return []
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(SEARCH_SQL, (fts_query,))
+    results = [dict(row) for row in cursor.fetchall()]
+
+    # Point each hit at its best-matching section (None for title-only matches)
+    best_sections = _best_sections(cursor, fts_query) if results else {}
+    conn.close()
+
+    for result in results:
+        result['section'] = best_sections.get(result['id'])
+    return results
+
+@sharded(_on_article_shard)
+def delete_article(article_id):
+    """
+    Delete an article from the database.
+
+    Args:
+        article_id: Article ID to delete
+
+    Returns:
+        Number of rows deleted (0 if not found, 1 if deleted)
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Hold the write lock so the text taken out of the index is the text deleted
+        cursor.execute('BEGIN IMMEDIATE')
+        _unindex_articles(cursor, _indexed_articles(cursor, [article_id]))
+        cursor.execute('DELETE FROM articles WHERE id = ?', (article_id,))
+        rows_deleted = cursor.rowcount
+
+        changes = _article_change_entries([article_id]) if rows_deleted else []
+        _log_invalidations(cursor, changes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    _invalidate(changes)
+
+    return rows_deleted
+
+@sharded(_on_every_shard_merged(_merge_stats))
+def get_stats():
+    """
+    Get database statistics.
+
+    Returns:
+        Dictionary with database statistics
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Aggregates are maintained by triggers; min/max each use the saved_date index
+    cursor.execute('''
+        SELECT
+            article_count as total_articles,
+            total_words,
+            total_characters,
+            favorites_count,
+            (SELECT MIN(saved_date) FROM articles) as oldest_article_date,
+            (SELECT MAX(saved_date) FROM articles) as newest_article_date
+        FROM library_stats
+        WHERE id = 1
+    ''')
+
+    stats = dict(cursor.fetchone())
+    conn.close()
+
+    # Get database file size
+    path = shard_path(_shard.get())
+    if os.path.exists(path):
+        db_size_bytes = os.path.getsize(path)
+        # In WAL mode recent writes live in the -wal file until checkpointed
+        if os.path.exists(path + '-wal'):
+            db_size_bytes += os.path.getsize(path + '-wal')
+        db_size_mb = round(db_size_bytes / (1024 * 1024), 2)
+    else:
+        db_size_mb = 0.0
+
+    stats['database_size_mb'] = db_size_mb
+    stats['shards'] = shard_count()
+    stats['compression'] = get_compression_stats()
+    stats['connection_pool'] = get_pool_stats()
+    stats['cache'] = get_cache_stats()
+
+    # Handle case where there are no articles
+    if stats['total_articles'] == 0:
+        stats['oldest_article_date'] = None
+        stats['newest_article_date'] = None
+
+    return stats
+
+# Tag name -> ID maps for this process, by shard (each shard numbers its own
+# tags). Tag rows are never renumbered, so entries only go stale when the
+# database file itself changes (hence the path check, and the reset when a
+# replica switches snapshots or shards are rebalanced).
+_tag_id_cache = {"path": None, "ids": {}, "lock": threading.Lock()}
+TAG_ID_CACHE_SIZE = 10000
+
+def _clean_tag_names(tag_names):
+    """Strip tag names and drop empty ones and repeats, keeping their order."""
+    return list(dict.fromkeys(name.strip() for name in tag_names or [] if name and name.strip()))
+
+def _cached_tag_ids(names):
+    with _tag_id_cache["lock"]:
+        if _tag_id_cache["path"] != DB_PATH:
+            _tag_id_cache["path"] = DB_PATH
+            _tag_id_cache["ids"] = {}
+        known = _tag_id_cache["ids"].get(_shard.get(), {})
+        return {name: known[name] for name in names if name in known}
+
+def _remember_tag_ids(tag_ids):
+    with _tag_id_cache["lock"]:
+        known = _tag_id_cache["ids"].setdefault(_shard.get(), {})
+        if len(known) + len(tag_ids) > TAG_ID_CACHE_SIZE:
+            known.clear()
+        known.update(tag_ids)
+
+def _select_tag_ids(cursor, names, chunk_size=500):
+    found = {}
+    for start in range(0, len(names), chunk_size):
+        chunk = names[start:start + chunk_size]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f'SELECT id, name FROM tags WHERE name IN ({placeholders})', chunk)
+        found.update((row['name'], row['id']) for row in cursor.fetchall())
+    return found
+
+def _tag_ids(cursor, tag_names, create=True):
+    """
+    Map tag names to IDs, creating missing tags unless create is False.
+
+    Names already seen by this process cost no query; the rest are looked up
+    (and inserted) a set at a time. Only tags that existed before the current
+    transaction are remembered, so a rollback cannot leave unknown IDs behind.
+
+    Returns:
+        Dictionary of stripped tag name -> tag ID, in the order given
+    """
+    names = _clean_tag_names(tag_names)
+    found = _cached_tag_ids(names)
+    missing = [name for name in names if name not in found]
+    if missing:
+        existing = _select_tag_ids(cursor, missing)
+        _remember_tag_ids(existing)
+        found.update(existing)
+        missing = [name for name in missing if name not in existing]
+    if missing and create:
+        cursor.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in missing])
+        found.update(_select_tag_ids(cursor, missing))
+    return {name: found[name] for name in names if name in found}
+
+@sharded(_on_article_shard)
+def add_tag(article_id, tag_name):
+    """
+    Add a tag to an article.
+
+    Args:
+        article_id: Article ID
+        tag_name: Tag name to add
+    """
+    tag_name = tag_name.strip()
+    if not tag_name:
+        return
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        tag_id = _tag_ids(cursor, [tag_name])[tag_name]
+
+        # Link article and tag
+        cursor.execute('INSERT OR IGNORE INTO article_tags (article_id, tag_id) VALUES (?, ?)',
+                     (article_id, tag_id))
+
+        changes = [('article', article_id), ('validators', article_id), ('tags', None), ('tag_articles', tag_name),
+                   ('tag_queries', None)]
+        _log_invalidations(cursor, changes)
+        conn.commit()
+    finally:
+        conn.close()
+    _invalidate(changes)
+
+def _update_tags_on_shards(func, article_ids, add=None, remove=None):
+    """Run update_tags_bulk on each shard for its IDs (checked up front, so a bad ID changes nothing)."""
+    try:
+        article_ids = [int(article_id) for article_id in article_ids]
+    except (TypeError, ValueError):
+        raise ValueError("IDs must be integers")
+    return _on_id_shards(_merge_tag_updates)(func, article_ids, add, remove)
+
+@sharded(_update_tags_on_shards)
+def update_tags_bulk(article_ids, add=None, remove=None):
+    """
+    Add and remove tags on many articles in one transaction.
+
+    Links are written with one set-based statement per direction (every
+    article ID paired with every tag ID), not a statement per pair. Tags
+    being removed are never created, and IDs of missing articles are ignored.
+
+    Args:
+        article_ids: Article IDs to change
+        add: Tag names to add to every article (optional)
+        remove: Tag names to remove from every article (optional)
+
+    Returns:
+        Dictionary with the number of articles changed, links added and
+        removed, and the requested IDs that do not exist
+
+    Raises:
+        ValueError: If an ID is not an integer or the tags are invalid
+    """
+    try:
+        article_ids = list(dict.fromkeys(int(article_id) for article_id in article_ids))
+    except (TypeError, ValueError):
+        raise ValueError("IDs must be integers")
+    add_names = _clean_tag_names(add)
+    remove_names = _clean_tag_names(remove)
+    if not add_names and not remove_names:
+        raise ValueError("No tags to add or remove")
+    if set(add_names) & set(remove_names):
+        raise ValueError("A tag cannot be both added and removed")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    changes = []
+    try:
+        cursor.execute('SELECT value AS id FROM json_each(?) WHERE value IN (SELECT id FROM articles)',
+                       (json.dumps(article_ids),))
+        existing = [row['id'] for row in cursor.fetchall()]
+        ids_json = json.dumps(existing)
+        added = removed = 0
+        if existing and add_names:
+            tag_ids = _tag_ids(cursor, add_names)
+            cursor.execute('''
+                INSERT OR IGNORE INTO article_tags (article_id, tag_id)
+                SELECT a.value, t.value FROM json_each(?) a, json_each(?) t
+            ''', (ids_json, json.dumps(list(tag_ids.values()))))
+            added = cursor.rowcount
+        if existing and remove_names:
+            tag_ids = _tag_ids(cursor, remove_names, create=False)
+            if tag_ids:
+                cursor.execute('''
+                    DELETE FROM article_tags
+                    WHERE tag_id IN (SELECT value FROM json_each(?))
+                      AND article_id IN (SELECT value FROM json_each(?))
+                ''', (json.dumps(list(tag_ids.values())), ids_json))
+                removed = cursor.rowcount
+
+        if added or removed:
+            changes = _article_change_entries(existing, add_names + remove_names)
+            _log_invalidations(cursor, changes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    _invalidate(changes)
+    found = set(existing)
+    return {"articles": len(existing), "added": added, "removed": removed,
+            "not_found": [article_id for article_id in article_ids if article_id not in found]}
+
+@sharded(_on_article_shard)
+def get_article_tags(article_id):
+    """
+    Get all tags for an article.
+
+    Args:
+        article_id: Article ID
+
+    Returns:
+        List of tag name strings
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT tags.name
+        FROM tags
+        JOIN article_tags ON tags.id = article_tags.tag_id
+        WHERE article_tags.article_id = ?
+    ''', (article_id,))
+
+    tags = [row['name'] for row in cursor.fetchall()]
+    conn.close()
+
+    return tags
+
+# Favorites functions
+@sharded(_on_article_shard)
+def add_favorite(article_id):
+    """Add article to favorites."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Only existing articles can be favorited, so favorites_count stays exact
+        cursor.execute('''
+            INSERT OR IGNORE INTO favorites (article_id)
+            SELECT id FROM articles WHERE id = ?
+        ''', (article_id,))
+        changes = [('favorites', None), ('favorite', article_id)]
+        _log_invalidations(cursor, changes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+    _invalidate(changes)
+    return True
+
+@sharded(_on_article_shard)
+def remove_favorite(article_id):
+    """Remove article from favorites."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM favorites WHERE article_id = ?', (article_id,))
+    rows = cursor.rowcount
+    changes = [('favorites', None), ('favorite', article_id)] if rows else []
+    _log_invalidations(cursor, changes)
+    conn.commit()
+    conn.close()
+    _invalidate(changes)
+    return rows > 0
+
+FAVORITES_SQL = '''
+    SELECT a.id, a.title, a.summary, a.word_count, a.saved_date, f.favorited_date
+    FROM articles a
+    JOIN favorites f ON a.id = f.article_id
+    ORDER BY f.favorited_date DESC
+'''
+
+@cached('favorites')
+@sharded(_on_every_shard_merged(_merge_sorted('favorited_date')))
+def get_favorites():
+    """Get all favorited articles."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(FAVORITES_SQL)
+    favorites = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return favorites
+
+@cached('favorite')
+@sharded(_on_article_shard)
+def is_favorite(article_id):
+    """Check if article is favorited."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM favorites WHERE article_id = ?', (article_id,))
+    result = cursor.fetchone() is not None
+    conn.close()
+    return result
+
+# Bulk operations
+@sharded(_on_id_shards(_merge_sum))
+def delete_multiple_articles(article_ids):
+    """Delete multiple articles by IDs."""
+    article_ids = list(article_ids)
+    if not article_ids:
+        # IN () is a syntax error in SQLite
+        return 0
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        _unindex_articles(cursor, _indexed_articles(cursor, article_ids))
+        placeholders = ','.join('?' * len(article_ids))
+        cursor.execute(f'DELETE FROM articles WHERE id IN ({placeholders})', article_ids)
+        rows = cursor.rowcount
+        changes = _article_change_entries(article_ids) if rows else []
+        _log_invalidations(cursor, changes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    _invalidate(changes)
+    return rows
+
+def _lookup_titles_on_shards(func, titles, **kwargs):
+    return _merge_dicts(_on_every_shard(func, list(titles), **kwargs))
+
+@sharded(_lookup_titles_on_shards)
+def get_article_ids_by_title(titles, aliases=True):
+    """
+    Look up article IDs for many titles at once.
+
+    Args:
+        titles: Iterable of exact article titles
+        aliases: Also match alias titles, mapping them to the article saved
+            with the same text (pass False to match articles.title only)
+
+    Returns:
+        Dictionary of title -> article ID for the titles that exist
+    """
+    titles = list(titles)
+    conn = get_db_connection()
+    try:
+        return _select_ids_by_title(conn.cursor(), titles, aliases=aliases)
+    finally:
+        conn.close()
+
+def _select_ids_by_title(cursor, titles, chunk_size=500, aliases=True):
+    found = {}
+    # Stay well below SQLite's bound-parameter limit
+    for start in range(0, len(titles), chunk_size):
+        chunk = titles[start:start + chunk_size]
+        placeholders = ','.join('?' * len(chunk))
+        if aliases:
+            cursor.execute(f'''
+                SELECT id, title FROM articles WHERE title IN ({placeholders})
+                UNION ALL
+                SELECT article_id, title FROM article_aliases WHERE title IN ({placeholders})
+            ''', chunk + chunk)
+        else:
+            cursor.execute(f'SELECT id, title FROM articles WHERE title IN ({placeholders})', chunk)
+        found.update((row['title'], row['id']) for row in cursor.fetchall())
+    return found
+
+def _select_ids_by_hash(cursor, hashes, chunk_size=500):
+    """Map content hashes to the (oldest) article saved with that text."""
+    found = {}
+    hashes = list(hashes)
+    for start in range(0, len(hashes), chunk_size):
+        chunk = hashes[start:start + chunk_size]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f'''
+            SELECT content_hash, MIN(id) as id FROM articles
+            WHERE content_hash IN ({placeholders}) GROUP BY content_hash
+        ''', chunk)
+        found.update((row['content_hash'], row['id']) for row in cursor.fetchall())
+    return found
+
+def _split_duplicates(cursor, rows):
+    """
+    Separate rows whose text is already saved, or repeated in rows, from
+    rows to insert. Rows are article rows with the content hash at index 11.
+
+    Returns:
+        Tuple of (rows to insert, duplicate rows for _store_aliases)
+    """
+    saved = set(_select_ids_by_hash(cursor, {row[11] for row in rows}))
+    new_rows = []
+    duplicates = []
+    for row in rows:
+        if row[11] in saved:
+            duplicates.append(row)
+        else:
+            saved.add(row[11])
+            new_rows.append(row)
+    return new_rows, duplicates
+
+def _store_aliases(cursor, duplicates):
+    """Save each duplicate row's title as an alias of the article with its text; returns title -> ID."""
+    if not duplicates:
+        return {}
+    ids = _select_ids_by_hash(cursor, {row[11] for row in duplicates})
+    aliases = {row[0]: ids[row[11]] for row in duplicates}
+    cursor.executemany('INSERT OR IGNORE INTO article_aliases (title, article_id) VALUES (?, ?)', aliases.items())
+    return aliases
+
+def _insert_on_placed_shards(func, articles, tags=None):
+    """Run insert_articles_bulk on each shard for the articles placed there, keeping input order."""
+    articles = list(articles)
+    shards = _place_articles([_placement_item(article.get('title'), article.get('content'))
+                              for article in articles], _find_saved)
+    groups = {}
+    for index, shard in enumerate(shards):
+        groups.setdefault(shard, []).append(index)
+    parts = _gather(func, [(shard, ([articles[index] for index in indices],), {"tags": tags})
+                           for shard, indices in groups.items()])
+    results = [None] * len(articles)
+    for indices, part in zip(groups.values(), parts):
+        for index, result in zip(indices, part):
+            results[index] = result
+    return results
+
+@sharded(_insert_on_placed_shards)
+def insert_articles_bulk(articles, tags=None):
+    """
+    Insert many articles in a single transaction.
+
+    Articles whose title is already saved (or repeated within the batch) are
+    left untouched; invalid articles are reported and skipped, so one bad
+    article does not fail the whole batch. Articles whose text is already
+    saved (or repeated within the batch) become aliases of that article.
+
+    Args:
+        articles: List of dicts with title, content, url and optional
+                  word_count / char_count
+        tags: List of tag names applied to every inserted article (optional)
+
+    Returns:
+        List of dicts with title, status ('inserted', 'duplicate', 'exists'
+        or 'invalid'), article_id and message, in input order
+    """
+    results = []
+    rows = []
+    for article in articles:
+        try:
+            row = prepare_article_row(article.get('title'), article.get('content'), article.get('url'),
+                                      article.get('word_count'), article.get('char_count'))
+            rows.append(row)
+            results.append({"title": row[0], "status": None, "article_id": None, "message": None})
+        except ValueError as e:
+            results.append({"title": article.get('title'), "status": "invalid",
+                            "article_id": None, "message": str(e)})
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    try:
+        existing = _select_ids_by_title(cursor, [row[0] for row in rows])
+
+        new_rows = []
+        seen = set(existing)
+        for row in rows:
+            if row[0] not in seen:
+                seen.add(row[0])
+                new_rows.append(row)
+
+        new_rows, duplicate_rows = _split_duplicates(cursor, new_rows)
+        cursor.executemany(INSERT_ARTICLE_SQL, _with_new_ids(cursor, new_rows))
+        inserted = _select_ids_by_title(cursor, [row[0] for row in new_rows])
+        _index_articles(cursor, [(inserted[row[0]], row[0], _row_text(row)) for row in new_rows])
+        aliased = _store_aliases(cursor, duplicate_rows)
+
+        tag_names = _clean_tag_names(tags)
+        if tag_names and inserted:
+            tag_ids = _tag_ids(cursor, tag_names).values()
+            cursor.executemany('INSERT OR IGNORE INTO article_tags (article_id, tag_id) VALUES (?, ?)',
+                               [(article_id, tag_id) for article_id in {*inserted.values(), *aliased.values()}
+                                for tag_id in tag_ids])
+
+        changed_ids = list({*inserted.values(), *aliased.values()})
+        changes = _article_change_entries(changed_ids, tag_names) if changed_ids else []
+        _log_invalidations(cursor, changes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    _invalidate(changes)
+
+    claimed = set()
+    for result in results:
+        if result["status"] == "invalid":
+            continue
+        title = result["title"]
+        if title in inserted and title not in claimed:
+            claimed.add(title)
+            result.update(status="inserted", article_id=inserted[title], message="Inserted")
+        elif title in aliased and title not in claimed:
+            claimed.add(title)
+            result.update(status="duplicate", article_id=aliased[title],
+                          message=f"Same text as article {aliased[title]}; saved as an alias")
+        else:
+            result.update(status="exists", article_id=existing.get(title, inserted.get(title)),
+                          message="Article already saved")
+    return results
+
+# Conflict policies for import_articles when a title is already saved
+IMPORT_POLICIES = ('skip', 'replace', 'newest')
+
+IMPORT_ARTICLE_SQL = '''
+    INSERT INTO articles (title, content, content_z, content_codec, content_size, stored_size,
+                          summary, url, fetched_date, word_count, character_count, content_hash, saved_date, id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+'''
+
+REPLACE_ARTICLE_SQL = '''
+    UPDATE articles
+    SET content = ?, content_z = ?, content_codec = ?, content_size = ?, stored_size = ?,
+        summary = ?, url = ?, fetched_date = ?, word_count = ?, character_count = ?, content_hash = ?,
+        modified_date = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
+
+# Triggers and indexes a deferred import drops and rebuilds in bulk (its
+# new rows are also added to articles_fts in one pass, see _finish_import)
+DEFERRED_MAINTENANCE = ('article_tags_touch_insert', 'idx_articles_title', 'idx_articles_saved_date_id')
+
+# Error messages kept in an import summary
+IMPORT_MAX_ERRORS = 100
+
+def _normalize_date(value):
+    """Return an ISO date/datetime as 'YYYY-MM-DD HH:MM:SS', or None if missing or malformed."""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+
+def prepare_import_row(article):
+    """
+    Validate an imported article and build its row for IMPORT_ARTICLE_SQL.
+
+    Like prepare_article_row, but keeps the article's own saved_date and
+    fetched_date (as written by the exporter) when it has them.
+
+    Returns:
+        Tuple of (row without its ID, tag names, version date used by the
+        'newest' policy)
+
+    Raises:
+        ValueError: If validation fails
+    """
+    row = list(prepare_article_row(article.get('title'), article.get('content'), article.get('url'),
+                                   article.get('word_count'), article.get('character_count')))
+    fetched_date = _normalize_date(article.get('fetched_date'))
+    saved_date = _normalize_date(article.get('saved_date'))
+    if fetched_date:
+        row[8] = fetched_date
+    row.append(saved_date)
+
+    tags = article.get('tags') or []
+    if not isinstance(tags, list):
+        raise ValueError("Tags must be a list")
+    tags = [tag.strip() for tag in tags if isinstance(tag, str) and tag.strip()]
+    return tuple(row), tags, fetched_date or saved_date or ''
+
+def _new_import_summary():
+    return {"inserted": 0, "replaced": 0, "aliased": 0, "skipped": 0, "invalid": 0, "errors": []}
+
+def _import_on_shards(func, articles, policy='skip', batch_size=1000, defer_indexes=None, progress=None):
+    """
+    Run import_articles on every shard at once.
+
+    Each shard keeps one connection for the whole import (and, with
+    deferred maintenance, one transaction). Every batch is split by
+    _place_articles, looking titles and texts up on those connections so
+    uncommitted rows of the import count, and the parts are imported in
+    parallel. On error every shard's open transaction is rolled back.
+    """
+    if policy not in IMPORT_POLICIES:
+        raise ValueError("Invalid policy. Use skip, replace, or newest")
+
+    count = shard_count()
+    summaries = [_new_import_summary() for _ in range(count)]
+    changes = _article_change_entries(None)
+
+    conns = []
+    try:
+        for shard in range(count):
+            conns.append(_shard_connection(shard))
+        cursors = [conn.cursor() for conn in conns]
+        deferred = _gather(_start_import, [(shard, (cursors[shard], defer_indexes), {}) for shard in range(count)])
+
+        def lookup(titles, hashes):
+            return _merge_found(_parallel([functools.partial(_find_on_cursor, conn.cursor(), titles, hashes)
+                                           for conn in conns]))
+
+        def import_batch(batch):
+            items = [_placement_item(article.get('title'), article.get('content'))
+                     if isinstance(article, dict) else (None, None) for article in batch]
+            parts = {}
+            for article, shard in zip(batch, _place_articles(items, lookup)):
+                parts.setdefault(shard, []).append(article)
+            _gather(_import_batch, [(shard, (conns[shard], cursors[shard], part, policy, summaries[shard]),
+                                     {"commit": deferred[shard] is None, "changes": changes,
+                                      "fts_max_id": deferred[shard][0] if deferred[shard] is not None else None})
+                                    for shard, part in parts.items()])
+
+        done = 0
+        batch = []
+        for article in articles:
+            batch.append(article)
+            if len(batch) >= batch_size:
+                import_batch(batch)
+                done += len(batch)
+                batch = []
+                if progress:
+                    progress(done, None)
+        if batch:
+            import_batch(batch)
+            done += len(batch)
+
+        _gather(_finish_import, [(shard, (conns[shard], cursors[shard], deferred[shard], changes), {})
+                                 for shard in range(count) if deferred[shard] is not None])
+        if progress:
+            progress(done, done)
+    except Exception:
+        for conn in conns:
+            conn.rollback()
+        raise
+    finally:
+        for conn in conns:
+            conn.close()
+
+    summary = {key: sum(part[key] for part in summaries)
+               for key in ('inserted', 'replaced', 'aliased', 'skipped', 'invalid')}
+    summary["errors"] = [error for part in summaries for error in part["errors"]][:IMPORT_MAX_ERRORS]
+    return summary
+
+@sharded(_import_on_shards)
+def import_articles(articles, policy='skip', batch_size=1000, defer_indexes=None, progress=None):
+    """
+    Import a stream of articles (e.g. a parsed export) in large batches.
+
+    Each batch is inserted with executemany. With deferred maintenance the
+    whole import runs in one transaction: the secondary article indexes are
+    dropped and articles_fts is left alone while rows are inserted, then the
+    new rows are indexed in one statement and the indexes rebuilt. That is much
+    faster for restores, but blocks other writers until it finishes and
+    rolls back entirely on error. Otherwise each batch commits on its own.
+
+    Args:
+        articles: Iterable of dicts with title and content, and optionally
+                  url, tags, saved_date, fetched_date, word_count and
+                  character_count
+        policy: For titles that already exist: 'skip' keeps the saved
+                article, 'replace' overwrites it, 'newest' overwrites it
+                only if the imported copy was fetched later (to the second)
+        batch_size: Articles per executemany batch
+        defer_indexes: Defer index and FTS maintenance; by default only
+                       when the library is empty
+        progress: Optional callable(done, total) called after each batch
+
+    Returns:
+        Dictionary with inserted, replaced, aliased (same text as a saved
+        article), skipped and invalid counts and the first IMPORT_MAX_ERRORS
+        error messages
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+    if policy not in IMPORT_POLICIES:
+        raise ValueError("Invalid policy. Use skip, replace, or newest")
+
+    summary = _new_import_summary()
+    changes = _article_change_entries(None)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        deferred = _start_import(cursor, defer_indexes)
+        # A deferred import adds its new rows to articles_fts at the end
+        fts_max_id = deferred[0] if deferred is not None else None
+
+        done = 0
+        batch = []
+        for article in articles:
+            batch.append(article)
+            if len(batch) >= batch_size:
+                _import_batch(conn, cursor, batch, policy, summary, commit=deferred is None, changes=changes,
+                              fts_max_id=fts_max_id)
+                done += len(batch)
+                batch = []
+                if progress:
+                    progress(done, None)
+        if batch:
+            _import_batch(conn, cursor, batch, policy, summary, commit=deferred is None, changes=changes,
+                          fts_max_id=fts_max_id)
+            done += len(batch)
+
+        if deferred is not None:
+            _finish_import(conn, cursor, deferred, changes)
+        if progress:
+            progress(done, done)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return summary
+
+def _start_import(cursor, defer_indexes):
+    """
+    Start an import: with deferred maintenance, begin its transaction and
+    drop the DEFERRED_MAINTENANCE triggers and indexes.
+
+    Returns:
+        None if maintenance is not deferred, else (last article ID before
+        the import, dropped (type, name, sql) objects) for _finish_import
+    """
+    if defer_indexes is None:
+        cursor.execute('SELECT article_count FROM library_stats WHERE id = 1')
+        defer_indexes = cursor.fetchone()['article_count'] == 0
+    if not defer_indexes:
+        return None
+
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('SELECT COALESCE(MAX(id), 0) as last_id FROM articles')
+    last_id = cursor.fetchone()['last_id']
+    placeholders = ','.join('?' * len(DEFERRED_MAINTENANCE))
+    cursor.execute(f'SELECT type, name, sql FROM sqlite_master WHERE name IN ({placeholders})',
+                   DEFERRED_MAINTENANCE)
+    suspended = [tuple(row) for row in cursor.fetchall()]
+    for object_type, name, _ in suspended:
+        cursor.execute(f'DROP {object_type.upper()} {name}')
+    return last_id, suspended
+
+def _finish_import(conn, cursor, deferred, changes):
+    """Finish a deferred import: index the new rows, put back what _start_import dropped and commit."""
+    last_id, suspended = deferred
+    # Index every new row in one pass, then put the triggers and indexes back
+    cursor.execute('''
+        INSERT INTO articles_fts (rowid, title, content)
+        SELECT id, title, content FROM articles_text WHERE id > ?
+    ''', (last_id,))
+    for _, _, sql in suspended:
+        cursor.execute(sql)
+    _log_invalidations(cursor, changes)
+    conn.commit()
+    _invalidate(changes)
+
+def _import_error(summary, title, message):
+    if len(summary["errors"]) < IMPORT_MAX_ERRORS:
+        summary["errors"].append(f"{title}: {message}" if title else message)
+
+def _import_batch(conn, cursor, batch, policy, summary, commit, changes, fts_max_id=None):
+    # Resolve duplicates inside the batch first: title -> (row, tags, version)
+    prepared = {}
+    for article in batch:
+        try:
+            row, tags, version = prepare_import_row(article)
+        except (ValueError, TypeError, AttributeError) as e:
+            summary["invalid"] += 1
+            _import_error(summary, article.get('title') if isinstance(article, dict) else None, e)
+            continue
+        previous = prepared.get(row[0])
+        if previous is not None:
+            summary["skipped"] += 1
+            if policy == 'skip' or (policy == 'newest' and version <= previous[2]):
+                continue
+        prepared[row[0]] = (row, tags, version)
+    if not prepared:
+        return
+
+    if commit:
+        cursor.execute('BEGIN IMMEDIATE')
+
+    titles = list(prepared)
+    existing = {}
+    aliases = set()
+    for start in range(0, len(titles), 500):
+        chunk = titles[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f'''
+            SELECT id, title, COALESCE(fetched_date, saved_date) as version
+            FROM articles WHERE title IN ({placeholders})
+        ''', chunk)
+        # Stored dates keep microseconds; compare them in the imported versions' format
+        existing.update((row['title'], (row['id'], _normalize_date(row['version']) or '')) for row in cursor.fetchall())
+        # An alias title stands for an article saved under another name; leave it be
+        cursor.execute(f'SELECT title FROM article_aliases WHERE title IN ({placeholders})', chunk)
+        aliases.update(row['title'] for row in cursor.fetchall())
+
+    new_rows = []
+    replacements = []
+    replaced = []
+    tagged = []
+    for title, (row, tags, version) in prepared.items():
+        if title in aliases:
+            summary["skipped"] += 1
+            continue
+        if title not in existing:
+            new_rows.append(row)
+        elif policy == 'skip' or (policy == 'newest' and version <= existing[title][1]):
+            summary["skipped"] += 1
+            continue
+        else:
+            replacements.append((*row[1:12], existing[title][0]))
+            replaced.append((existing[title][0], title, _row_text(row)))
+        if tags:
+            tagged.append((title, tags))
+
+    new_rows, duplicate_rows = _split_duplicates(cursor, new_rows)
+    _unindex_articles(cursor, _indexed_articles(cursor, [article_id for article_id, _, _ in replaced]), fts_max_id)
+    cursor.executemany(IMPORT_ARTICLE_SQL, _with_new_ids(cursor, new_rows))
+    cursor.executemany(REPLACE_ARTICLE_SQL, replacements)
+    inserted = _select_ids_by_title(cursor, [row[0] for row in new_rows])
+    _index_articles(cursor, [(inserted[row[0]], row[0], _row_text(row)) for row in new_rows] + replaced, fts_max_id)
+    summary["aliased"] += len(_store_aliases(cursor, duplicate_rows))
+    summary["inserted"] += len(new_rows)
+    summary["replaced"] += len(replacements)
+
+    if tagged:
+        ids = _select_ids_by_title(cursor, [title for title, _ in tagged])
+        names = sorted({name for _, tags in tagged for name in tags})
+        cursor.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+        tag_ids = {}
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT id, name FROM tags WHERE name IN ({placeholders})', chunk)
+            tag_ids.update((row['name'], row['id']) for row in cursor.fetchall())
+        cursor.executemany('INSERT OR IGNORE INTO article_tags (article_id, tag_id) VALUES (?, ?)',
+                           [(ids[title], tag_ids[name]) for title, tags in tagged for name in tags])
+
+    if commit:
+        _log_invalidations(cursor, changes)
+        conn.commit()
+        _invalidate(changes)
+
+def _iterate_over_shards(func, article_ids=None, *args, **kwargs):
+    """Run iter_articles on every shard (for its IDs), merging the streams into one in ID order."""
+    if article_ids is None:
+        streams = [_iterate_on_shard(shard, func, None, *args, **kwargs) for shard in range(shard_count())]
+    else:
+        streams = [_iterate_on_shard(shard, func, ids, *args, **kwargs)
+                   for shard, ids in _group_by_shard(article_ids).items()]
+    try:
+        yield from heapq.merge(*streams, key=lambda article: article['id'])
+    finally:
+        for stream in streams:
+            stream.close()
+
+@sharded(_iterate_over_shards)
+def iter_articles(article_ids=None, batch_size=500, tag=None, favorites=False, since=None, until=None):
+    """
+    Iterate over full articles (with tags) in ID order, a batch at a time.
+
+    Only one batch is held in memory, and the connection goes back to the
+    pool between batches, so this is safe for whole-library work.
+
+    Args:
+        article_ids: Optional list of IDs to restrict to
+        batch_size: Rows fetched per query
+        tag: Only articles with this tag
+        favorites: Only favorited articles
+        since: Only articles saved at or after this 'YYYY-MM-DD HH:MM:SS' time
+        until: Only articles saved at or before this 'YYYY-MM-DD HH:MM:SS' time
+
+    Yields:
+        Article dictionaries, as returned by get_article_by_id
+    """
+    conditions = []
+    params = []
+    if tag is not None:
+        conditions.append('a.id IN (SELECT at.article_id FROM article_tags at '
+                          'JOIN tags t ON t.id = at.tag_id WHERE t.name = ?)')
+        params.append(tag)
+    if favorites:
+        conditions.append('a.id IN (SELECT article_id FROM favorites)')
+    if since is not None:
+        conditions.append('a.saved_date >= ?')
+        params.append(since)
+    if until is not None:
+        conditions.append('a.saved_date <= ?')
+        params.append(until)
+    filters = ''.join(f' AND {condition}' for condition in conditions)
+
+    if article_ids is not None:
+        article_ids = sorted(set(article_ids))
+        for start in range(0, len(article_ids), batch_size):
+            chunk = article_ids[start:start + batch_size]
+            placeholders = ','.join('?' * len(chunk))
+            yield from _fetch_article_batch(f'WHERE a.id IN ({placeholders}){filters} ORDER BY a.id',
+                                            [*chunk, *params])
+        return
+
+    # Keyset over the primary key: each batch is one short indexed query
+    last_id = 0
+    while True:
+        batch = _fetch_article_batch(f'WHERE a.id > ?{filters} ORDER BY a.id LIMIT ?',
+                                     [last_id, *params, batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_id = batch[-1]['id']
+
+def _fetch_article_batch(where, params):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'SELECT a.* FROM articles a {where}', params)
+        articles = [article_from_row(row) for row in cursor.fetchall()]
+        if articles:
+            ids = [article['id'] for article in articles]
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f'''
+                SELECT article_tags.article_id, tags.name
+                FROM tags
+                JOIN article_tags ON tags.id = article_tags.tag_id
+                WHERE article_tags.article_id IN ({placeholders})
+            ''', ids)
+            tags = {}
+            for row in cursor.fetchall():
+                tags.setdefault(row['article_id'], []).append(row['name'])
+            for article in articles:
+                article['tags'] = tags.get(article['id'], [])
+        return articles
+    finally:
+        conn.close()
+
+@sharded(_on_every_shard_merged(_merge_compression_stats))
+def get_compression_stats():
+    """
+    Report how much space compressed content storage saves.
+
+    Returns:
+        Dictionary with content_bytes (uncompressed), stored_bytes,
+        compression_ratio (stored / content) and compressed_articles
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT content_bytes, stored_bytes, compressed_articles
+        FROM library_stats
+        WHERE id = 1
+    ''')
+    stats = dict(cursor.fetchone())
+    conn.close()
+
+    content_bytes = stats['content_bytes']
+    stats['compression_ratio'] = round(stats['stored_bytes'] / content_bytes, 4) if content_bytes else 1.0
+    return stats
+
+def _compress_on_shards(func, batch_size=200, progress=None):
+    """Run compress_existing_articles on every shard in parallel, reporting combined progress."""
+    callbacks = _combined_progress(progress, shard_count())
+    parts = _gather(func, [(shard, (batch_size, callback), {}) for shard, callback in enumerate(callbacks)])
+    return {key: sum(part[key] for part in parts) for key in ('visited', 'compressed', 'bytes_saved')}
+
+@sharded(_compress_on_shards)
+def compress_existing_articles(batch_size=200, progress=None):
+    """
+    Compress plain-text rows in place, one small transaction per batch.
+
+    Safe to run while the app serves traffic and to re-run after an
+    interruption: only rows without recorded sizes are visited.
+
+    Args:
+        batch_size: Rows per transaction
+        progress: Optional callable(done, total)
+
+    Returns:
+        Dictionary with rows visited, rows compressed and bytes saved
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) as count FROM articles WHERE stored_size IS NULL')
+    total = cursor.fetchone()['count']
+    conn.close()
+
+    visited = compressed = saved = 0
+    last_id = 0
+    while True:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT id, content FROM articles
+                WHERE stored_size IS NULL AND content_codec IS NULL AND id > ?
+                ORDER BY id LIMIT ?
+            ''', (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            sizes = []
+            for row in rows:
+                codec, blob, content_size = compression.compress_text(row['content'])
+                if codec is None:
+                    sizes.append((content_size, content_size, row['id']))
+                else:
+                    updates.append((blob, codec, content_size, len(blob), row['id']))
+                    saved += content_size - len(blob)
+            cursor.executemany('''
+                UPDATE articles SET content = '', content_z = ?, content_codec = ?, content_size = ?, stored_size = ?
+                WHERE id = ?
+            ''', updates)
+            cursor.executemany('UPDATE articles SET content_size = ?, stored_size = ? WHERE id = ?', sizes)
+            conn.commit()
+        finally:
+            conn.close()
+
+        visited += len(rows)
+        compressed += len(updates)
+        last_id = rows[-1]['id']
+        if progress:
+            progress(visited, total)
+
+    return {"visited": visited, "compressed": compressed, "bytes_saved": saved}
+
+@sharded(_on_every_shard_merged(_merge_sum))
+def count_articles():
+    """Return the number of saved articles (maintained by triggers, O(1))."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT article_count as count FROM library_stats WHERE id = 1')
+    count = cursor.fetchone()['count']
+    conn.close()
+    return count
+
+def record_migrated_files(entries):
+    """
+    Record imported legacy files in the migration manifest.
+
+    Args:
+        entries: List of (path, mtime, size, article_id) tuples
+    """
+    if not entries:
+        return
+    conn = get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT OR REPLACE INTO migration_manifest (path, mtime, size, article_id)
+            VALUES (?, ?, ?, ?)
+        ''', entries)
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_migration_manifest(paths, chunk_size=500):
+    """
+    Look up manifest entries for many file paths.
+
+    Returns:
+        Dictionary of path -> dict with mtime, size and article_id
+    """
+    paths = list(paths)
+    found = {}
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        for start in range(0, len(paths), chunk_size):
+            chunk = paths[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT path, mtime, size, article_id FROM migration_manifest WHERE path IN ({placeholders})
+            ''', chunk)
+            found.update((row['path'], dict(row)) for row in cursor.fetchall())
+    finally:
+        conn.close()
+    return found
+
+@cached('tags')
+@sharded(_on_every_shard_merged(_merge_tags))
+def get_all_tags():
+    """Get all tags with article counts."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, name, article_count
+        FROM tags
+        ORDER BY name
+    ''')
+    tags = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return tags
+
+TAG_ARTICLES_SQL = '''
+    SELECT a.id, a.title, a.summary, a.word_count, a.saved_date
+    FROM articles a
+    JOIN article_tags at ON a.id = at.article_id
+    JOIN tags t ON at.tag_id = t.id
+    WHERE t.name = ?
+    ORDER BY a.saved_date DESC
+'''
+
+@cached('tag_articles')
+@sharded(_on_every_shard_merged(_merge_sorted('saved_date')))
+def get_articles_by_tag(tag_name):
+    """Get all articles with a specific tag."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(TAG_ARTICLES_SQL, (tag_name,))
+    articles = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return articles
+
+TAG_MATCH_MODES = ('any', 'all')
+
+@cached('tag_queries')
+@sharded(_on_every_shard_merged(_merge_sorted('saved_date')))
+def get_articles_by_tags(tag_names, match='any'):
+    """
+    Get articles carrying any (or all) of several tags, newest first.
+
+    Tag names are resolved to IDs first, so each tag is one range scan of
+    the (tag_id, article_id) index instead of a join on names.
+
+    Args:
+        tag_names: Tag names
+        match: 'any' for articles with at least one of the tags, 'all' for
+            articles with every one of them
+
+    Returns:
+        List of article summaries (id, title, summary, word_count, saved_date)
+
+    Raises:
+        ValueError: If match is not 'any' or 'all'
+    """
+    if match not in TAG_MATCH_MODES:
+        raise ValueError("Match must be 'any' or 'all'")
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        query = _tagged_articles_query(cursor, tag_names, match)
+        if query is None:
+            return []
+        cursor.execute(*query)
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def _tagged_articles_query(cursor, tag_names, match):
+    """Return (sql, params) selecting articles with any/all of the tags, or None if none can match."""
+    names = _clean_tag_names(tag_names)
+    tag_ids = list(_tag_ids(cursor, names, create=False).values())
+    if not tag_ids or (match == 'all' and len(tag_ids) < len(names)):
+        return None
+    having = 'HAVING COUNT(*) = ?' if match == 'all' else ''
+    params = [json.dumps(tag_ids)] + ([len(tag_ids)] if match == 'all' else [])
+    return f'''
+        SELECT a.id, a.title, a.summary, a.word_count, a.saved_date
+        FROM articles a
+        WHERE a.id IN (
+            SELECT article_id FROM article_tags
+            WHERE tag_id IN (SELECT value FROM json_each(?))
+            GROUP BY article_id {having}
+        )
+        ORDER BY a.saved_date DESC
+    ''', params
+
+# Streaming list results: rows go from the cursor to the JSON encoder as
+# plain tuples, a batch at a time, without building a dict per row first
+STREAM_BATCH_ROWS = int(os.getenv('STREAM_BATCH_ROWS', 500))
+# Streamed results of up to this many rows are also put in the read cache
+STREAM_CACHE_ROWS = int(os.getenv('STREAM_CACHE_ROWS', 1000))
+
+def _stream_rows(reader, args, execute, batch_size=None, order=()):
+    """
+    Yield (columns, row tuples) batches of a list query.
+
+    A result already in the read cache under reader (a @cached function
+    returning the same rows as dictionaries) is replayed from there.
+    Otherwise execute(conn) runs the query and returns (cursor, extend),
+    where extend optionally adds (columns, values) to each row; the
+    connection is held until the last batch has been read. Small results
+    are then cached for reader, so both paths share one entry. On a
+    sharded library the query runs on every shard and the rows are merged
+    on the order columns, descending, as the list queries sort them.
+    """
+    batch_size = batch_size or STREAM_BATCH_ROWS
+    if _in_shard.get():
+        # One shard's part of a call; the whole result is what gets cached
+        for columns, rows in _read_batches(execute, batch_size):
+            if rows:
+                yield columns, rows
+        return
+
+    key = reader.cache_key(*args)
+    _sync_cache()
+    value = _cache.get(reader.cache_namespace, key)
+    if value is not cache.MISS:
+        if value:
+            columns = tuple(value[0])
+            for start in range(0, len(value), batch_size):
+                yield columns, [tuple(item.values()) for item in value[start:start + batch_size]]
+        return
+
+    stamp = _cache.stamp()
+    kept = []
+    columns = None
+    if shard_count() == 1:
+        batches = _read_batches(execute, batch_size)
+    else:
+        batches = _merged_batches(execute, batch_size, order)
+    try:
+        for columns, rows in batches:
+            if not rows:
+                continue
+            if kept is not None:
+                kept.extend(rows)
+                if len(kept) > STREAM_CACHE_ROWS:
+                    kept = None
+            yield columns, rows
+    finally:
+        batches.close()
+    if columns is not None and kept is not None:
+        _cache.put(reader.cache_namespace, key, [dict(zip(columns, row)) for row in kept], stamp)
+
+def _read_batches(execute, batch_size):
+    """
+    Yield (columns, row tuples) batches of execute's query on the current
+    shard, the last one empty; nothing at all if execute has no query.
+    """
+    conn = get_db_connection()
+    try:
+        cursor, extend = execute(conn)
+        if cursor is None:
+            return
+        columns = tuple(description[0] for description in cursor.description)
+        if extend is not None:
+            columns += extend[0]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if extend is not None:
+                rows = [row + extend[1](row) for row in rows]
+            yield columns, rows
+            if not rows:
+                return
+    finally:
+        conn.close()
+
+def _merged_batches(execute, batch_size, order):
+    """
+    Merge _read_batches of execute's query on every shard into batches,
+    descending on the order columns. The shards' first batches are read in
+    parallel; later ones as the merge reaches them.
+    """
+    streams = [_iterate_on_shard(shard, _read_batches, execute, batch_size) for shard in range(shard_count())]
+    try:
+        heads = _parallel([functools.partial(next, stream, None) for stream in streams])
+        columns = next((head[0] for head in heads if head is not None), None)
+        if columns is None:
+            return
+        positions = [columns.index(column) for column in order]
 
-        article_id = cursor.lastrowid
+        def rows_of(head, stream):
+            if head is None:
+                return
+            yield from head[1]
+            for _, rows in stream:
+                yield from rows
 
-        # Insert tags if provided
-        for tag_name in tags:
-            tag_name = tag_name.strip()
-            if tag_name:
-                # Insert tag if it doesn't exist
-                cursor.execute('INSERT OR IGNORE INTO tags (name) VALUES (?)', (tag_name,))
+        merged = heapq.merge(*(rows_of(head, stream) for head, stream in zip(heads, streams)),
+                             key=lambda row: tuple(row[position] for position in positions), reverse=True)
+        while True:
+            rows = list(itertools.islice(merged, batch_size))
+            yield columns, rows
+            if not rows:
+                return
+    finally:
+        for stream in streams:
+            stream.close()
 
-                # Get tag ID
-                cursor.execute('SELECT id FROM tags WHERE name = ?', (tag_name,))
-                tag_row = cursor.fetchone()
-                tag_id = tag_row['id']
+def _tuple_cursor(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
 
-                # Link article and tag
-                cursor.execute('INSERT OR IGNORE INTO article_tags (article_id, tag_id) VALUES (?, ?)',
-                             (article_id, tag_id))
+def stream_search_results(query, batch_size=None):
+    """
+    Stream search_articles() results as (columns, row tuples) batches.
 
-        conn.commit()
-        return article_id
+    Yields:
+        Batches of at most batch_size rows (default STREAM_BATCH_ROWS)
+    """
+    def execute(conn):
+        fts_query = build_fts_query(query.strip()) if query and query.strip() else None
+        if fts_query is None:
+            return None, None
+        cursor = _tuple_cursor(conn)
+        best_sections = _best_sections(cursor, fts_query)
+        cursor.execute(SEARCH_SQL, (fts_query,))
+        return cursor, (('section',), lambda row: (best_sections.get(row[0]),))
+    return _stream_rows(search_articles, (query,), execute, batch_size, ('relevance_score', 'saved_date'))
 
-    except sqlite3.IntegrityError as e:
-        conn.rollback()
-        if "UNIQUE constraint failed" in str(e):
-            raise ValueError("Article already saved")
-        raise
-    except Exception as e:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
+def stream_favorites(batch_size=None):
+    """Stream get_favorites() results as (columns, row tuples) batches."""
+    def execute(conn):
+        cursor = _tuple_cursor(conn)
+        cursor.execute(FAVORITES_SQL)
+        return cursor, None
+    return _stream_rows(get_favorites, (), execute, batch_size, ('favorited_date',))
 
-def get_article_by_id(article_id):
-    """
-    Retrieve a single article by ID with its tags.
+def stream_articles_by_tag(tag_name, batch_size=None):
+    """Stream get_articles_by_tag() results as (columns, row tuples) batches."""
+    def execute(conn):
+        cursor = _tuple_cursor(conn)
+        cursor.execute(TAG_ARTICLES_SQL, (tag_name,))
+        return cursor, None
+    return _stream_rows(get_articles_by_tag, (tag_name,), execute, batch_size, ('saved_date',))
 
-    Args:
-        article_id: Article ID
+def stream_articles_by_tags(tag_names, match='any', batch_size=None):
+    """
+    Stream get_articles_by_tags() results as (columns, row tuples) batches.
 
-    Returns:
-        Dictionary with article data and tags array, or None if not found
+    Raises:
+        ValueError: If match is not 'any' or 'all'
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if match not in TAG_MATCH_MODES:
+        raise ValueError("Match must be 'any' or 'all'")
 
-    # Get article data
-    cursor.execute('SELECT * FROM articles WHERE id = ?', (article_id,))
-    article = cursor.fetchone()
+    def execute(conn):
+        query = _tagged_articles_query(conn.cursor(), tag_names, match)
+        if query is None:
+            return None, None
+        cursor = _tuple_cursor(conn)
+        cursor.execute(*query)
+        return cursor, None
+    return _stream_rows(get_articles_by_tags, (list(tag_names), match), execute, batch_size, ('saved_date',))
 
-    if not article:
+@sharded(_on_article_shard)
+def get_article_aliases(article_id):
+    """Return the other titles saved with exactly this article's text."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT title FROM article_aliases WHERE article_id = ? ORDER BY title', (article_id,))
+        return [row['title'] for row in cursor.fetchall()]
+    finally:
         conn.close()
-        return None
 
-    # Convert row to dictionary
-    article_dict = dict(article)
+# Members of one LSH bucket compared pairwise; larger buckets are compared
+# against their first member only, to bound the work on pathological inputs
+NEAR_DUPLICATE_MAX_BUCKET = 200
 
-    # Get tags for this article
-    cursor.execute('''
-        SELECT tags.name
-        FROM tags
-        JOIN article_tags ON tags.id = article_tags.tag_id
-        WHERE article_tags.article_id = ?
-    ''', (article_id,))
+def _select_signatures(cursor, article_ids, chunk_size=500):
+    signatures = {}
+    article_ids = list(article_ids)
+    for start in range(0, len(article_ids), chunk_size):
+        chunk = article_ids[start:start + chunk_size]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f'SELECT article_id, minhash FROM article_fingerprints WHERE article_id IN ({placeholders})',
+                       chunk)
+        signatures.update((row['article_id'], row['minhash']) for row in cursor.fetchall())
+    return signatures
 
-    tags = [row['name'] for row in cursor.fetchall()]
-    article_dict['tags'] = tags
+def _select_article_summaries(cursor, article_ids, chunk_size=500):
+    articles = {}
+    article_ids = list(article_ids)
+    for start in range(0, len(article_ids), chunk_size):
+        chunk = article_ids[start:start + chunk_size]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f'SELECT id, title, word_count FROM articles WHERE id IN ({placeholders})', chunk)
+        articles.update((row['id'], dict(row)) for row in cursor.fetchall())
+    return articles
 
-    conn.close()
-    return article_dict
+def _clusters_over_shards(func, threshold=None, limit=100):
+    """
+    Run get_near_duplicate_clusters across shards: the shards' LSH rows
+    are merged in (band, bucket) order, so buckets (and clusters) can span
+    shards, then signatures and summaries are read from each article's shard.
+    """
+    if threshold is None:
+        threshold = fingerprint.NEAR_DUPLICATE_THRESHOLD
 
-def get_all_articles(limit=50, offset=0):
+    streams = [_iterate_on_shard(shard, _read_lsh_rows) for shard in range(shard_count())]
+    try:
+        buckets = ([article_id for _, _, article_id in rows]
+                   for _, rows in itertools.groupby(heapq.merge(*streams), key=lambda row: row[:2]))
+        candidates = _candidate_pairs(ids for ids in buckets if len(ids) > 1)
+    finally:
+        for stream in streams:
+            stream.close()
+
+    signatures = _select_by_shard(_select_signatures, {article_id for pair in candidates for article_id in pair})
+    ranked, weakest = _cluster_pairs(candidates, signatures, threshold, limit)
+    articles = _select_by_shard(_select_article_summaries, [a for _, ids in ranked for a in ids])
+    return _cluster_summaries(ranked, weakest, articles)
+
+@cached('duplicates')
+@sharded(_clusters_over_shards)
+def get_near_duplicate_clusters(threshold=None, limit=100):
     """
-    List all articles with pagination.
+    Group articles whose texts are near-duplicates of each other.
+
+    Only articles that share an LSH bucket in at least one band are
+    compared, so this never scans every pair; their MinHash signatures then
+    estimate the Jaccard similarity of their word shingles. Exact
+    duplicates are not listed, since they are stored once as aliases.
 
     Args:
-        limit: Maximum number of articles to return (default 50)
-        offset: Number of articles to skip (default 0)
+        threshold: Minimum estimated similarity (default NEAR_DUPLICATE_THRESHOLD)
+        limit: Maximum number of clusters to return, largest first
 
     Returns:
-        List of article dictionaries with preview data
+        List of dictionaries with size, min_similarity (the weakest link
+        that joined the cluster) and articles (id, title, word_count)
     """
-    if limit is None or limit > 100:
-        limit = 50
-    if limit < 1:
-        limit = 1
-    if offset is None or offset < 0:
-        offset = 0
+    if threshold is None:
+        threshold = fingerprint.NEAR_DUPLICATE_THRESHOLD
 
     conn = get_db_connection()
     cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT group_concat(article_id) AS ids
+            FROM article_lsh
+            GROUP BY band, bucket
+            HAVING COUNT(*) > 1
+        ''')
+        candidates = _candidate_pairs([int(article_id) for article_id in row['ids'].split(',')]
+                                      for row in cursor.fetchall())
+        signatures = _select_signatures(cursor, {article_id for pair in candidates for article_id in pair})
+        ranked, weakest = _cluster_pairs(candidates, signatures, threshold, limit)
+        articles = _select_article_summaries(cursor, [a for _, ids in ranked for a in ids])
+        return _cluster_summaries(ranked, weakest, articles)
+    finally:
+        conn.close()
 
-    cursor.execute('''
-        SELECT id, title, saved_date, word_count, substr(summary, 1, 100) as summary
-        FROM articles
-        ORDER BY saved_date DESC
-        LIMIT ? OFFSET ?
-    ''', (limit, offset))
-
-    articles = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    return articles
+def _candidate_pairs(buckets):
+    """Return the ID pairs to compare, given the article IDs of each LSH bucket holding more than one."""
+    candidates = set()
+    for ids in buckets:
+        ids = sorted(ids)
+        if len(ids) > NEAR_DUPLICATE_MAX_BUCKET:
+            candidates.update((ids[0], other) for other in ids[1:])
+        else:
+            candidates.update((a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+    return candidates
 
-def search_articles(query):
+def _cluster_pairs(candidates, signatures, threshold, limit):
     """
-    Search articles by query string in title and content.
-
-    Args:
-        query: Search term
+    Cluster the candidate pairs that pass the threshold (union-find).
 
     Returns:
-        List of matching articles with relevance score
+        Tuple of (up to limit (root ID, member IDs) pairs, largest first,
+        weakest similarity by root ID)
     """
-    if not query or not query.strip():
-        return []
+    parent = {}
 
-    query = query.strip()
-    search_pattern = f'%{query}%'
+    def find(article_id):
+        while parent.get(article_id, article_id) != article_id:
+            article_id = parent[article_id]
+        return article_id
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    weakest = {}
+    for a, b in candidates:
+        score = fingerprint.similarity(signatures[a], signatures[b])
+        if score < threshold:
+            continue
+        root_a, root_b = find(a), find(b)
+        root = min(root_a, root_b)
+        parent[root_a] = parent[root_b] = root
+        weakest[root] = min(score, weakest.get(root_a, 1.0), weakest.get(root_b, 1.0))
 
-    # Search with relevance scoring: title matches get score 2, content matches get score 1
-    cursor.execute('''
-        SELECT
-            id,
-            title,
-            summary,
-            url,
-            word_count,
-            saved_date,
-            CASE
-                WHEN title LIKE ? THEN 2
-                ELSE 1
-            END as relevance_score
-        FROM articles
-        WHERE title LIKE ? OR content LIKE ?
-        ORDER BY relevance_score DESC, saved_date DESC
-    ''', (search_pattern, search_pattern, search_pattern))
+    members = {}
+    for article_id in parent:
+        members.setdefault(find(article_id), []).append(article_id)
+    return sorted(members.items(), key=lambda item: (-len(item[1]), item[0]))[:limit], weakest
 
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+def _cluster_summaries(ranked, weakest, articles):
+    return [{
+        "size": len(ids),
+        "min_similarity": round(weakest[root], 4),
+        "articles": [articles[a] for a in sorted(ids) if a in articles]
+    } for root, ids in ranked]
+
+def _read_lsh_rows():
+    """Yield the current shard's (band, bucket, article ID) rows in that order."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute('SELECT band, bucket, article_id FROM article_lsh ORDER BY band, bucket, article_id')
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
 
+def _near_duplicates_over_shards(func, article_id, threshold=None):
+    """Run get_near_duplicates with the article's signature from its shard and candidates from every shard."""
+    if threshold is None:
+        threshold = fingerprint.NEAR_DUPLICATE_THRESHOLD
+    signature = _run_on_shard(shard_of_article(article_id), _select_with_connection,
+                              _select_signatures, [article_id]).get(article_id)
+    if signature is None:
+        return None
+    results = [article for part in _on_every_shard(_select_with_connection, _similar_articles,
+                                                   article_id, signature, threshold)
+               for article in part]
+    results.sort(key=lambda article: (-article['similarity'], article['id']))
     return results
 
-def delete_article(article_id):
+@sharded(_near_duplicates_over_shards)
+def get_near_duplicates(article_id, threshold=None):
     """
-    Delete an article from the database.
+    Find the articles whose text is a near-duplicate of one article.
 
     Args:
-        article_id: Article ID to delete
+        article_id: Article ID
+        threshold: Minimum estimated similarity (default NEAR_DUPLICATE_THRESHOLD)
 
     Returns:
-        Number of rows deleted (0 if not found, 1 if deleted)
+        List of dictionaries with id, title, word_count and similarity,
+        most similar first, or None if the article does not exist
     """
+    if threshold is None:
+        threshold = fingerprint.NEAR_DUPLICATE_THRESHOLD
+
     conn = get_db_connection()
     cursor = conn.cursor()
+    try:
+        signature = _select_signatures(cursor, [article_id]).get(article_id)
+        if signature is None:
+            return None
 
-    cursor.execute('DELETE FROM articles WHERE id = ?', (article_id,))
-    rows_deleted = cursor.rowcount
+        return _similar_articles(cursor, article_id, signature, threshold)
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
+def _similar_articles(cursor, article_id, signature, threshold):
+    """Return the articles (other than article_id) sharing an LSH bucket with signature and passing the threshold."""
+    buckets = list(enumerate(fingerprint.lsh_buckets(signature)))
+    placeholders = ','.join('(?, ?)' for _ in buckets)
+    cursor.execute(f'''
+        SELECT DISTINCT article_id FROM article_lsh
+        WHERE (band, bucket) IN (VALUES {placeholders}) AND article_id != ?
+    ''', [value for bucket in buckets for value in bucket] + [article_id])
+    candidates = _select_signatures(cursor, [row['article_id'] for row in cursor.fetchall()])
 
-    return rows_deleted
+    scores = {other: fingerprint.similarity(signature, other_signature)
+              for other, other_signature in candidates.items()}
+    matches = [other for other, score in scores.items() if score >= threshold]
+    articles = _select_article_summaries(cursor, matches)
+    results = [{**articles[other], "similarity": round(scores[other], 4)} for other in matches if other in articles]
+    results.sort(key=lambda article: (-article['similarity'], article['id']))
+    return results
 
-def get_stats():
+@sharded(_on_id_shards(_merge_titles))
+def get_article_titles(article_ids=None, chunk_size=500):
     """
-    Get database statistics.
+    Look up the titles of saved articles.
+
+    Args:
+        article_ids: Article IDs, or None for every article
 
     Returns:
-        Dictionary with database statistics
+        Dictionary of article ID -> title for the articles that exist
     """
     conn = get_db_connection()
     cursor = conn.cursor()
+    try:
+        if article_ids is None:
+            cursor.execute('SELECT id, title FROM articles ORDER BY id')
+            return {row['id']: row['title'] for row in cursor.fetchall()}
+        titles = {}
+        article_ids = list(article_ids)
+        for start in range(0, len(article_ids), chunk_size):
+            chunk = article_ids[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT id, title FROM articles WHERE id IN ({placeholders})', chunk)
+            titles.update((row['id'], row['title']) for row in cursor.fetchall())
+        return titles
+    finally:
+        conn.close()
 
-    # Get article statistics
-    cursor.execute('''
-        SELECT
-            COUNT(*) as total_articles,
-            COALESCE(SUM(word_count), 0) as total_words,
-            MIN(saved_date) as oldest_article_date,
-            MAX(saved_date) as newest_article_date
-        FROM articles
-    ''')
-
-    stats = dict(cursor.fetchone())
-    conn.close()
-
-    # Get database file size
-    if os.path.exists(DB_PATH):
-        db_size_bytes = os.path.getsize(DB_PATH)
-        db_size_mb = round(db_size_bytes / (1024 * 1024), 2)
-    else:
-        db_size_mb = 0.0
-
-    stats['database_size_mb'] = db_size_mb
-
-    # Handle case where there are no articles
-    if stats['total_articles'] == 0:
-        stats['oldest_article_date'] = None
-        stats['newest_article_date'] = None
-
-    return stats
-
-def add_tag(article_id, tag_name):
+@sharded(_on_article_shard)
+def update_article_content(article_id, content, url=None):
     """
-    Add a tag to an article.
+    Store a newly fetched version of a saved article.
+
+    The new text replaces the article's content and the previous text is
+    kept as a revision: a delta (see compression.make_delta) that rebuilds
+    it from the text that replaced it. Older revisions chain back the same
+    way, so history grows with the size of each change.
 
     Args:
         article_id: Article ID
-        tag_name: Tag name to add
-    """
-    tag_name = tag_name.strip()
-    if not tag_name:
-        return
+        content: Current article text
+        url: Wikipedia URL (keeps the stored one if None)
+
+    Returns:
+        Dictionary with id, status ('updated' or 'unchanged') and the
+        current revision number, or None if the article does not exist
 
+    Raises:
+        ValueError: If validation fails
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
-
     try:
-        # Insert tag if it doesn't exist
-        cursor.execute('INSERT OR IGNORE INTO tags (name) VALUES (?)', (tag_name,))
+        # Hold the write lock so two refreshes cannot both claim a revision number
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            SELECT title, url, content_hash, fetched_date, word_count, character_count,
+                   article_text(content, content_z, content_codec) as content
+            FROM articles WHERE id = ?
+        ''', (article_id,))
+        current = cursor.fetchone()
+        if not current:
+            conn.rollback()
+            return None
 
-        # Get tag ID
-        cursor.execute('SELECT id FROM tags WHERE name = ?', (tag_name,))
-        tag_row = cursor.fetchone()
-        tag_id = tag_row['id']
+        row = prepare_article_row(current['title'], content, url or current['url'])
+        cursor.execute('SELECT COALESCE(MAX(revision), 0) as latest FROM article_revisions WHERE article_id = ?',
+                       (article_id,))
+        revision = cursor.fetchone()['latest'] + 1
 
-        # Link article and tag
-        cursor.execute('INSERT OR IGNORE INTO article_tags (article_id, tag_id) VALUES (?, ?)',
-                     (article_id, tag_id))
+        previous_hash = current['content_hash'] or content_hash(current['content'])
+        if row[11] == previous_hash:
+            conn.rollback()
+            return {"id": article_id, "status": "unchanged", "revision": revision}
 
+        cursor.execute('''
+            INSERT INTO article_revisions
+                (article_id, revision, content_hash, fetched_date, word_count, character_count, delta)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (article_id, revision, previous_hash, current['fetched_date'], current['word_count'],
+              current['character_count'], compression.make_delta(content, current['content'])))
+        _unindex_articles(cursor, [(article_id, current['title'], current['content'])])
+        cursor.execute(REPLACE_ARTICLE_SQL, (*row[1:12], article_id))
+        _index_articles(cursor, [(article_id, current['title'], content)])
+
+        changes = _article_change_entries([article_id])
+        _log_invalidations(cursor, changes)
         conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
+    _invalidate(changes)
+    return {"id": article_id, "status": "updated", "revision": revision + 1}
 
-def get_article_tags(article_id):
+@sharded(_on_article_shard)
+def get_article_revisions(article_id):
     """
-    Get all tags for an article.
+    List an article's revisions without rebuilding their text.
 
     Args:
         article_id: Article ID
 
     Returns:
-        List of tag name strings
+        List of revision dictionaries, newest (the current text) first, or
+        None if the article does not exist. stored_size is the bytes a
+        revision takes: its delta, or the stored content for the current one.
     """
     conn = get_db_connection()
     cursor = conn.cursor()
-
-    cursor.execute('''
-        SELECT tags.name
-        FROM tags
-        JOIN article_tags ON tags.id = article_tags.tag_id
-        WHERE article_tags.article_id = ?
-    ''', (article_id,))
-
-    tags = [row['name'] for row in cursor.fetchall()]
-    conn.close()
-
-    return tags
-
-# Favorites functions
-def add_favorite(article_id):
-    """Add article to favorites."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute('INSERT OR IGNORE INTO favorites (article_id) VALUES (?)', (article_id,))
-        conn.commit()
-        return True
-    except Exception:
-        conn.rollback()
-        return False
+        cursor.execute('''
+            SELECT content_hash, fetched_date, saved_date, word_count, character_count, stored_size
+            FROM articles WHERE id = ?
+        ''', (article_id,))
+        current = cursor.fetchone()
+        if not current:
+            return None
+        cursor.execute('''
+            SELECT revision, content_hash, fetched_date, replaced_date, word_count, character_count,
+                   length(delta) as stored_size
+            FROM article_revisions WHERE article_id = ?
+            ORDER BY revision DESC
+        ''', (article_id,))
+        revisions = [{**dict(row), "current": False} for row in cursor.fetchall()]
     finally:
         conn.close()
 
-def remove_favorite(article_id):
-    """Remove article from favorites."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM favorites WHERE article_id = ?', (article_id,))
-    rows = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return rows > 0
+    latest = {key: current[key] for key in ('content_hash', 'fetched_date', 'word_count',
+                                            'character_count', 'stored_size')}
+    latest['revision'] = revisions[0]['revision'] + 1 if revisions else 1
+    latest['replaced_date'] = None
+    latest['current'] = True
+    return [latest] + revisions
 
-def get_favorites():
-    """Get all favorited articles."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT a.id, a.title, a.summary, a.word_count, a.saved_date, f.favorited_date
-        FROM articles a
-        JOIN favorites f ON a.id = f.article_id
-        ORDER BY f.favorited_date DESC
-    ''')
-    favorites = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return favorites
+@sharded(_on_article_shard)
+def get_article_revision(article_id, revision):
+    """
+    Rebuild the text of one revision of an article.
 
-def is_favorite(article_id):
-    """Check if article is favorited."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT 1 FROM favorites WHERE article_id = ?', (article_id,))
-    result = cursor.fetchone() is not None
-    conn.close()
-    return result
+    Deltas are applied from the current text back to the requested
+    revision, so older revisions take longer to rebuild.
 
-# Bulk operations
-def delete_multiple_articles(article_ids):
-    """Delete multiple articles by IDs."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    placeholders = ','.join('?' * len(article_ids))
-    cursor.execute(f'DELETE FROM articles WHERE id IN ({placeholders})', article_ids)
-    rows = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return rows
+    Args:
+        article_id: Article ID
+        revision: Revision number from get_article_revisions()
 
-def get_all_tags():
-    """Get all tags with article counts."""
+    Returns:
+        Revision dictionary with its content, or None if the article or
+        revision does not exist
+    """
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT t.id, t.name, COUNT(at.article_id) as article_count
-        FROM tags t
-        LEFT JOIN article_tags at ON t.id = at.tag_id
-        GROUP BY t.id, t.name
-        ORDER BY t.name
-    ''')
-    tags = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return tags
+    try:
+        cursor.execute('''
+            SELECT title, content_hash, fetched_date, word_count, character_count,
+                   article_text(content, content_z, content_codec) as content
+            FROM articles WHERE id = ?
+        ''', (article_id,))
+        current = cursor.fetchone()
+        if not current:
+            return None
+        cursor.execute('SELECT COALESCE(MAX(revision), 0) + 1 as latest FROM article_revisions WHERE article_id = ?',
+                       (article_id,))
+        latest = cursor.fetchone()['latest']
+        older = []
+        if revision < latest:
+            cursor.execute('''
+                SELECT revision, content_hash, fetched_date, replaced_date, word_count, character_count, delta
+                FROM article_revisions WHERE article_id = ? AND revision >= ?
+                ORDER BY revision DESC
+            ''', (article_id, revision))
+            older = cursor.fetchall()
+    finally:
+        conn.close()
 
-def get_articles_by_tag(tag_name):
-    """Get all articles with a specific tag."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT a.id, a.title, a.summary, a.word_count, a.saved_date
-        FROM articles a
-        JOIN article_tags at ON a.id = at.article_id
-        JOIN tags t ON at.tag_id = t.id
-        WHERE t.name = ?
-        ORDER BY a.saved_date DESC
-    ''', (tag_name,))
-    articles = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return articles
+    if revision == latest:
+        found = {key: current[key] for key in ('content_hash', 'fetched_date', 'word_count', 'character_count')}
+        found.update(revision=revision, replaced_date=None, current=True, content=current['content'])
+    elif older and older[-1]['revision'] == revision:
+        content = current['content']
+        for row in older:
+            content = compression.apply_delta(content, row['delta'])
+        found = {key: older[-1][key] for key in ('revision', 'content_hash', 'fetched_date', 'replaced_date',
+                                                 'word_count', 'character_count')}
+        found.update(current=False, content=content)
+    else:
+        return None
+    found['id'] = article_id
+    found['title'] = current['title']
+    return found
@@ -0,0 +1,239 @@
+import gzip
+import io
+import json
+import os
+import re
+import tarfile
+import zipfile
+from datetime import datetime, time, timezone
+import database
+
+# Directory where background export jobs write their archives
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(database.DB_PATH) or '.', 'exports'))
+
+# Articles read per query while exporting
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 200))
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'txt': ('text/plain', 'txt'),
+    'md': ('text/markdown', 'md'),
+    'html': ('text/html', 'html'),
+}
+
+# Streaming bulk export archive -> (mimetype, file extension)
+EXPORT_ARCHIVES = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'tar.gz': ('application/gzip', 'tar.gz'),
+    'zip': ('application/zip', 'zip'),
+}
+
+def render_article(article, format_type):
+    """
+    Render an article as text, markdown or HTML.
+
+    Args:
+        article: Article dictionary with title and content
+        format_type: One of EXPORT_FORMATS
+
+    Returns:
+        Rendered document as a string
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if format_type == 'txt':
+        return f"Title: {article['title']}\n\n{article['content']}"
+    elif format_type == 'md':
+        return f"# {article['title']}\n\n{article['content']}"
+    elif format_type == 'html':
+        return f"<!DOCTYPE html><html><head><meta charset='UTF-8'><title>{article['title']}</title></head><body><h1>{article['title']}</h1><pre>{article['content']}</pre></body></html>"
+    raise ValueError("Invalid format. Use txt, md, or html")
+
+def parse_rendered(text, format_type):
+    """
+    Recover title and content from a document written by render_article.
+
+    Returns:
+        Tuple of (title, content)
+
+    Raises:
+        ValueError: If the text is not in the given format
+    """
+    if format_type in ('txt', 'md'):
+        prefix = 'Title: ' if format_type == 'txt' else '# '
+        header, sep, content = text.partition('\n\n')
+        if not header.startswith(prefix) or not sep:
+            raise ValueError(f"Not an exported .{format_type} article")
+        return header[len(prefix):].strip(), content
+    if format_type == 'html':
+        title = re.search(r'<title>(.*?)</title>', text, flags=re.DOTALL)
+        start = text.find('<pre>')
+        end = text.rfind('</pre>')
+        if not title or start < 0 or end < start:
+            raise ValueError("Not an exported .html article")
+        return title.group(1).strip(), text[start + len('<pre>'):end]
+    raise ValueError("Invalid format. Use txt, md, or html")
+
+def export_filename(article, format_type):
+    """Return a filesystem-safe file name for an exported article."""
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', '_', article['title']).strip() or f"article_{article['id']}"
+    return f"{name}.{EXPORT_FORMATS[format_type][1]}"
+
+def parse_date_filter(value, end_of_day=False):
+    """
+    Parse an ISO date or datetime export filter into saved_date's format.
+
+    A bare date means the start of that day, or its end when end_of_day is
+    set, so since=2024-01-01&until=2024-01-31 covers all of January.
+
+    Raises:
+        ValueError: If the value is not an ISO date or datetime
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date: {value}")
+    if end_of_day and len(value) == 10:
+        parsed = datetime.combine(parsed.date(), time.max)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only, unseekable sink whose contents are drained between entries."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _entry_name(article, format_type):
+    return f"{article['id']}_{export_filename(article, format_type)}"
+
+def _zip_entry(article, format_type):
+    """ZipInfo for an article, dated by its saved_date so imports can restore it."""
+    info = zipfile.ZipInfo(_entry_name(article, format_type))
+    try:
+        info.date_time = datetime.fromisoformat(article['saved_date']).timetuple()[:6]
+    except (TypeError, ValueError):
+        info.date_time = datetime.now(timezone.utc).timetuple()[:6]
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+def iter_ndjson(articles):
+    """Yield one JSON document per article, newline-delimited, as bytes."""
+    for article in articles:
+        yield (json.dumps(article, ensure_ascii=False) + '\n').encode('utf-8')
+
+def iter_tar_gz(articles, format_type='txt'):
+    """Yield a gzipped tar archive with one file per article, as bytes."""
+    buffer = _ChunkBuffer()
+    # tarfile's own 'w|gz' mode always compresses at level 9, which is several times slower
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) as gz, \
+            tarfile.open(fileobj=gz, mode='w|') as archive:
+        for article in articles:
+            data = render_article(article, format_type).encode('utf-8')
+            info = tarfile.TarInfo(_entry_name(article, format_type))
+            info.size = len(data)
+            try:
+                # saved_date is UTC
+                info.mtime = datetime.fromisoformat(article['saved_date']).replace(tzinfo=timezone.utc).timestamp()
+            except (TypeError, ValueError):
+                pass
+            archive.addfile(info, io.BytesIO(data))
+            # TarFile remembers every member it wrote; a stream never needs them
+            archive.members.clear()
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    yield buffer.drain()
+
+def iter_zip(articles, format_type='txt'):
+    """
+    Yield a zip archive with one file per article, as bytes.
+
+    The archive is written to an unseekable sink, so zipfile uses data
+    descriptors and only the current entry is buffered. zip's central
+    directory still needs a small record per entry, kept until the end.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for article in articles:
+            archive.writestr(_zip_entry(article, format_type), render_article(article, format_type))
+            yield buffer.drain()
+    yield buffer.drain()
+
+def stream_export(archive_type, format_type='txt', article_ids=None, **filters):
+    """
+    Stream a bulk export, reading articles from the database in batches.
+
+    Args:
+        archive_type: One of EXPORT_ARCHIVES
+        format_type: One of EXPORT_FORMATS (file format inside tar.gz and zip)
+        article_ids: Optional list of IDs to restrict to
+        **filters: tag, favorites, since and until, as for database.iter_articles
+
+    Returns:
+        Generator of byte chunks
+
+    Raises:
+        ValueError: If the archive type or format is not supported
+    """
+    if archive_type not in EXPORT_ARCHIVES:
+        raise ValueError("Invalid archive. Use ndjson, tar.gz, or zip")
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError("Invalid format. Use txt, md, or html")
+
+    articles = database.iter_articles(article_ids, batch_size=EXPORT_BATCH_SIZE, **filters)
+    if archive_type == 'ndjson':
+        return iter_ndjson(articles)
+    if archive_type == 'tar.gz':
+        return iter_tar_gz(articles, format_type)
+    return iter_zip(articles, format_type)
+
+def export_archive(path, article_ids=None, format_type='txt', progress=None, **filters):
+    """
+    Write articles into a zip archive, one file per article.
+
+    Args:
+        path: Destination .zip path (written to a temp file, then renamed)
+        article_ids: Optional list of IDs; all articles when None
+        format_type: One of EXPORT_FORMATS
+        progress: Optional callable(done, total)
+        **filters: tag, favorites, since and until, as for database.iter_articles
+
+    Returns:
+        Number of articles written
+    """
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError("Invalid format. Use txt, md, or html")
+
+    # The total is only known up front without filters
+    if any(filters.values()):
+        total = None
+    elif article_ids is not None:
+        total = len(article_ids)
+    else:
+        total = database.count_articles()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.part'
+
+    count = 0
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for article in database.iter_articles(article_ids, batch_size=EXPORT_BATCH_SIZE, **filters):
+            archive.writestr(_zip_entry(article, format_type), render_article(article, format_type))
+            count += 1
+            if progress:
+                progress(count, total)
+
+    os.replace(tmp_path, path)
+    return count
@@ -0,0 +1,328 @@
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Fetcher configuration (all overridable through environment variables)
+WIKIPEDIA_LANG = os.getenv('WIKIPEDIA_LANG', 'en')
+WIKIPEDIA_API_URL = os.getenv('WIKIPEDIA_API_URL', f'https://{WIKIPEDIA_LANG}.wikipedia.org/w/api.php')
+WIKIPEDIA_USER_AGENT = os.getenv('WIKIPEDIA_USER_AGENT', 'MyWikipediaApp/1.0')
+WIKIPEDIA_MAX_CONCURRENCY = int(os.getenv('WIKIPEDIA_MAX_CONCURRENCY', 4))
+WIKIPEDIA_RATE_LIMIT = float(os.getenv('WIKIPEDIA_RATE_LIMIT', 10))
+WIKIPEDIA_TIMEOUT = float(os.getenv('WIKIPEDIA_TIMEOUT', 10))
+WIKIPEDIA_RETRIES = int(os.getenv('WIKIPEDIA_RETRIES', 3))
+WIKIPEDIA_BACKOFF = float(os.getenv('WIKIPEDIA_BACKOFF', 0.5))
+WIKIPEDIA_DEADLINE = float(os.getenv('WIKIPEDIA_DEADLINE', 20))
+
+# HTTP status codes worth retrying
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class WikipediaError(Exception):
+    """Base class for fetch errors."""
+
+class PageError(WikipediaError):
+    """The requested page does not exist."""
+
+    def __init__(self, title):
+        super().__init__(f'Page "{title}" does not match any pages')
+        self.title = title
+
+class DisambiguationError(WikipediaError):
+    """The requested title is a disambiguation page."""
+
+    def __init__(self, title, options):
+        super().__init__(f'"{title}" may refer to: {", ".join(options)}')
+        self.title = title
+        self.options = options
+
+class FetchError(WikipediaError):
+    """Upstream could not be reached or returned an error after all retries."""
+
+def normalize_title(title):
+    """
+    Normalize a title the way MediaWiki does for lookups.
+
+    Underscores become spaces, whitespace is collapsed and the first letter
+    is upper-cased. Used as the coalescing key for in-flight fetches.
+    """
+    title = ' '.join(title.replace('_', ' ').split())
+    return title[:1].upper() + title[1:]
+
+class RateLimiter:
+    """Token bucket limiting requests per second to one host."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve a token; a negative balance queues callers behind each other
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class WikipediaFetcher:
+    """
+    Concurrent, coalescing client for the MediaWiki API.
+
+    Fetches run on a bounded thread pool. Concurrent requests for the same
+    normalized title share one upstream fetch. Every HTTP call goes through a
+    per-host rate limiter and is retried with exponential backoff and full
+    jitter on timeouts, connection errors, 429 and 5xx responses.
+    """
+
+    def __init__(self, api_url=None, max_concurrency=None, rate_limit=None,
+                 timeout=None, retries=None, backoff=None, user_agent=None):
+        self.api_url = api_url or WIKIPEDIA_API_URL
+        self.max_concurrency = max_concurrency or WIKIPEDIA_MAX_CONCURRENCY
+        self.rate_limit = WIKIPEDIA_RATE_LIMIT if rate_limit is None else rate_limit
+        self.timeout = timeout or WIKIPEDIA_TIMEOUT
+        self.retries = WIKIPEDIA_RETRIES if retries is None else retries
+        self.backoff = WIKIPEDIA_BACKOFF if backoff is None else backoff
+        self.user_agent = user_agent or WIKIPEDIA_USER_AGENT
+
+        self._lock = threading.Lock()
+        self._limiters = {}
+        self._inflight = {}
+        self._executor = None
+        self._pid = None
+        self.stats = {"requests": 0, "fetches": 0, "coalesced": 0, "retries": 0, "errors": 0}
+        # Optional callable(seconds, outcome) told about every completed fetch
+        self.observer = None
+
+    def _get_executor(self):
+        # Worker threads do not survive a fork, so rebuild per process
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix='wikifetch')
+            self._inflight = {}
+            self._pid = os.getpid()
+        return self._executor
+
+    def _limiter_for(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = RateLimiter(self.rate_limit)
+            return limiter
+
+    def _api_get(self, params):
+        """Call the API with retries and return the decoded JSON body."""
+        params = dict(params, format='json', formatversion=2)
+        url = f'{self.api_url}?{urllib.parse.urlencode(params)}'
+        request = urllib.request.Request(url, headers={'User-Agent': self.user_agent})
+        limiter = self._limiter_for(url)
+
+        attempt = 0
+        while True:
+            limiter.acquire()
+            retry_after = None
+            try:
+                with self._lock:
+                    self.stats["requests"] += 1
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    data = json.loads(response.read().decode('utf-8'))
+                error = data.get('error')
+                if not error:
+                    return data
+                if error.get('code') not in ('maxlag', 'ratelimited'):
+                    raise FetchError(f"API error: {error.get('info', error.get('code'))}")
+                failure = FetchError(f"API error: {error.get('code')}")
+            except urllib.error.HTTPError as e:
+                if e.code not in RETRYABLE_STATUS:
+                    raise FetchError(f'HTTP {e.code} from {self.api_url}') from e
+                failure = e
+                retry_after = e.headers.get('Retry-After')
+            except (urllib.error.URLError, socket.timeout, ConnectionError) as e:
+                failure = e
+
+            if attempt >= self.retries:
+                raise FetchError(f'Giving up after {attempt + 1} attempts: {failure}') from failure
+
+            # Exponential backoff with full jitter, honouring Retry-After when given
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), 30.0))
+            attempt += 1
+            with self._lock:
+                self.stats["retries"] += 1
+            logging.warning(f"Retrying Wikipedia request in {delay:.2f}s ({failure})")
+            time.sleep(delay)
+
+    def _query_page(self, title):
+        data = self._api_get({
+            'action': 'query',
+            'prop': 'extracts|info|pageprops',
+            'explaintext': 1,
+            'inprop': 'url',
+            'ppprop': 'disambiguation',
+            'redirects': 1,
+            'titles': title
+        })
+        pages = data.get('query', {}).get('pages', [])
+        return pages[0] if pages else None
+
+    def _search_title(self, query):
+        data = self._api_get({
+            'action': 'query',
+            'list': 'search',
+            'srsearch': query,
+            'srlimit': 1,
+            'srinfo': 'suggestion',
+            'srprop': ''
+        })
+        results = data.get('query', {})
+        if results.get('search'):
+            return results['search'][0]['title']
+        return results.get('searchinfo', {}).get('suggestion')
+
+    def _disambiguation_options(self, title):
+        data = self._api_get({
+            'action': 'query',
+            'prop': 'links',
+            'plnamespace': 0,
+            'pllimit': 'max',
+            'titles': title
+        })
+        pages = data.get('query', {}).get('pages', [])
+        links = pages[0].get('links', []) if pages else []
+        return [link['title'] for link in links]
+
+    def _fetch(self, title):
+        """Fetch one page, falling back to the top search hit if it is missing."""
+        with self._lock:
+            self.stats["fetches"] += 1
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            page = self._query_page(title)
+            if page is None or page.get('missing') or page.get('invalid'):
+                suggestion = self._search_title(title)
+                if not suggestion:
+                    raise PageError(title)
+                page = self._query_page(suggestion)
+                if page is None or page.get('missing') or page.get('invalid'):
+                    raise PageError(title)
+
+            if 'disambiguation' in page.get('pageprops', {}):
+                raise DisambiguationError(page['title'], self._disambiguation_options(page['title']))
+
+            content = page.get('extract') or ''
+            # Plain-text extracts mark sections as "== Heading =="; the lead is the summary
+            summary = content.split('\n==', 1)[0].strip()
+            outcome = 'ok'
+            return {
+                "title": page['title'],
+                "content": content,
+                "summary": summary,
+                "url": page.get('fullurl') or f"https://{WIKIPEDIA_LANG}.wikipedia.org/wiki/{page['title'].replace(' ', '_')}"
+            }
+        except PageError:
+            outcome = 'missing'
+            raise
+        except DisambiguationError:
+            outcome = 'disambiguation'
+            raise
+        finally:
+            if outcome != 'ok':
+                with self._lock:
+                    self.stats["errors"] += 1
+            if self.observer is not None:
+                self.observer(time.perf_counter() - start, outcome)
+
+    def submit(self, title):
+        """
+        Schedule a fetch, joining an in-flight fetch for the same title.
+
+        Returns:
+            concurrent.futures.Future resolving to a page dict
+        """
+        key = normalize_title(title)
+        with self._lock:
+            executor = self._get_executor()
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future
+            future = executor.submit(self._fetch, key)
+            self._inflight[key] = future
+
+        def forget(done):
+            with self._lock:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+        future.add_done_callback(forget)
+        return future
+
+    def fetch_page(self, title, deadline=None):
+        """
+        Fetch a single page, waiting at most `deadline` seconds.
+
+        Returns:
+            Dictionary with title, content, summary and url
+
+        Raises:
+            PageError, DisambiguationError, FetchError, or
+            concurrent.futures.TimeoutError when the deadline passes
+        """
+        return self.submit(title).result(timeout=deadline or WIKIPEDIA_DEADLINE)
+
+    def fetch_many(self, titles):
+        """
+        Fetch many pages concurrently.
+
+        Yields:
+            (title, page dict or None, exception or None) in completion order
+        """
+        futures = {}
+        for title in titles:
+            futures.setdefault(self.submit(title), []).append(title)
+        for future in as_completed(futures):
+            error = future.exception()
+            for title in futures[future]:
+                yield title, (None if error else future.result()), error
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._inflight))
+
+_fetcher = WikipediaFetcher()
+
+def fetch_page(title, deadline=None):
+    """Fetch a page through the shared process-wide fetcher."""
+    return _fetcher.fetch_page(title, deadline=deadline)
+
+def submit(title):
+    """Schedule a fetch on the shared process-wide fetcher and return its Future."""
+    return _fetcher.submit(title)
+
+def fetch_many(titles):
+    """Fetch many pages through the shared process-wide fetcher."""
+    return _fetcher.fetch_many(titles)
+
+def set_fetch_observer(observer):
+    """Call observer(seconds, outcome) after every fetch of the shared fetcher."""
+    _fetcher.observer = observer
+
+def get_fetcher_stats():
+    """Return request/coalescing counters for the shared fetcher."""
+    return _fetcher.get_stats()
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import struct
+import zlib
+
+# Near-duplicate detection configuration
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.8))
+
+# Signatures are stored, so these are fixed: changing them would make old
+# and new signatures incomparable. 16 bands of 4 rows put the LSH candidate
+# threshold near a Jaccard similarity of 0.5; candidates are then checked
+# against NEAR_DUPLICATE_THRESHOLD.
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+MINHASH_SIZE = MINHASH_BANDS * MINHASH_ROWS
+SHINGLE_WORDS = 3
+
+MASK64 = (1 << 64) - 1
+EMPTY_BIN = MASK64
+# One-permutation hashing: the top bits of a shingle hash pick its bin
+BIN_SHIFT = 64 - (MINHASH_SIZE.bit_length() - 1)
+VALUE_MASK = (1 << BIN_SHIFT) - 1
+
+def shingle_hashes(text):
+    """Return the set of 64-bit hashes of the text's word 3-grams (case-insensitive)."""
+    # Whitespace-split words: punctuation stays attached, which is consistent
+    # between copies of a text and much cheaper than a regex tokenizer
+    words = text.lower().split()
+    word_hashes = {word: zlib.crc32(word.encode('utf-8')) for word in set(words)}
+    hashes = [word_hashes[word] for word in words]
+    if len(hashes) < SHINGLE_WORDS:
+        hashes += [0] * (SHINGLE_WORDS - len(hashes))
+    # Multiplying by an odd constant mixes every input bit into the top bits
+    return {(((h1 << 32) ^ (h2 << 16) ^ h3) * 0x9E3779B97F4A7C15) & MASK64
+            for h1, h2, h3 in zip(hashes, hashes[1:], hashes[2:])}
+
+def minhash(text):
+    """
+    Compute a MinHash signature of the text's word shingles.
+
+    Uses one-permutation hashing: each shingle is hashed once and its hash
+    kept as the minimum of one of MINHASH_SIZE bins, so the cost is linear
+    in the text rather than in text x signature size. Empty bins borrow
+    from the next filled bin (rotation densification).
+
+    Returns:
+        Signature as bytes (MINHASH_SIZE little-endian uint64 values)
+    """
+    bins = [EMPTY_BIN] * MINHASH_SIZE
+    for value in shingle_hashes(text):
+        index = value >> BIN_SHIFT
+        value &= VALUE_MASK
+        if value < bins[index]:
+            bins[index] = value
+
+    if EMPTY_BIN in bins:
+        filled = bins[:]
+        for index in range(MINHASH_SIZE):
+            distance = 1
+            while filled[index] == EMPTY_BIN and distance < MINHASH_SIZE:
+                source = bins[(index + distance) % MINHASH_SIZE]
+                if source != EMPTY_BIN:
+                    # Offset by the distance so borrowed values differ from their source
+                    filled[index] = source + (distance << BIN_SHIFT)
+                distance += 1
+        bins = filled
+    return struct.pack(f'<{MINHASH_SIZE}Q', *bins)
+
+def lsh_buckets(signature):
+    """
+    Hash each band of a signature to a bucket ID.
+
+    Articles that share a bucket in any band are near-duplicate candidates.
+
+    Returns:
+        List of MINHASH_BANDS signed 64-bit integers (SQLite INTEGER range)
+    """
+    band_bytes = MINHASH_ROWS * 8
+    return [int.from_bytes(hashlib.blake2b(signature[band * band_bytes:(band + 1) * band_bytes],
+                                           digest_size=8).digest(), 'little', signed=True)
+            for band in range(MINHASH_BANDS)]
+
+def similarity(signature_a, signature_b):
+    """Estimate the Jaccard similarity of two texts from their signatures (0.0 to 1.0)."""
+    a = struct.unpack(f'<{MINHASH_SIZE}Q', signature_a)
+    b = struct.unpack(f'<{MINHASH_SIZE}Q', signature_b)
+    return sum(1 for x, y in zip(a, b) if x == y) / MINHASH_SIZE
@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# HTTP caching and compression configuration
+HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 60))
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv('HTTP_COMPRESS_MIN_BYTES', 1024))
+HTTP_COMPRESS_LEVEL = int(os.getenv('HTTP_COMPRESS_LEVEL', 6))
+
+# Response types worth compressing
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+def make_etag(*parts):
+    """Build a strong ETag value from the parts that determine a representation."""
+    digest = hashlib.sha256('\x00'.join(str(part) for part in parts).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+def parse_db_timestamp(value):
+    """Convert an SQLite CURRENT_TIMESTAMP string (UTC) to an aware datetime, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.replace(microsecond=0)
+
+def cache_control():
+    """Return the Cache-Control value for cacheable article responses."""
+    return f'public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate'
+
+def _matching_etag(etag):
+    """Return the If-None-Match entry matching etag (or any encoded variant of it)."""
+    if request.if_none_match.star_tag:
+        return etag
+    for tag in request.if_none_match.as_set(include_weak=True):
+        if tag == etag or tag.startswith(f'{etag}-'):
+            return tag
+    return None
+
+def not_modified(etag, last_modified=None):
+    """
+    Answer a conditional GET before the response body is built.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted when
+    the request has no ETag to compare.
+
+    Args:
+        etag: Current ETag value (unquoted), e.g. from make_etag()
+        last_modified: Aware datetime of the last change, or None
+
+    Returns:
+        A 304 Response when the client's copy is current, else None
+    """
+    if request.if_none_match:
+        matched = _matching_etag(etag)
+        if matched is None:
+            return None
+    elif last_modified is not None and request.if_modified_since is not None:
+        if last_modified > request.if_modified_since:
+            return None
+        matched = etag
+    else:
+        return None
+
+    response = Response(status=304)
+    set_validators(response, matched, last_modified)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag, Last-Modified and Cache-Control headers to a response."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control()
+    return response
+
+def _negotiate_encoding():
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def compress_response(response):
+    """
+    Compress large text and JSON responses with brotli or gzip (after_request hook).
+
+    Streamed, passthrough (send_file) and already-encoded responses are left
+    alone. A compressed response gets its own strong ETag ("<etag>-gzip" or
+    "<etag>-br"); not_modified() accepts either form.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    if not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES):
+        return response
+
+    data = response.get_data()
+    if len(data) < HTTP_COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        body = brotli.compress(data, quality=min(HTTP_COMPRESS_LEVEL, 11))
+    else:
+        body = gzip.compress(data, compresslevel=HTTP_COMPRESS_LEVEL, mtime=0)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+    return response
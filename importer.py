@@ -0,0 +1,278 @@
+"""
+Streaming article importer for NDJSON, tar(.gz) and zip files.
+
+Reads the formats GET /api/export produces (NDJSON lines, or archives of
+exported .txt/.md/.html files) and stores them with database.import_articles.
+
+Usage:
+    python -m importer library.ndjson [more files...] [--policy skip|replace|newest]
+    curl http://localhost:5000/api/export | python -m importer -
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from datetime import datetime, timezone
+import database
+import exporter
+
+# Import configuration
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 2000))
+IMPORT_DIR = os.getenv('IMPORT_DIR', os.path.join(os.path.dirname(database.DB_PATH) or '.', 'imports'))
+
+IMPORT_FORMATS = ('ndjson', 'tar', 'zip')
+
+# Archive member extension -> exported document format
+MEMBER_FORMATS = {'.txt': 'txt', '.md': 'md', '.html': 'html'}
+
+class _PrefixedReader(io.RawIOBase):
+    """Readable stream that replays already-consumed bytes before the rest of a stream."""
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _read_head(stream, size=1024):
+    head = b''
+    while len(head) < size:
+        data = stream.read(size - len(head))
+        if not data:
+            break
+        head += data
+    return head
+
+def sniff_format(head):
+    """Guess the import format ('ndjson', 'tar' or 'zip') from a file's first bytes."""
+    if head[:4] == b'PK\x03\x04':
+        return 'zip'
+    if head[:2] == b'\x1f\x8b':
+        # gzip: look inside to tell tar.gz from gzipped NDJSON
+        head = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head)
+        if head.lstrip()[:1] == b'{':
+            return 'ndjson'
+        return 'tar'
+    if head[257:262] == b'ustar':
+        return 'tar'
+    return 'ndjson'
+
+class ParseErrors:
+    """Counts unparseable input, keeping only the first few messages."""
+
+    def __init__(self, limit=None):
+        self.limit = database.IMPORT_MAX_ERRORS if limit is None else limit
+        self.count = 0
+        self.messages = []
+
+    def add(self, message):
+        self.count += 1
+        if len(self.messages) < self.limit:
+            self.messages.append(message)
+
+def iter_ndjson(stream, errors):
+    """Yield article dicts from NDJSON lines; malformed lines are added to errors."""
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            errors.add(f"Line {line_number}: invalid JSON")
+            continue
+        if not isinstance(record, dict):
+            errors.add(f"Line {line_number}: not a JSON object")
+            continue
+        yield record
+
+def _member_article(name, data, mtime, errors):
+    """Turn one exported archive member into an article dict, or None."""
+    base = os.path.basename(name)
+    format_type = MEMBER_FORMATS.get(os.path.splitext(base)[1].lower())
+    if format_type is None:
+        return None
+    try:
+        title, content = exporter.parse_rendered(data.decode('utf-8'), format_type)
+    except (UnicodeDecodeError, ValueError) as e:
+        errors.add(f"{name}: {e}")
+        return None
+    article = {"title": title, "content": content,
+               "url": f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"}
+    if mtime:
+        # The exporter stores saved_date (UTC) as the member's mtime
+        article["saved_date"] = datetime.fromtimestamp(mtime, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return article
+
+def iter_tar(stream, errors):
+    """Yield article dicts from a tar or tar.gz stream, one member at a time."""
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            # Streaming tar keeps every member it has read otherwise
+            archive.members.clear()
+            data = archive.extractfile(member)
+            if member.name.endswith(('.ndjson', '.jsonl')):
+                yield from iter_ndjson(data, errors)
+                continue
+            article = _member_article(member.name, data.read(), member.mtime, errors)
+            if article is not None:
+                yield article
+
+def iter_zip(file, errors):
+    """Yield article dicts from a zip file (needs a seekable file)."""
+    with zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if info.filename.endswith(('.ndjson', '.jsonl')):
+                with archive.open(info) as member:
+                    yield from iter_ndjson(member, errors)
+                continue
+            mtime = datetime(*info.date_time, tzinfo=timezone.utc).timestamp()
+            article = _member_article(info.filename, archive.read(info), mtime, errors)
+            if article is not None:
+                yield article
+
+def iter_records(stream, format_type=None, errors=None):
+    """
+    Yield article dicts from an import stream.
+
+    Args:
+        stream: Binary file-like object (a file, stdin or an HTTP body)
+        format_type: 'ndjson', 'tar' or 'zip'; sniffed from the content when None
+        errors: ParseErrors collecting unparseable lines and members
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    errors = ParseErrors() if errors is None else errors
+    if format_type is not None and format_type not in IMPORT_FORMATS:
+        raise ValueError("Invalid format. Use ndjson, tar, or zip")
+
+    head = _read_head(stream)
+    format_type = format_type or sniff_format(head)
+
+    if format_type == 'zip':
+        if getattr(stream, 'seekable', lambda: False)():
+            stream.seek(0)
+            yield from iter_zip(stream, errors)
+            return
+        # zip keeps its index at the end: spool unseekable input to disk first
+        with tempfile.TemporaryFile() as spool:
+            spool.write(head)
+            shutil.copyfileobj(stream, spool, 1024 * 1024)
+            spool.seek(0)
+            yield from iter_zip(spool, errors)
+        return
+
+    stream = io.BufferedReader(_PrefixedReader(head, stream), buffer_size=1024 * 1024)
+    if format_type == 'tar':
+        yield from iter_tar(stream, errors)
+    elif head[:2] == b'\x1f\x8b':
+        yield from iter_ndjson(gzip.GzipFile(fileobj=stream), errors)
+    else:
+        yield from iter_ndjson(stream, errors)
+
+def import_stream(stream, policy='skip', format_type=None, defer_indexes=None, batch_size=None, progress=None):
+    """
+    Import articles from an NDJSON, tar or zip stream.
+
+    Returns:
+        Summary dict from database.import_articles; unparseable lines and
+        archive members count as invalid
+    """
+    errors = ParseErrors()
+    records = iter_records(stream, format_type, errors)
+    summary = database.import_articles(records, policy=policy, batch_size=batch_size or IMPORT_BATCH_SIZE,
+                                       defer_indexes=defer_indexes, progress=progress)
+    summary["invalid"] += errors.count
+    summary["errors"] = (errors.messages + summary["errors"])[:database.IMPORT_MAX_ERRORS]
+    return summary
+
+def import_file(path, **kwargs):
+    """Import articles from a file path (see import_stream for the options)."""
+    with open(path, 'rb') as f:
+        return import_stream(f, **kwargs)
+
+def spool_upload(stream):
+    """Save an uploaded import to IMPORT_DIR so a background job can read it later."""
+    os.makedirs(IMPORT_DIR, mode=0o700, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='import_', suffix='.upload', dir=IMPORT_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        shutil.copyfileobj(stream, f, 1024 * 1024)
+    return path
+
+def _spooled_path(path):
+    """Resolve a path from spool_upload, refusing anything else (symlinks included)."""
+    real_path = os.path.realpath(path)
+    name = os.path.basename(real_path)
+    if (os.path.dirname(real_path) != os.path.realpath(IMPORT_DIR)
+            or not name.startswith('import_') or not name.endswith('.upload')):
+        raise ValueError(f"Not a spooled upload: {path}")
+    return real_path
+
+def import_spooled(path, **kwargs):
+    """
+    Import an upload saved by spool_upload, then delete it.
+
+    Only files spool_upload created in IMPORT_DIR are read or deleted, so a
+    job's path parameter cannot point anywhere else.
+    """
+    path = _spooled_path(path)
+    try:
+        return import_file(path, **kwargs)
+    finally:
+        # The spooled upload is only needed once
+        if os.path.exists(path):
+            os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="files to import ('-' for stdin)")
+    parser.add_argument('--policy', choices=database.IMPORT_POLICIES, default='skip',
+                        help='what to do with titles that are already saved (default: skip)')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='input format (default: detect)')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    defer = parser.add_mutually_exclusive_group()
+    defer.add_argument('--defer-indexes', dest='defer', action='store_true', default=None,
+                       help='rebuild indexes once at the end, in one transaction (default: if the library is empty)')
+    defer.add_argument('--no-defer-indexes', dest='defer', action='store_false')
+    args = parser.parse_args()
+
+    database.init_db()
+
+    def progress(done, total):
+        print(f'\r{done} articles read', end='', file=sys.stderr, flush=True)
+
+    for path in args.paths:
+        options = dict(policy=args.policy, format_type=args.format, defer_indexes=args.defer,
+                       batch_size=args.batch_size, progress=progress)
+        if path == '-':
+            summary = import_stream(sys.stdin.buffer, **options)
+        else:
+            summary = import_file(path, **options)
+        print(file=sys.stderr)
+        print(json.dumps({"path": path, **summary}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import database
+import fetcher
+import lookup
+
+# Batch import configuration
+BATCH_FETCH_MAX_TITLES = int(os.getenv('BATCH_FETCH_MAX_TITLES', 5000))
+BATCH_FETCH_CHUNK_SIZE = int(os.getenv('BATCH_FETCH_CHUNK_SIZE', 200))
+
+# File migration configuration
+MIGRATION_WORKERS = int(os.getenv('MIGRATION_WORKERS', os.cpu_count() or 1))
+MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 1000))
+
+def fetch_error_message(title, error):
+    """Describe a fetcher error for a per-title result."""
+    if isinstance(error, fetcher.DisambiguationError):
+        return f"Disambiguation page; may refer to: {', '.join(error.options[:10])}"
+    if isinstance(error, fetcher.PageError):
+        return "Article not found on Wikipedia"
+    logging.error(f"Batch fetch error for '{title}': {error}")
+    return f"Error: {error}"
+
+def fetch_articles_batch(titles, tags=None, chunk_size=None, progress=None):
+    """
+    Fetch many Wikipedia titles in parallel and store them in chunked transactions.
+
+    Titles that are already saved are skipped before any fetch, so re-running
+    a batch after a crash only fetches what the earlier run did not commit.
+    Redirects are remembered in the lookup cache as pages are stored, so a
+    title saved under its redirect target is skipped as well.
+
+    Args:
+        titles: List of article titles
+        tags: List of tag names applied to every new article (optional)
+        chunk_size: Articles per insert transaction (default BATCH_FETCH_CHUNK_SIZE)
+        progress: Optional callable(done, total) invoked as titles complete
+
+    Returns:
+        List of per-title result dicts with title, status
+        ('success', 'skipped' or 'error'), message and article_id
+    """
+    chunk_size = chunk_size or BATCH_FETCH_CHUNK_SIZE
+
+    results = {}
+    pending = []
+    for title in titles:
+        key = fetcher.normalize_title(title) if isinstance(title, str) else ''
+        if key and key not in results:
+            results[key] = None
+            pending.append(key)
+
+    total = len(pending)
+    done = 0
+
+    # Resume: never refetch titles that are already saved, under their own
+    # title or the one they redirected to
+    resolved = lookup.resolved_titles(pending)
+    saved = database.get_article_ids_by_title(set(pending) | set(resolved.values()))
+    existing = {}
+    for title in pending:
+        article_id = saved.get(title) or saved.get(resolved.get(title))
+        if article_id is not None:
+            existing[title] = article_id
+    for title, article_id in existing.items():
+        results[title] = {"title": title, "status": "skipped",
+                          "message": "Article already exists in database", "article_id": article_id}
+    to_fetch = [title for title in pending if title not in existing]
+    done += len(existing)
+    if progress:
+        progress(done, total)
+
+    # Resolved page title -> (requested title, page), flushed every chunk_size pages
+    buffer = {}
+    # (requested title, page) for every fetched page, recorded once it is stored
+    fetched = []
+
+    def flush():
+        stored_results = database.insert_articles_bulk([page for _, page in buffer.values()], tags=tags)
+        for stored in stored_results:
+            requested, _ = buffer[stored['title']]
+            result = results[requested]
+            if stored['status'] == 'inserted':
+                result.update(status="success", message=f"Imported successfully (ID: {stored['article_id']})",
+                              article_id=stored['article_id'])
+            elif stored['status'] == 'duplicate':
+                result.update(status="success", message=stored['message'], article_id=stored['article_id'])
+            elif stored['status'] == 'exists':
+                result.update(status="skipped", message="Article already exists in database",
+                              article_id=stored['article_id'])
+            else:
+                result.update(status="error", message=stored['message'])
+        lookup.record_pages(fetched)
+        buffer.clear()
+        fetched.clear()
+
+    for title, page, error in fetcher.fetch_many(to_fetch):
+        if error is not None:
+            results[title] = {"title": title, "status": "error", "message": fetch_error_message(title, error)}
+        else:
+            results[title] = {"title": title, "status": "pending", "message": None,
+                              "resolved_title": page['title']}
+            fetched.append((title, page))
+            # Two requested titles can resolve to one page; only store it once
+            if page['title'] in buffer:
+                results[title].update(status="skipped", message="Duplicate of another title in this batch")
+            else:
+                buffer[page['title']] = (title, page)
+                if len(buffer) >= chunk_size:
+                    flush()
+
+        done += 1
+        if progress:
+            progress(done, total)
+
+    if buffer:
+        flush()
+
+    ordered = []
+    seen = set()
+    for title in titles:
+        key = fetcher.normalize_title(title) if isinstance(title, str) else ''
+        if not key:
+            ordered.append({"title": title, "status": "error", "message": "Title is empty"})
+        elif key not in seen:
+            seen.add(key)
+            ordered.append(results[key])
+    return ordered
+
+def refresh_articles(article_ids=None, progress=None):
+    """
+    Refetch saved articles in parallel and store the ones that changed as new revisions.
+
+    Pages whose text hashes the same as the stored copy are left alone, so
+    refreshing an unchanged library writes nothing.
+
+    Args:
+        article_ids: Article IDs to refresh, or None for the whole library
+        progress: Optional callable(done, total) invoked as articles complete
+
+    Returns:
+        List of per-article result dicts with id, title, status ('updated',
+        'unchanged' or 'error'), message and the current revision number
+    """
+    if article_ids is not None:
+        article_ids = list(dict.fromkeys(article_ids))
+    titles = database.get_article_titles(article_ids)
+    ids_by_title = {title: article_id for article_id, title in titles.items()}
+
+    results = {}
+    if article_ids is not None:
+        for article_id in article_ids:
+            if article_id not in titles:
+                results[article_id] = {"id": article_id, "title": None, "status": "error",
+                                       "message": "Article not found"}
+
+    total = len(titles)
+    done = 0
+    if progress:
+        progress(done, total)
+
+    for title, page, error in fetcher.fetch_many(list(ids_by_title)):
+        article_id = ids_by_title[title]
+        result = {"id": article_id, "title": title}
+        if error is not None:
+            result.update(status="error", message=fetch_error_message(title, error))
+        else:
+            try:
+                stored = database.update_article_content(article_id, page['content'], page['url'])
+            except ValueError as e:
+                stored = {"status": "error", "message": str(e)}
+            if stored is None:
+                # Deleted while its page was being fetched
+                stored = {"status": "error", "message": "Article not found"}
+            result.update(stored)
+            result['id'] = article_id
+            if stored['status'] == 'updated':
+                result['message'] = f"Stored as revision {stored['revision']}"
+            elif stored['status'] == 'unchanged':
+                result['message'] = "Unchanged since the last fetch"
+        results[article_id] = result
+
+        done += 1
+        if progress:
+            progress(done, total)
+
+    order = article_ids if article_ids is not None else list(titles)
+    return [results[article_id] for article_id in order]
+
+def scan_migration_dir(save_dir):
+    """
+    List legacy .txt files with os.scandir, without opening them.
+
+    Yields:
+        Tuples of (file name, absolute path, mtime, size)
+    """
+    if not os.path.isdir(save_dir):
+        return
+    with os.scandir(save_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith('.txt') and entry.is_file():
+                stat = entry.stat()
+                yield entry.name, os.path.abspath(entry.path), stat.st_mtime, stat.st_size
+
+def title_from_filename(file_name):
+    """Guess an article title from a legacy file name (reverses the underscore replacement)."""
+    return file_name.replace('.txt', '').replace('_', ' ')
+
+def parse_migration_file(file_name, file_path):
+    """
+    Parse one legacy .txt file ("Title: X" header, blank line, content).
+
+    The header is read line by line, so malformed files are rejected without
+    reading the whole body.
+
+    Returns:
+        Dict with file, path, mtime, size and either title/content or an
+        error message
+    """
+    parsed = {"file": file_name, "path": file_path}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            stat = os.fstat(f.fileno())
+            parsed["mtime"] = stat.st_mtime
+            parsed["size"] = stat.st_size
+
+            # Parse content: First line should be "Title: X"
+            first_line = f.readline()
+            if not first_line.startswith("Title: "):
+                parsed["error"] = "File malformed (no Title: line)"
+                return parsed
+
+            # Header runs until the first blank line
+            header = [first_line]
+            for line in f:
+                if line == '\n':
+                    break
+                header.append(line)
+            else:
+                parsed["error"] = "File malformed (no content after title)"
+                return parsed
+
+            # Extract title and content
+            title = ''.join(header).rstrip('\n').replace("Title: ", "").strip()
+            article_content = f.read().strip()
+    except FileNotFoundError:
+        parsed["error"] = "File not found"
+        return parsed
+    except PermissionError:
+        parsed["error"] = "File read permission error"
+        return parsed
+    except Exception as e:
+        parsed["error"] = f"Error: {str(e)}"
+        return parsed
+
+    if not title:
+        parsed["error"] = "Title is empty"
+    elif len(article_content) < 10:
+        parsed["error"] = "Content too short"
+    else:
+        parsed["title"] = title
+        parsed["content"] = article_content
+    return parsed
+
+def _parse_batch(batch):
+    return [parse_migration_file(file_name, file_path) for file_name, file_path in batch]
+
+def _iter_parsed_batches(files, workers, batch_size):
+    """Parse files in batches, in a process pool when there is enough work."""
+    batches = [files[i:i + batch_size] for i in range(0, len(files), batch_size)]
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            yield _parse_batch(batch)
+        return
+
+    # spawn, not fork: this may run on a job thread inside a threaded server
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(executor.submit(_parse_batch, batch))
+            # Bounded read-ahead keeps memory flat on huge directories
+            if len(in_flight) > workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+def migrate_files(files, save_dir, delete_after=False, progress=None, workers=None, batch_size=None):
+    """
+    Import legacy .txt files in bulk.
+
+    Files are parsed in a process pool and inserted in one transaction per
+    batch. Every imported file is recorded by path, mtime and size in the
+    migration manifest, which /migration-status consults instead of
+    scanning every title.
+
+    Args:
+        files: List of file names inside save_dir
+        save_dir: Directory holding the files
+        delete_after: Remove each file after a successful import
+        progress: Optional callable(done, total)
+        workers: Parser processes (default MIGRATION_WORKERS)
+        batch_size: Files per parse batch and insert transaction (default MIGRATION_BATCH_SIZE)
+
+    Returns:
+        Dictionary with per-file results, success_count and total_count
+    """
+    workers = workers or MIGRATION_WORKERS
+    batch_size = batch_size or MIGRATION_BATCH_SIZE
+    paths = [(file_name, os.path.join(save_dir, file_name)) for file_name in files]
+
+    results = []
+    for parsed_batch in _iter_parsed_batches(paths, workers, batch_size):
+        valid = [p for p in parsed_batch if "error" not in p]
+        stored = database.insert_articles_bulk([{
+            "title": p["title"],
+            "content": p["content"],
+            "url": f"https://en.wikipedia.org/wiki/{p['title'].replace(' ', '_')}"
+        } for p in valid])
+
+        manifest = []
+        outcome = iter(stored)
+        for parsed in parsed_batch:
+            result = {"file": parsed["file"], "status": "error"}
+            if "error" in parsed:
+                result["message"] = parsed["error"]
+                results.append(result)
+                continue
+
+            insert = next(outcome)
+            if insert["status"] == "inserted":
+                result["status"] = "success"
+                result["message"] = f"Imported successfully (ID: {insert['article_id']})"
+                result["article_id"] = insert["article_id"]
+            elif insert["status"] == "duplicate":
+                result["status"] = "success"
+                result["message"] = insert["message"]
+                result["article_id"] = insert["article_id"]
+            elif insert["status"] == "exists":
+                result["message"] = "Article already exists in database"
+            else:
+                result["message"] = insert["message"]
+
+            if insert["article_id"] is not None:
+                manifest.append((os.path.abspath(parsed["path"]), parsed["mtime"], parsed["size"],
+                                 insert["article_id"]))
+            results.append(result)
+
+        database.record_migrated_files(manifest)
+
+        # Delete files only once their articles are committed
+        if delete_after:
+            for result in results[-len(parsed_batch):]:
+                if result["status"] == "success":
+                    try:
+                        os.remove(os.path.join(save_dir, result["file"]))
+                        result["message"] += " and file deleted"
+                    except OSError as e:
+                        logging.error(f"Could not delete {result['file']}: {e}")
+
+        if progress:
+            progress(len(results), len(paths))
+
+    success_count = sum(1 for r in results if r['status'] == 'success')
+    return {
+        "results": results,
+        "success_count": success_count,
+        "total_count": len(results)
+    }
+
+def get_migration_status(save_dir):
+    """
+    Split legacy files into migrated and unmigrated.
+
+    A file counts as migrated when the manifest has it with the same mtime
+    and size, or (for files imported before the manifest existed) when an
+    article with the title implied by its file name exists. Both are indexed
+    lookups; no full scan of article titles is needed.
+
+    Returns:
+        Dictionary with unmigrated and migrated file names and totals
+    """
+    files = list(scan_migration_dir(save_dir))
+    manifest = database.get_migration_manifest([path for _, path, _, _ in files])
+
+    migrated = []
+    unknown = []
+    for file_name, path, mtime, size in files:
+        entry = manifest.get(path)
+        if entry and entry["mtime"] == mtime and entry["size"] == size:
+            migrated.append(file_name)
+        else:
+            unknown.append(file_name)
+
+    existing = database.get_article_ids_by_title([title_from_filename(f) for f in unknown])
+    unmigrated = []
+    for file_name in unknown:
+        if title_from_filename(file_name) in existing:
+            migrated.append(file_name)
+        else:
+            unmigrated.append(file_name)
+
+    return {
+        "unmigrated": sorted(unmigrated),
+        "migrated": sorted(migrated),
+        "total_txt_files": len(files),
+        "total_db_articles": database.count_articles()
+    }
@@ -0,0 +1,299 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import database
+
+# Job worker configuration (all overridable through environment variables)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 1))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 2))
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', 10))
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', 60))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+class JobCancelled(Exception):
+    """Raised inside a handler when cancellation of its job was requested."""
+
+_handlers = {}
+_wakeup = threading.Event()
+_running = {}
+_running_lock = threading.Lock()
+_started_pid = None
+
+def register(kind, handler):
+    """
+    Register the handler for a job kind.
+
+    The handler is called as handler(params, progress) and returns a
+    JSON-serializable result. progress(done, total) records progress and
+    raises JobCancelled once cancellation has been requested.
+
+    Handlers must be safe to re-run: a job whose worker died is requeued
+    and starts again from the beginning.
+    """
+    _handlers[kind] = handler
+
+def submit(kind, params=None):
+    """
+    Queue a job.
+
+    Args:
+        kind: Registered job kind
+        params: JSON-serializable parameters for the handler
+
+    Returns:
+        New job ID
+
+    Raises:
+        ValueError: If no handler is registered for kind
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('INSERT INTO jobs (kind, params) VALUES (?, ?)', (kind, json.dumps(params or {})))
+        conn.commit()
+        job_id = cursor.lastrowid
+    finally:
+        conn.close()
+
+    _wakeup.set()
+    return job_id
+
+def get_job(job_id):
+    """
+    Get a job with its progress and result.
+
+    Returns:
+        Dictionary with job data, or None if not found
+    """
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    return _job_to_dict(row) if row else None
+
+def list_jobs(limit=50, status=None):
+    """List recent jobs (without their results), newest first."""
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if status:
+            cursor.execute('SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?', (status, limit))
+        else:
+            cursor.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,))
+        jobs = [_job_to_dict(row, include_result=False) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    return jobs
+
+def cancel_job(job_id):
+    """
+    Request cancellation of a job.
+
+    Queued jobs are cancelled immediately; running jobs stop at their next
+    progress report.
+
+    Returns:
+        True if the job exists and was not already finished
+    """
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE jobs
+            SET status = CASE WHEN status = ? THEN ? ELSE status END,
+                finished_date = CASE WHEN status = ? THEN CURRENT_TIMESTAMP ELSE finished_date END,
+                cancel_requested = 1
+            WHERE id = ? AND status IN (?, ?)
+        ''', (QUEUED, CANCELLED, QUEUED, job_id, QUEUED, RUNNING))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+def _job_to_dict(row, include_result=True):
+    job = dict(row)
+    job['params'] = json.loads(job['params']) if job['params'] else {}
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    if include_result:
+        job['result'] = json.loads(job['result']) if job['result'] else None
+    else:
+        del job['result']
+    return job
+
+def _worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+def _requeue_stale_jobs(cursor):
+    """Hand jobs whose worker stopped heart-beating back to the queue."""
+    cursor.execute('''
+        UPDATE jobs
+        SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+            error = CASE WHEN attempts >= ? THEN 'Worker died too many times' ELSE error END,
+            worker = NULL
+        WHERE status = ?
+          AND heartbeat_date < datetime('now', ?)
+    ''', (JOB_MAX_ATTEMPTS, FAILED, QUEUED, JOB_MAX_ATTEMPTS, RUNNING, f'-{int(JOB_STALE_SECONDS)} seconds'))
+
+def _claim_next_job():
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        # Take the write lock up front so two workers cannot claim the same job
+        cursor.execute('BEGIN IMMEDIATE')
+        _requeue_stale_jobs(cursor)
+        cursor.execute('SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1', (QUEUED,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        cursor.execute('''
+            UPDATE jobs
+            SET status = ?, worker = ?, attempts = attempts + 1,
+                started_date = CURRENT_TIMESTAMP, heartbeat_date = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (RUNNING, _worker_name(), row['id']))
+        conn.commit()
+        return _job_to_dict(row)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _finish_job(job_id, status, result=None, error=None):
+    conn = database.get_db_connection()
+    try:
+        conn.execute('''
+            UPDATE jobs
+            SET status = ?, result = ?, error = ?, finished_date = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = ?
+        ''', (status, json.dumps(result) if result is not None else None, error, job_id, RUNNING))
+        conn.commit()
+    finally:
+        conn.close()
+
+def _make_progress(job_id, min_interval=0.5):
+    state = {"last": 0.0}
+
+    def progress(done, total=None):
+        now = time.monotonic()
+        # Throttle writes; always record the final step
+        if now - state["last"] < min_interval and done != total:
+            return
+        state["last"] = now
+
+        conn = database.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE jobs
+                SET progress_done = ?, progress_total = COALESCE(?, progress_total),
+                    heartbeat_date = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (done, total, job_id))
+            cursor.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,))
+            cancelled = cursor.fetchone()['cancel_requested']
+            conn.commit()
+        finally:
+            conn.close()
+
+        if cancelled:
+            raise JobCancelled()
+
+    return progress
+
+def run_job(job):
+    """Run a claimed job to completion and record its outcome."""
+    handler = _handlers.get(job['kind'])
+    if handler is None:
+        _finish_job(job['id'], FAILED, error=f"Unknown job kind: {job['kind']}")
+        return
+
+    with _running_lock:
+        _running[job['id']] = threading.get_ident()
+    try:
+        result = handler(job['params'], _make_progress(job['id']))
+        _finish_job(job['id'], SUCCEEDED, result=result)
+    except JobCancelled:
+        _finish_job(job['id'], CANCELLED, error="Cancelled")
+    except Exception as e:
+        logging.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+        _finish_job(job['id'], FAILED, error=str(e))
+    finally:
+        with _running_lock:
+            _running.pop(job['id'], None)
+
+def _worker_loop():
+    while True:
+        try:
+            job = _claim_next_job()
+        except Exception as e:
+            logging.error(f"Job worker error: {e}")
+            job = None
+
+        if job is None:
+            _wakeup.wait(JOB_POLL_SECONDS)
+            _wakeup.clear()
+            continue
+
+        run_job(job)
+
+def _heartbeat_loop():
+    while True:
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+        with _running_lock:
+            job_ids = list(_running)
+        if not job_ids:
+            continue
+        try:
+            placeholders = ','.join('?' * len(job_ids))
+            conn = database.get_db_connection()
+            try:
+                conn.execute(f'UPDATE jobs SET heartbeat_date = CURRENT_TIMESTAMP WHERE id IN ({placeholders})',
+                             job_ids)
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error(f"Job heartbeat error: {e}")
+
+def start_workers(count=None):
+    """
+    Start background worker threads for this process (once per process).
+
+    Queued jobs left over from a previous run are picked up as soon as the
+    workers start; jobs left 'running' by a dead process are requeued once
+    their heartbeat goes stale.
+    """
+    global _started_pid
+    if _started_pid == os.getpid():
+        return
+    # Helper processes (e.g. the migration parser pool) re-import the app; they must not claim jobs
+    if multiprocessing.parent_process() is not None:
+        return
+    _started_pid = os.getpid()
+
+    count = JOB_WORKERS if count is None else count
+    if count <= 0:
+        return
+    for i in range(count):
+        threading.Thread(target=_worker_loop, name=f'job-worker-{i}', daemon=True).start()
+    threading.Thread(target=_heartbeat_loop, name='job-heartbeat', daemon=True).start()
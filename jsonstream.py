@@ -0,0 +1,73 @@
+import json
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Compact, unsorted output (Flask's jsonify sorts keys and escapes non-ASCII)
+_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+def dumps(value):
+    """Encode a value as compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _encoder.encode(value).encode('utf-8')
+
+def encode_rows(columns, rows):
+    """
+    Encode row tuples as comma-separated JSON objects (no enclosing brackets).
+
+    Args:
+        columns: Column names, in row order
+        rows: Sequence of value tuples
+
+    Returns:
+        UTF-8 bytes, empty when there are no rows
+    """
+    if not rows:
+        return b''
+    return dumps([dict(zip(columns, row)) for row in rows])[1:-1]
+
+def stream_list(key, batches, tail=None):
+    """
+    Yield a JSON object {key: [rows...], "count": n, **tail()} in pieces.
+
+    Args:
+        key: Name of the array member
+        batches: Iterable of (columns, row tuples) batches
+        tail: Optional callable returning more members, called after the
+            last batch (for values that depend on the rows, like a cursor)
+    """
+    yield b'{' + dumps(key) + b':['
+    count = 0
+    for columns, rows in batches:
+        if not rows:
+            continue
+        yield (b',' if count else b'') + encode_rows(columns, rows)
+        count += len(rows)
+    members = {"count": count, **(tail() if tail else {})}
+    yield b'],' + dumps(members)[1:]
+
+def list_response(key, batches, tail=None):
+    """
+    Return a chunked application/json response streaming a list of rows.
+
+    The first batch is read before the response is returned, so a query
+    that fails does so inside the route's error handling rather than
+    halfway through the body. Peak memory is one batch.
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is not None:
+        batches = _chain(first, batches)
+    return Response(stream_list(key, batches, tail), mimetype='application/json')
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+def json_response(value, status=200):
+    """Return a (non-streamed) application/json response using the fast encoder."""
+    return Response(dumps(value), status=status, mimetype='application/json')
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import threading
+import time
+import database
+import fetcher
+
+# Lookup cache configuration (all overridable through environment variables)
+LOOKUP_CACHE = os.getenv('LOOKUP_CACHE', '1') == '1'
+# Seconds an answer is trusted. Saved pages are still served after that,
+# while a background fetch revalidates them; expired misses and
+# disambiguations are asked upstream again.
+LOOKUP_TTL_PAGE = float(os.getenv('LOOKUP_TTL_PAGE', 24 * 3600))
+LOOKUP_TTL_DISAMBIGUATION = float(os.getenv('LOOKUP_TTL_DISAMBIGUATION', 24 * 3600))
+LOOKUP_TTL_MISSING = float(os.getenv('LOOKUP_TTL_MISSING', 3600))
+
+# Entry kinds
+PAGE = 'page'
+DISAMBIGUATION = 'disambiguation'
+MISSING = 'missing'
+
+TTLS = {PAGE: LOOKUP_TTL_PAGE, DISAMBIGUATION: LOOKUP_TTL_DISAMBIGUATION, MISSING: LOOKUP_TTL_MISSING}
+
+# Expired misses and disambiguations are pruned every this many writes
+PRUNE_EVERY = 100
+
+_writes = 0
+_writes_lock = threading.Lock()
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+_stats_lock = threading.Lock()
+stats = {"hits": 0, "stale_hits": 0, "misses": 0, "revalidations": 0}
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+def query_key(query):
+    """Normalize a query the way the cache stores it (see fetcher.normalize_title)."""
+    return fetcher.normalize_title(query)
+
+def get_entry(query):
+    """
+    Read the cached answer for a query.
+
+    Returns:
+        Dictionary with query, kind, title, options, checked_at and fresh,
+        or None if the query has not been looked up
+    """
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM lookup_cache WHERE query = ?', (query_key(query),))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    entry = dict(row)
+    entry['options'] = json.loads(entry['options']) if entry['options'] else []
+    entry['fresh'] = time.time() - entry['checked_at'] < TTLS.get(entry['kind'], 0)
+    return entry
+
+def _store(query, kind, title, options=None):
+    _store_many([(query, kind, title, options)])
+
+def _store_many(entries):
+    global _writes
+    now = time.time()
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            INSERT OR REPLACE INTO lookup_cache (query, kind, title, options, checked_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(query_key(query), kind, title, json.dumps(options) if options else None, now)
+              for query, kind, title, options in entries])
+        with _writes_lock:
+            prune = (_writes + len(entries)) // PRUNE_EVERY > _writes // PRUNE_EVERY
+            _writes += len(entries)
+        if prune:
+            # Negative answers are never served once expired, so drop them
+            cursor.execute('DELETE FROM lookup_cache WHERE kind = ? AND checked_at < ?',
+                           (MISSING, now - LOOKUP_TTL_MISSING))
+            cursor.execute('DELETE FROM lookup_cache WHERE kind = ? AND checked_at < ?',
+                           (DISAMBIGUATION, now - LOOKUP_TTL_DISAMBIGUATION))
+        conn.commit()
+    finally:
+        conn.close()
+
+def record_page(query, page):
+    """Remember that a query resolved to a page (page['title'] is the redirect target, if any)."""
+    if LOOKUP_CACHE:
+        _store(query, PAGE, page['title'])
+
+def record_pages(resolved):
+    """Remember many (query, page) pairs at once, in one transaction (see record_page)."""
+    if LOOKUP_CACHE and resolved:
+        _store_many([(query, PAGE, page['title'], None) for query, page in resolved])
+
+def record_error(query, error):
+    """Remember a DisambiguationError or PageError for a query; other errors are not cached."""
+    if not LOOKUP_CACHE:
+        return
+    if isinstance(error, fetcher.DisambiguationError):
+        _store(query, DISAMBIGUATION, error.title, error.options)
+    elif isinstance(error, fetcher.PageError):
+        _store(query, MISSING, None)
+
+def lookup(query):
+    """
+    Answer a query from the cache and the saved articles, without going upstream.
+
+    A query matching a saved title (or alias) is answered locally even
+    before it has been cached; such answers and expired page entries are
+    returned as stale, and the caller should revalidate them.
+
+    Returns:
+        Dictionary with kind, title, options, redirected (whether the query
+        resolved to another title), article_id (saved pages only) and stale,
+        or None when the query has to be fetched
+    """
+    if not LOOKUP_CACHE:
+        return None
+    key = query_key(query)
+    if not key:
+        return None
+
+    entry = get_entry(key)
+    if entry is None:
+        article_id = database.get_article_ids_by_title([key]).get(key)
+        if article_id is None:
+            _count("misses")
+            return None
+        entry = {"kind": PAGE, "title": key, "options": [], "fresh": False}
+    elif entry['kind'] == PAGE:
+        article_id = database.get_article_ids_by_title([entry['title']]).get(entry['title'])
+        if article_id is None:
+            # Resolved before, but not saved (or deleted since): fetch it
+            _count("misses")
+            return None
+    elif not entry['fresh']:
+        _count("misses")
+        return None
+    else:
+        article_id = None
+
+    _count("hits" if entry['fresh'] else "stale_hits")
+    return {
+        "kind": entry['kind'],
+        "title": entry['title'],
+        "options": entry['options'],
+        "redirected": entry['title'] is not None and entry['title'] != key,
+        "article_id": article_id,
+        "stale": not entry['fresh']
+    }
+
+def resolved_titles(queries, chunk_size=500):
+    """
+    Read the page titles many queries resolved to, without going upstream.
+
+    Unlike lookup, page answers of any age are returned and nothing is
+    counted: this only maps requested titles to the titles they were saved
+    under (the redirect target, if any).
+
+    Args:
+        queries: Iterable of queries (normalized like the cache keys)
+
+    Returns:
+        Dictionary of query key -> resolved title for the cached page answers
+    """
+    if not LOOKUP_CACHE:
+        return {}
+    keys = list(dict.fromkeys(query_key(query) for query in queries))
+    found = {}
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT query, title FROM lookup_cache WHERE kind = ? AND query IN ({placeholders})',
+                           [PAGE] + chunk)
+            found.update((row['query'], row['title']) for row in cursor.fetchall())
+    finally:
+        conn.close()
+    return found
+
+def revalidate(query):
+    """
+    Refetch a query in the background and update the cache and the saved article.
+
+    A changed page is stored as a new revision of the article saved under
+    the page's title. Alias titles only share another article's text, so
+    their answers are refreshed in the cache but never written onto that
+    article. Concurrent revalidations of one query share a single fetch.
+    """
+    key = query_key(query)
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+    _count("revalidations")
+
+    def done(future):
+        try:
+            error = future.exception()
+            if error is not None:
+                if isinstance(error, (fetcher.DisambiguationError, fetcher.PageError)):
+                    record_error(key, error)
+                else:
+                    logging.warning(f"Revalidating '{key}' failed: {error}")
+                return
+            page = future.result()
+            record_page(key, page)
+            article_id = database.get_article_ids_by_title([page['title']], aliases=False).get(page['title'])
+            if article_id is not None:
+                database.update_article_content(article_id, page['content'], page['url'])
+        except Exception as e:
+            logging.error(f"Revalidating '{key}' failed: {e}")
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    fetcher.submit(key).add_done_callback(done)
+
+def get_stats():
+    """Return cache hit/miss counters and the number of cached queries by kind."""
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT kind, COUNT(*) as count FROM lookup_cache GROUP BY kind')
+        entries = {row['kind']: row['count'] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    with _stats_lock:
+        return dict(stats, enabled=LOOKUP_CACHE, entries=entries)
@@ -0,0 +1,253 @@
+import bisect
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import threading
+import time
+from flask import g, request, Response
+
+# Metrics and profiling configuration (all overridable through environment variables)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+# Per-request profiling (?profile=1 or an X-Profile: 1 header) is off unless enabled here
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', '0') == '1'
+PROFILE_TOP_FUNCTIONS = int(os.getenv('PROFILE_TOP_FUNCTIONS', 40))
+
+# Histogram bucket upper bounds in seconds (and in calls for per-request counts)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FETCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+class Histogram:
+    """
+    Thread-safe Prometheus histogram with fixed buckets and label values.
+
+    observe() only finds the bucket and bumps one counter under a lock;
+    cumulative bucket counts are computed when the histogram is rendered.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, counts[:], total) for labels, (counts, total) in sorted(self._series.items())]
+        for label_values, counts, total in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values))
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REQUEST_SECONDS = Histogram('wikifetch_http_request_duration_seconds',
+                            'Time spent handling HTTP requests, by route template.',
+                            ('method', 'route', 'status'), LATENCY_BUCKETS)
+REQUEST_DB_CALLS = Histogram('wikifetch_http_request_db_calls',
+                             'database.* calls made while handling one HTTP request.',
+                             ('method', 'route'), COUNT_BUCKETS)
+DB_CALL_SECONDS = Histogram('wikifetch_db_call_duration_seconds',
+                            'Time spent in database.* functions (nested calls are counted in each).',
+                            ('function',), LATENCY_BUCKETS)
+FETCH_SECONDS = Histogram('wikifetch_wikipedia_fetch_duration_seconds',
+                          'Time spent fetching one page from Wikipedia, including retries.',
+                          ('outcome',), FETCH_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_DB_CALLS, DB_CALL_SECONDS, FETCH_SECONDS)
+
+# Names in a function's code that mark it as database work for
+# instrument_module: it opens a connection, or reads rows through one of
+# database's batch readers
+DB_WORK_MARKERS = ('get_db_connection', '_stream_rows', '_fetch_article_batch')
+
+# Callables returning [(name, type, help, value)] sampled when /metrics is rendered
+_collectors = []
+
+# Per-thread request state: the database call counter of the request in progress
+_local = threading.local()
+
+def register_collector(collect):
+    """Add a callable returning (name, 'counter' or 'gauge', help, value) tuples for /metrics."""
+    _collectors.append(collect)
+
+def timed(name, histogram=None):
+    """
+    Decorate a function to record its duration (and count it towards the current request).
+
+    A function that returns a generator does its work while the generator
+    is consumed (often while a response streams), so the time spent inside
+    the generator is added and recorded once it is exhausted or closed.
+    """
+    histogram = histogram or DB_CALL_SECONDS
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return func(*args, **kwargs)
+            calls = getattr(_local, 'db_calls', None)
+            if calls is not None:
+                _local.db_calls = calls + 1
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                histogram.observe(time.perf_counter() - start, name)
+                raise
+            if inspect.isgenerator(result):
+                return _timed_generator(result, time.perf_counter() - start, name, histogram)
+            histogram.observe(time.perf_counter() - start, name)
+            return result
+        return wrapper
+    return decorator
+
+def _timed_generator(generator, elapsed, name, histogram):
+    """Yield from generator, recording the time spent inside it (not in the consumer) when it is done."""
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        start = time.perf_counter()
+        generator.close()
+        histogram.observe(elapsed + time.perf_counter() - start, name)
+
+def instrument_module(module):
+    """
+    Time every public function of a module that opens a database connection.
+
+    Module attributes are replaced in place, so calls through the module
+    (database.get_stats()) and calls between its own functions are both
+    timed. Functions returning generators (database.iter_articles and the
+    stream_* readers) are timed while the generator is consumed.
+    """
+    for name, func in list(vars(module).items()):
+        if name.startswith('_') or not inspect.isfunction(func) or func.__module__ != module.__name__:
+            continue
+        inner = inspect.unwrap(func)
+        if not any(marker in inner.__code__.co_names for marker in DB_WORK_MARKERS):
+            continue
+        setattr(module, name, timed(name)(func))
+
+def observe_fetch(seconds, outcome):
+    """Record one upstream Wikipedia fetch ('ok', 'missing', 'disambiguation' or 'error')."""
+    if METRICS_ENABLED:
+        FETCH_SECONDS.observe(seconds, outcome)
+
+def _profiling_requested():
+    return PROFILE_REQUESTS and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1')
+
+def start_request():
+    """before_request hook: start the request timer (and the profiler, if asked for)."""
+    g.metrics_start = time.perf_counter()
+    _local.db_calls = 0
+    if _profiling_requested():
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+def record_request(response):
+    """
+    after_request hook: record the request's duration and database call count.
+
+    They are recorded when the response is closed, after a streamed body
+    has been sent, so the time and database calls spent generating it
+    count. The server closes the response in the thread that handled it.
+    """
+    start = g.pop('metrics_start', None)
+    if start is None or not METRICS_ENABLED:
+        _local.db_calls = None
+        return response
+    method = request.method
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = response.status_code
+
+    def record():
+        calls = getattr(_local, 'db_calls', None)
+        _local.db_calls = None
+        REQUEST_SECONDS.observe(time.perf_counter() - start, method, route, status)
+        if calls is not None:
+            REQUEST_DB_CALLS.observe(calls, method, route)
+
+    response.call_on_close(record)
+    return response
+
+def profile_response(response):
+    """
+    after_request hook: replace a profiled response with its cProfile summary.
+
+    The summary lists the PROFILE_TOP_FUNCTIONS slowest functions by
+    cumulative time. The original status is kept in X-Profiled-Status.
+    """
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    out = io.StringIO()
+    out.write(f'{request.method} {request.full_path} -> {response.status_code}\n\n')
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    profiled = Response(out.getvalue(), mimetype='text/plain')
+    profiled.headers['X-Profiled-Status'] = str(response.status_code)
+    profiled.headers['Cache-Control'] = 'no-store'
+    return profiled
+
+def init_app(app):
+    """
+    Register the timing hooks on a Flask app.
+
+    Call this before registering other after_request hooks (such as
+    response compression): Flask runs them in reverse order, so the
+    recorded time then includes them.
+    """
+    app.before_request(start_request)
+    app.after_request(record_request)
+
+def render():
+    """Render every histogram and collector in the Prometheus text exposition format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for collect in _collectors:
+        for name, metric_type, help_text, value in collect():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+def reset():
+    """Drop every recorded observation."""
+    for histogram in HISTOGRAMS:
+        histogram.reset()
@@ -0,0 +1,72 @@
+"""
+Sharded storage: inspect the layout and change the number of shards.
+
+Articles can be hash-partitioned over several SQLite files: DATABASE_PATH
+is shard 0 (it also holds jobs and the lookup cache) and shard k sits
+beside it (wikifetch-1.db, wikifetch-2.db, ...). An article lives on shard
+(id % 1024) % shards. A new library gets DATABASE_SHARDS shards; an
+existing one keeps its layout until it is rebalanced here.
+
+Rebalancing moves articles between files and must run while the app is
+stopped. If it is interrupted the app refuses to start until the same
+rebalance is run again, which picks up where it left off.
+
+Usage:
+    python -m shards status
+    python -m shards rebalance 4 [--batch-size 500]
+"""
+import argparse
+import json
+import os
+import sys
+import database
+
+def status():
+    """
+    Describe the library's shard layout and files.
+
+    Returns:
+        Dictionary with shards, target (differs while a rebalance is
+        unfinished), buckets and per-file path, articles and bytes
+    """
+    layout = database.read_shard_layout(database.DB_PATH)
+    shards = layout['shards'] if layout else 1
+    target = layout['target'] if layout else shards
+    files = []
+    for shard in range(max(shards, target)):
+        path = database.shard_path(shard)
+        entry = {"shard": shard, "path": path, "articles": None, "bytes": None}
+        if os.path.exists(path):
+            with database.on_shard(shard):
+                entry["articles"] = database.count_articles()
+            entry["bytes"] = sum(os.path.getsize(path + suffix) for suffix in ('', '-wal')
+                                 if os.path.exists(path + suffix))
+        files.append(entry)
+    return {"shards": shards, "target": target, "buckets": layout['buckets'] if layout else database.SHARD_BUCKETS,
+            "files": files}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='show the layout and the articles in each shard')
+    rebalance_parser = commands.add_parser('rebalance', help='change the number of shards (app stopped)')
+    rebalance_parser.add_argument('shards', type=int, help=f'new number of shards (1 to {database.SHARD_BUCKETS})')
+    rebalance_parser.add_argument('--batch-size', type=int, default=500, help='articles moved per transaction')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        print(json.dumps(status(), indent=2))
+        return
+
+    def progress(moved, total):
+        print(f'\r{moved} articles moved', end='', file=sys.stderr, flush=True)
+
+    try:
+        result = database.rebalance_shards(args.shards, batch_size=args.batch_size, progress=progress)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Rebalance failed: {e}")
+    print(file=sys.stderr)
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Database snapshots for read-only replicas.
+
+The primary (the one writable node) copies its database into a snapshot
+with SQLite's online backup API; read nodes run with DATABASE_READ_ONLY=1
+and DATABASE_PATH pointing at an installed snapshot. A snapshot is
+installed by downloading or copying it next to the current one, checking
+it, and renaming it into place, so requests in flight on a replica finish
+on the old file and later ones read the new one.
+
+A sharded library (see shards.py) is snapshotted file by file, next to
+each other like the library's own (wikifetch.db, wikifetch-1.db, ...).
+Each file is consistent on its own, not as of one instant across files;
+shard 0 is published last, and a replica switches once any file changed.
+
+Usage:
+    python -m snapshot create /srv/snapshots/wikifetch.db
+    python -m snapshot install http://primary:5000/api/snapshot ./data/wikifetch.db [--every 300]
+    python -m snapshot install /srv/snapshots/wikifetch.db ./data/wikifetch.db
+"""
+import argparse
+import filecmp
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import urllib.request
+import database
+
+# Seconds to wait on the primary when downloading a snapshot
+SNAPSHOT_TIMEOUT = float(os.getenv('SNAPSHOT_TIMEOUT', 300))
+
+def _temp_path(path):
+    """Create an empty temporary file in path's directory (so it can be renamed over path)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', suffix='.db', dir=directory)
+    os.close(fd)
+    return tmp_path
+
+def _publish(tmp_path, path):
+    """Sync tmp_path and atomically rename it over path."""
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Make the rename itself durable (directories cannot be synced everywhere)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def create(path):
+    """
+    Write a snapshot of the database to path, replacing any previous one.
+
+    Args:
+        path: Destination file (shard k of a sharded library goes to
+              database.shard_path(k, path))
+
+    Returns:
+        Dictionary with path, bytes, articles and shards
+    """
+    shards = database.shard_count()
+    tmp_paths = {}
+    try:
+        articles = 0
+        for shard in range(shards):
+            tmp_paths[shard] = _temp_path(database.shard_path(shard, path))
+            with database.on_shard(shard):
+                articles += database.backup_database(tmp_paths[shard])
+        # Shard 0 last: it holds the layout a replica reads first
+        for shard in reversed(range(shards)):
+            _publish(tmp_paths.pop(shard), database.shard_path(shard, path))
+    except BaseException:
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+    size = sum(os.path.getsize(database.shard_path(shard, path)) for shard in range(shards))
+    return {"path": path, "bytes": size, "articles": articles, "shards": shards}
+
+def verify(path):
+    """
+    Check that path is an intact WikiFetch database.
+
+    Returns:
+        Number of articles in it
+
+    Raises:
+        ValueError: The file is damaged or not a WikiFetch database
+    """
+    conn = sqlite3.connect(database.read_only_uri(path, immutable=True), uri=True)
+    try:
+        result = conn.execute('PRAGMA quick_check').fetchone()[0]
+        if result != 'ok':
+            raise ValueError(f"Snapshot is damaged: {result}")
+        return conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"Not a WikiFetch database: {e}") from e
+    finally:
+        conn.close()
+
+def install(source, path):
+    """
+    Install a snapshot at path (a replica's DATABASE_PATH).
+
+    The snapshot is downloaded (http:// or https:// source, e.g. the
+    /api/snapshot of a primary run with SNAPSHOT_ENDPOINT=1) or copied to
+    a temporary file beside path and verified before it replaces path. A
+    snapshot identical to the installed one is dropped, so replicas keep
+    their caches. For a sharded library every shard file is fetched and
+    verified before any is replaced.
+
+    Args:
+        source: URL or file path of the snapshot
+        path: Destination file
+
+    Returns:
+        Dictionary with path, bytes, articles, shards and installed (False if unchanged)
+
+    Raises:
+        ValueError: The snapshot is damaged or not a WikiFetch database
+    """
+    tmp_paths = {}
+    try:
+        tmp_paths[0] = _fetch(source, path)
+        layout = database.read_shard_layout(tmp_paths[0])
+        shards = layout['shards'] if layout else 1
+        for shard in range(1, shards):
+            tmp_paths[shard] = _fetch(_shard_source(source, shard), database.shard_path(shard, path))
+
+        articles = sum(verify(tmp_path) for tmp_path in tmp_paths.values())
+        size = sum(os.path.getsize(tmp_path) for tmp_path in tmp_paths.values())
+        changed = [shard for shard, tmp_path in tmp_paths.items()
+                   if not os.path.exists(database.shard_path(shard, path))
+                   or not filecmp.cmp(tmp_path, database.shard_path(shard, path), shallow=False)]
+        # Shard 0 last: it holds the layout a replica reads first
+        for shard in sorted(changed, reverse=True):
+            _publish(tmp_paths.pop(shard), database.shard_path(shard, path))
+    finally:
+        for tmp_path in tmp_paths.values():
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return {"path": path, "bytes": size, "articles": articles, "shards": shards, "installed": bool(changed)}
+
+def _fetch(source, path):
+    """Download or copy source into a new temporary file beside path and return the temporary file."""
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, 'wb') as out:
+            if source.startswith(('http://', 'https://')):
+                with urllib.request.urlopen(source, timeout=SNAPSHOT_TIMEOUT) as response:
+                    shutil.copyfileobj(response, out, 1024 * 1024)
+            else:
+                with open(source, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+def _shard_source(source, shard):
+    """Return where shard k of a snapshot comes from: ?shard=k on a URL, the shard's file beside a file."""
+    if source.startswith(('http://', 'https://')):
+        return f"{source}{'&' if '?' in source else '?'}shard={shard}"
+    return database.shard_path(shard, source)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    create_parser = commands.add_parser('create', help='snapshot this database (DATABASE_PATH)')
+    create_parser.add_argument('path', help='snapshot file to write')
+    install_parser = commands.add_parser('install', help='install a snapshot for a read-only replica')
+    install_parser.add_argument('source', help='URL (e.g. http://primary:5000/api/snapshot) or file')
+    install_parser.add_argument('path', help="the replica's DATABASE_PATH")
+    install_parser.add_argument('--every', type=float, metavar='SECONDS',
+                                help='keep installing a new snapshot this often')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        if not database.DB_READ_ONLY:
+            database.init_db()
+        print(json.dumps(create(args.path), indent=2))
+        return
+
+    while True:
+        try:
+            print(json.dumps(install(args.source, args.path)), flush=True)
+        except Exception as e:
+            if args.every is None:
+                sys.exit(f"Snapshot install failed: {e}")
+            # Keep serving the current snapshot; try again next time
+            logging.error(f"Snapshot install failed: {e}")
+        if args.every is None:
+            return
+        time.sleep(args.every)
+
+if __name__ == '__main__':
+    main()
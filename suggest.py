@@ -0,0 +1,312 @@
+import bisect
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+import database
+
+# Title suggestion configuration (all overridable through environment variables)
+SUGGEST_LIMIT = int(os.getenv('SUGGEST_LIMIT', 10))
+SUGGEST_MAX_LIMIT = 50
+SUGGEST_MAX_EDITS = int(os.getenv('SUGGEST_MAX_EDITS', 2))
+# Title prefixes examined per fuzzy query, which bounds its cost on dense libraries
+SUGGEST_FUZZY_BUDGET = int(os.getenv('SUGGEST_FUZZY_BUDGET', 2000))
+
+# Past this many changed articles, rebuild instead of patching
+REBUILD_AFTER = 20000
+
+# Index keys are "<normalized title>\0<title>\0<article id>", so one sorted list
+# orders titles for prefix search and carries what a suggestion returns
+_SEP = '\x00'
+# Larger than any edit distance in a row
+_FAR = 1 << 30
+
+# Punctuation is matched as a space ("python (prog" finds "Python (programming language)")
+_PUNCTUATION = re.compile(r'[^\w\s]+')
+
+def normalize(text):
+    """Fold case, accents, punctuation and runs of whitespace, for matching titles as typed."""
+    if not text.isascii():
+        text = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    return ' '.join(_PUNCTUATION.sub(' ', text.casefold()).split())
+
+def allowed_edits(query):
+    """Edits tolerated for a normalized query: none under 4 characters, 1 under 8."""
+    if len(query) < 4:
+        return 0
+    return min(SUGGEST_MAX_EDITS, 1 if len(query) < 8 else 2)
+
+class TitleIndex:
+    """
+    In-memory index of saved titles (and aliases) for suggestions.
+
+    Titles are kept in one sorted list. A prefix match is a bisect into it,
+    so it costs the same at any library size. Fuzzy matching walks the same
+    list as if it were a trie (each distinct next character is a bisect
+    away) and carries a row of the edit distance table down each branch.
+    The index is built lazily from the database and patched from database
+    change notifications; articles that changed are re-read by ID on the
+    next query.
+    """
+
+    def __init__(self):
+        # _lock guards the index; _refresh_lock lets one thread at a time catch up on changes
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._changes_lock = threading.Lock()
+        self._keys = []
+        self._by_id = {}
+        self._built = False
+        self._changed = set()
+        self._rebuild = True
+        self.build_seconds = None
+
+    def notify(self, entries):
+        """Database change listener: remember which articles to re-read."""
+        with self._changes_lock:
+            if entries is None:
+                self._rebuild = True
+                return
+            for namespace, key in entries:
+                if namespace != 'article':
+                    continue
+                if key is None:
+                    self._rebuild = True
+                elif isinstance(key, int):
+                    self._changed.add(key)
+            if len(self._changed) > REBUILD_AFTER:
+                self._rebuild = True
+
+    def load(self, rows):
+        """Replace the index with (article ID, title) rows, as if just built from the database."""
+        with self._changes_lock:
+            self._rebuild = False
+            self._changed.clear()
+        self._load(rows)
+
+    def _load(self, rows):
+        by_id = {}
+        keys = []
+        for article_id, title in rows:
+            key = f'{normalize(title)}{_SEP}{title}{_SEP}{article_id}'
+            keys.append(key)
+            by_id.setdefault(article_id, []).append(key)
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._by_id = by_id
+            self._built = True
+
+    def _refresh(self):
+        if self._built and not self._rebuild and not self._changed:
+            return
+        with self._refresh_lock:
+            with self._changes_lock:
+                rebuild = self._rebuild or not self._built
+                changed, self._changed = self._changed, set()
+                self._rebuild = False
+            if rebuild:
+                start = time.perf_counter()
+                self._load(_read_titles())
+                self.build_seconds = round(time.perf_counter() - start, 3)
+            elif changed:
+                self._patch(changed, list(_read_titles(changed)))
+
+    def _patch(self, article_ids, rows):
+        titles = {}
+        for article_id, title in rows:
+            titles.setdefault(article_id, []).append(title)
+        with self._lock:
+            for article_id in article_ids:
+                new_keys = sorted(f'{normalize(title)}{_SEP}{title}{_SEP}{article_id}'
+                                  for title in titles.get(article_id, ()))
+                old_keys = self._by_id.pop(article_id, [])
+                if sorted(old_keys) == new_keys:
+                    if new_keys:
+                        self._by_id[article_id] = old_keys
+                    continue
+                for key in old_keys:
+                    position = bisect.bisect_left(self._keys, key)
+                    if position < len(self._keys) and self._keys[position] == key:
+                        del self._keys[position]
+                for key in new_keys:
+                    bisect.insort(self._keys, key)
+                if new_keys:
+                    self._by_id[article_id] = new_keys
+
+    def prefix(self, query, limit):
+        """Return up to limit (title, article ID) pairs whose normalized title starts with query."""
+        self._refresh()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, query)
+            keys = self._keys[start:start + limit]
+        matches = []
+        for key in keys:
+            if not key.startswith(query):
+                break
+            _, title, article_id = key.split(_SEP)
+            matches.append((title, int(article_id)))
+        return matches
+
+    def fuzzy(self, query, limit, max_edits):
+        """
+        Return up to limit (title, article ID, distance) triples whose
+        beginning is within max_edits of the query, closest first.
+
+        One edit is tried before two, and the first character is taken as
+        typed. At most SUGGEST_FUZZY_BUDGET prefixes are examined, so a
+        query in a crowded part of the library returns what was found in
+        that budget.
+        """
+        self._refresh()
+        matches = []
+        seen = set()
+        budget = SUGGEST_FUZZY_BUDGET
+        with self._lock:
+            for edits in range(1, max_edits + 1):
+                ranges = []
+                budget -= self._walk(query, edits, ranges, budget)
+                # Smallest distance first, then the longest matching prefix
+                for distance, _, lo, hi in sorted(ranges):
+                    for key in self._keys[lo:min(hi, lo + limit)]:
+                        if key not in seen:
+                            seen.add(key)
+                            matches.append((key, distance))
+                if len(matches) >= limit or budget <= 0:
+                    break
+        suggestions = []
+        for key, distance in matches[:limit]:
+            _, title, article_id = key.split(_SEP)
+            suggestions.append((title, int(article_id), distance))
+        return suggestions
+
+    def _walk(self, query, max_edits, ranges, budget):
+        """
+        Collect (distance, -depth, lo, hi) for title prefixes within max_edits of query.
+
+        Each visited prefix gets the edit distance table row for it against
+        every query prefix, computed only within max_edits of the diagonal.
+        A branch is dropped once its whole row is over max_edits, and the
+        most promising branches (smallest row minimum, then deepest) are
+        expanded first, so the budget goes where matches are likely.
+
+        Returns:
+            Number of prefixes examined
+        """
+        keys = self._keys
+        size = len(query)
+        first = query[0]
+        lo = bisect.bisect_left(keys, first)
+        hi = bisect.bisect_left(keys, chr(ord(first) + 1))
+        # Row for the one-character prefix `first` (taken as typed)
+        heap = [(0, -1, first, lo, hi, [1] + list(range(size)))]
+        visited = 0
+        while heap and visited < budget:
+            _, _, prefix, lo, hi, row = heapq.heappop(heap)
+            depth = len(prefix)
+            i = lo
+            while i < hi:
+                char = keys[i][depth]
+                j = bisect.bisect_left(keys, prefix + chr(ord(char) + 1), i, hi)
+                if char != _SEP:
+                    visited += 1
+                    new = [_FAR] * (size + 1)
+                    new[0] = depth + 1
+                    start = max(1, depth + 1 - max_edits)
+                    best = new[0] if start == 1 else _FAR
+                    for q in range(start, min(size, depth + 1 + max_edits) + 1):
+                        value = min(row[q - 1] + (query[q - 1] != char), row[q] + 1, new[q - 1] + 1)
+                        new[q] = value
+                        if value < best:
+                            best = value
+                    if best <= max_edits:
+                        if new[size] <= max_edits:
+                            ranges.append((new[size], -depth, i, j))
+                        # Deeper prefixes can only help while the row has a smaller value
+                        if new[size] > best and depth + 1 < size + max_edits:
+                            heapq.heappush(heap, (best, -depth - 1, prefix + char, i, j, new))
+                i = j
+        return visited
+
+    def stats(self):
+        with self._lock:
+            return {
+                "built": self._built,
+                "titles": len(self._keys),
+                "articles": len(self._by_id),
+                "build_seconds": self.build_seconds,
+                "pending_changes": len(self._changed),
+            }
+
+def _read_titles(article_ids=None, chunk_size=500):
+    """Yield (article ID, title) for saved titles and aliases (of the given articles only, if any)."""
+    if article_ids is not None:
+        article_ids = list(article_ids)
+    return database.iterate_shards(_read_shard_titles, article_ids, chunk_size)
+
+def _read_shard_titles(article_ids, chunk_size):
+    conn = database.get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        if article_ids is None:
+            cursor.execute('SELECT id, title FROM articles UNION ALL SELECT article_id, title FROM article_aliases')
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                yield from rows
+            return
+        ids = [int(article_id) for article_id in article_ids]
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT id, title FROM articles WHERE id IN ({placeholders})
+                UNION ALL
+                SELECT article_id, title FROM article_aliases WHERE article_id IN ({placeholders})
+            ''', chunk + chunk)
+            yield from cursor.fetchall()
+    finally:
+        conn.close()
+
+_index = TitleIndex()
+database.add_change_listener(_index.notify)
+
+def suggest(query, limit=None, fuzzy=False):
+    """
+    Suggest saved titles for a partial query.
+
+    Titles starting with the query come first, in alphabetical order. With
+    fuzzy, remaining slots are filled with titles whose beginning is within
+    a couple of edits of the query (none for queries under 4 characters).
+
+    Args:
+        query: Text typed so far
+        limit: Maximum suggestions (default SUGGEST_LIMIT, at most SUGGEST_MAX_LIMIT)
+        fuzzy: Also match titles with typos
+
+    Returns:
+        List of {title, id, match} dictionaries, match being 'prefix' or 'fuzzy'
+        (fuzzy ones also carry their edit distance)
+    """
+    limit = max(1, min(limit or SUGGEST_LIMIT, SUGGEST_MAX_LIMIT))
+    normalized = normalize(query or '')
+    if not normalized:
+        return []
+
+    suggestions = [{"title": title, "id": article_id, "match": "prefix"}
+                   for title, article_id in _index.prefix(normalized, limit)]
+    max_edits = allowed_edits(normalized)
+    if fuzzy and max_edits and len(suggestions) < limit:
+        seen = {item['title'] for item in suggestions}
+        for title, article_id, distance in _index.fuzzy(normalized, limit + len(suggestions), max_edits):
+            if title not in seen and len(suggestions) < limit:
+                suggestions.append({"title": title, "id": article_id, "match": "fuzzy", "distance": distance})
+    return suggestions
+
+def get_stats():
+    """Return the size and state of this process's title index."""
+    return _index.stats()
@@ -0,0 +1,162 @@
+"""WikipediaFetcher against the stub MediaWiki API in benchmarks/stub_wikipedia.py."""
+import threading
+
+import pytest
+
+import fetcher
+from benchmarks.stub_wikipedia import StubWikipedia, serve
+
+PAGES = {
+    'Python (programming language)': 'Python is a programming language.\n\n\n== History ==\nReleased in 1991.',
+    'Mercury (planet)': 'Mercury is the smallest planet.',
+    'Mercury (element)': 'Mercury is a chemical element.',
+}
+
+@pytest.fixture
+def stub_api():
+    """Start stub servers on demand: stub_api(**StubWikipedia options) -> (stub, api_url)."""
+    servers = []
+
+    def start(**options):
+        options.setdefault('pages', PAGES)
+        options.setdefault('strict', True)
+        server, api_url = serve(StubWikipedia(**options))
+        servers.append(server)
+        return server.stub, api_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def make_fetcher(api_url, **options):
+    # No rate limit and short backoffs keep the tests fast
+    options.setdefault('rate_limit', 0)
+    options.setdefault('backoff', 0.01)
+    options.setdefault('timeout', 5)
+    return fetcher.WikipediaFetcher(api_url=api_url, **options)
+
+def test_fetch_page(stub_api):
+    stub, api_url = stub_api()
+    page = make_fetcher(api_url).fetch_page('Python (programming language)')
+
+    assert page['title'] == 'Python (programming language)'
+    assert page['content'] == PAGES['Python (programming language)']
+    assert page['summary'] == 'Python is a programming language.'
+    assert page['url'] == 'https://en.wikipedia.org/wiki/Python_%28programming_language%29'
+    assert stub.request_count == 1
+
+def test_redirect_returns_target_title(stub_api):
+    stub, api_url = stub_api(redirects={'Python language': 'Python (programming language)'})
+    page = make_fetcher(api_url).fetch_page('python_language')
+
+    assert page['title'] == 'Python (programming language)'
+
+def test_missing_page_falls_back_to_search(stub_api):
+    stub, api_url = stub_api()
+    page = make_fetcher(api_url).fetch_page('Python (programming')
+
+    assert page['title'] == 'Python (programming language)'
+    # Page query, search, page query for the search hit
+    assert stub.request_count == 3
+
+def test_missing_page_raises_page_error(stub_api):
+    stub, api_url = stub_api()
+    client = make_fetcher(api_url)
+
+    with pytest.raises(fetcher.PageError) as excinfo:
+        client.fetch_page('No such article')
+    assert excinfo.value.title == 'No such article'
+    assert client.get_stats()['errors'] == 1
+
+def test_disambiguation_error_lists_options(stub_api):
+    options = ['Mercury (planet)', 'Mercury (element)']
+    stub, api_url = stub_api(disambiguations={'Mercury': options})
+
+    with pytest.raises(fetcher.DisambiguationError) as excinfo:
+        make_fetcher(api_url).fetch_page('mercury')
+    assert excinfo.value.title == 'Mercury'
+    assert excinfo.value.options == options
+
+def test_concurrent_requests_share_one_fetch(stub_api):
+    # Slow answers keep the first fetch in flight while the others arrive
+    stub, api_url = stub_api(latency=0.3)
+    client = make_fetcher(api_url)
+
+    futures = [client.submit(title) for title in
+               ('Python (programming language)', 'python (programming language)', 'Python_(programming_language)')]
+
+    assert futures[1] is futures[0] and futures[2] is futures[0]
+    assert futures[0].result(timeout=5)['title'] == 'Python (programming language)'
+    assert stub.request_count == 1
+    stats = client.get_stats()
+    assert stats['fetches'] == 1
+    assert stats['coalesced'] == 2
+
+def test_coalescing_across_threads(stub_api):
+    stub, api_url = stub_api(latency=0.3)
+    client = make_fetcher(api_url)
+    results = []
+
+    def fetch():
+        results.append(client.fetch_page('Mercury (planet)', deadline=5)['title'])
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['Mercury (planet)'] * 8
+    assert stub.request_count == 1
+
+def test_finished_fetch_is_not_reused(stub_api):
+    stub, api_url = stub_api()
+    client = make_fetcher(api_url)
+
+    client.fetch_page('Mercury (planet)')
+    client.fetch_page('Mercury (planet)')
+
+    assert stub.request_count == 2
+    assert client.get_stats()['in_flight'] == 0
+
+def test_fetch_many_reports_each_title(stub_api):
+    stub, api_url = stub_api(latency=0.1)
+    titles = ['Mercury (planet)', 'mercury (planet)', 'Mercury (element)', 'No such article']
+    results = {title: (page, error) for title, page, error in make_fetcher(api_url).fetch_many(titles)}
+
+    assert set(results) == set(titles)
+    assert results['Mercury (planet)'][0]['title'] == 'Mercury (planet)'
+    assert results['mercury (planet)'][0]['title'] == 'Mercury (planet)'
+    assert results['Mercury (element)'][1] is None
+    assert isinstance(results['No such article'][1], fetcher.PageError)
+    # The two spellings of Mercury (planet) share a fetch; the missing title also searches
+    assert stub.request_count == 4
+
+def test_retries_server_errors_with_backoff(stub_api):
+    # With seed 1 the first request fails and later ones eventually succeed
+    stub, api_url = stub_api(fail_rate=0.5, seed=1)
+    client = make_fetcher(api_url, retries=10)
+
+    page = client.fetch_page('Mercury (planet)')
+
+    assert page['title'] == 'Mercury (planet)'
+    stats = client.get_stats()
+    assert stats['retries'] >= 1
+    assert stats['requests'] == stub.request_count == stats['retries'] + 1
+
+def test_gives_up_after_retries(stub_api, monkeypatch):
+    stub, api_url = stub_api(fail_rate=1.0)
+    client = make_fetcher(api_url, retries=3, backoff=0.2)
+    delays = []
+    monkeypatch.setattr(fetcher.time, 'sleep', delays.append)
+
+    with pytest.raises(fetcher.FetchError, match='Giving up after 4 attempts'):
+        client.fetch_page('Mercury (planet)')
+
+    assert stub.request_count == 4
+    assert client.get_stats()['retries'] == 3
+    # Full jitter: each delay is drawn from [0, backoff * 2 ** attempt]
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= 0.2 * 2 ** attempt